@@ -0,0 +1,73 @@
+import os
+import pytest
+from benchmarks.corpus import load_corpus
+from benchmarks.harness import (BenchmarkRunner, BASELINE_PATH, RESULTS_PATH, DEFAULT_TOLERANCE,
+                                DEFAULT_MIN_DELTA_MS, load_baseline, save_results, compare, compare_timing)
+
+# 环境变量:
+#   BENCH_ROUNDS=n           每项基准的轮数
+#   BENCH_SAVE_BASELINE=1    将本次结果保存为基线
+#   BENCH_STRICT=1           服务端调用次数或隐式等待增加时令测试会话失败（CI 使用）；耗时变慢只提示
+#   BENCH_TOLERANCE=0.25     耗时变慢的比例容差
+#   BENCH_MIN_DELTA_MS=0.5   耗时变慢的绝对差值下限（毫秒）
+_runner = BenchmarkRunner(rounds=int(os.getenv('BENCH_ROUNDS', '5')))
+_regressions = []
+_slowdowns = []
+
+
+@pytest.fixture(scope='session')
+def corpus():
+    return load_corpus()
+
+
+@pytest.fixture
+def bench():
+    return _runner.run
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not _runner.results:
+        return
+    save_results(_runner.results, RESULTS_PATH)
+    if os.getenv('BENCH_SAVE_BASELINE'):
+        save_results(_runner.results, BASELINE_PATH)
+        return
+    baseline = load_baseline()
+    _regressions.extend(compare(_runner.results, baseline))
+    _slowdowns.extend(compare_timing(_runner.results, baseline,
+                                     float(os.getenv('BENCH_TOLERANCE', DEFAULT_TOLERANCE)),
+                                     float(os.getenv('BENCH_MIN_DELTA_MS', DEFAULT_MIN_DELTA_MS))))
+    if _regressions and os.getenv('BENCH_STRICT'):
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _runner.results:
+        return
+    terminalreporter.section('benchmarks')
+    terminalreporter.write_line(
+        f"{'name':<48}{'median ms':>12}{'min ms':>12}{'peak KiB':>12}{'calls':>8}{'wait s':>8}")
+    for name, result in sorted(_runner.results.items()):
+        calls = '' if result['server_calls'] is None else result['server_calls']
+        wait = '' if result.get('virtual_wait_s') is None else result['virtual_wait_s']
+        terminalreporter.write_line(
+            f"{name:<48}{result['median_ms']:>12.3f}{result['min_ms']:>12.3f}{result['peak_kib']:>12.1f}"
+            f"{calls:>8}{wait:>8}")
+    speedups = []
+    for name, result in sorted(_runner.results.items()):
+        suffix = name[len('lookup_xpath'):]
+        translated = _runner.results.get(f'lookup_uiautomator{suffix}')
+        if name.startswith('lookup_xpath[') and translated:
+            speedups.append((suffix, result['median_ms'] / translated['median_ms']))
+    if speedups:
+        terminalreporter.section('xpath -> uiautomator speedup')
+        for corpus_name, ratio in speedups:
+            terminalreporter.write_line(f"{corpus_name:<48}{ratio:>11.1f}x")
+    if _slowdowns:
+        terminalreporter.section('benchmark slowdowns', yellow=True)
+        for line in _slowdowns:
+            terminalreporter.write_line(line, yellow=True)
+    if _regressions:
+        terminalreporter.section('benchmark regressions', red=True)
+        for line in _regressions:
+            terminalreporter.write_line(line, red=True)
@@ -0,0 +1,85 @@
+import os
+import glob
+import random
+import xml.etree.ElementTree as ET
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+SYNTHETIC_SIZES = (50, 500, 5000)
+
+_CONTAINERS = [
+    'android.widget.FrameLayout',
+    'android.widget.LinearLayout',
+    'android.view.ViewGroup',
+    'androidx.recyclerview.widget.RecyclerView',
+]
+_LEAVES = [
+    'android.widget.TextView',
+    'android.widget.ImageView',
+    'android.widget.Button',
+    'android.widget.ImageButton',
+    'android.widget.EditText',
+    'android.widget.CheckBox',
+]
+_WORDS = ['首页', '搜索', '设置', '登录', 'Play', 'Share', 'Like', 'Comment', 'Video', 'Music', 'Profile', 'More']
+
+
+def synthetic_hierarchy(node_count, seed=0, package='com.example.app'):
+    """
+    生成确定性的 UiAutomator2 风格层级 XML
+    约三分之一的节点为容器，resource-id 和文本存在重复，以贴近真实页面的定位难度
+    :param node_count: 节点数量
+    :param seed: 随机种子
+    """
+    rng = random.Random(seed)
+    root = ET.Element('hierarchy', {'index': '0', 'class': 'hierarchy', 'rotation': '0',
+                                    'width': '1080', 'height': '2400'})
+    containers = [(root, 0)]
+    id_pool = [f'{package}:id/view_{i}' for i in range(max(1, node_count // 3))]
+
+    for i in range(node_count):
+        parent, depth = containers[-1] if rng.random() < 0.6 else rng.choice(containers)
+        is_container = depth < 14 and rng.random() < 0.35
+        cls = rng.choice(_CONTAINERS if is_container else _LEAVES)
+        x1, y1 = rng.randrange(0, 1000), rng.randrange(0, 2300)
+        clickable = cls.endswith('Button') or rng.random() < 0.2
+        attrs = {
+            'index': str(len(parent)),
+            'package': package,
+            'class': cls,
+            'text': rng.choice(_WORDS) + (str(rng.randrange(20)) if rng.random() < 0.5 else '')
+            if not is_container and rng.random() < 0.5 else '',
+            'resource-id': rng.choice(id_pool) if rng.random() < 0.6 else '',
+            'checkable': 'false',
+            'checked': 'false',
+            'clickable': 'true' if clickable else 'false',
+            'enabled': 'true',
+            'focusable': 'true' if clickable else 'false',
+            'focused': 'false',
+            'long-clickable': 'false',
+            'password': 'false',
+            'scrollable': 'true' if cls.endswith('RecyclerView') else 'false',
+            'selected': 'false',
+            'bounds': f'[{x1},{y1}][{x1 + rng.randrange(20, 80)},{y1 + rng.randrange(20, 100)}]',
+            'displayed': 'true',
+        }
+        if rng.random() < 0.1:
+            attrs['content-desc'] = f'{rng.choice(_WORDS)} {i}'
+        element = ET.SubElement(parent, cls, attrs)
+        if is_container:
+            containers.append((element, depth + 1))
+
+    return "<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>\n" + ET.tostring(root, encoding='unicode')
+
+
+def load_corpus(sizes=SYNTHETIC_SIZES):
+    """
+    加载基准语料：corpus 目录下的真实页面 XML 加上指定规模的合成页面
+    :return: 名称 -> XML 字符串
+    """
+    corpus = {}
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, '*.xml'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            corpus[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    for size in sizes:
+        corpus[f'synthetic_{size}'] = synthetic_hierarchy(size, seed=size)
+    return corpus
@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import statistics
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+RESULTS_PATH = os.path.join(BENCH_DIR, 'results', 'latest.json')
+# min 耗时超过基线该比例、且绝对差值不小于 DEFAULT_MIN_DELTA_MS 时报告为变慢，可通过 BENCH_TOLERANCE 覆盖
+# 亚毫秒级基准的墙钟耗时受调度影响很大，差值下限用于过滤这类抖动
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_MIN_DELTA_MS = 0.5
+
+
+class BenchmarkRunner:
+    """
+    轻量基准执行器（pytest-benchmark 风格）
+    每个操作记录耗时分布、内存峰值（tracemalloc）和模拟驱动上的服务端调用次数
+    """
+
+    def __init__(self, rounds=5, warmup=1):
+        self.rounds = rounds
+        self.warmup = warmup
+        self.results = {}
+
+    def run(self, name, func, setup=None, driver=None, rounds=None):
+        """
+        执行一项基准
+        :param name: 基准名称，用作基线中的键
+        :param func: 被测函数，接收 setup 的返回值（无 setup 时不带参数）
+        :param setup: 每轮执行前调用的准备函数，不计入耗时
+        :param driver: MockDriver，用于统计每轮的服务端调用次数
+        :param rounds: 覆盖默认轮数
+        :return: 最后一轮的返回值
+        """
+        rounds = rounds or self.rounds
+
+        def _once():
+            arg = setup() if setup else None
+            if driver is not None:
+                driver.reset_counters()
+            start = time.perf_counter()
+            value = func(arg) if setup else func()
+            return time.perf_counter() - start, value
+
+        for _ in range(self.warmup):
+            _once()
+
+        timings = []
+        value = None
+        for _ in range(rounds):
+            elapsed, value = _once()
+            timings.append(elapsed)
+        calls = driver.total_calls if driver is not None else None
+        virtual_wait = round(driver.virtual_wait, 3) if driver is not None else None
+
+        # 内存峰值单独测一轮，避免 tracemalloc 开销影响耗时
+        arg = setup() if setup else None
+        tracemalloc.start()
+        try:
+            func(arg) if setup else func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.results[name] = {
+            'rounds': rounds,
+            'min_ms': round(min(timings) * 1000, 3),
+            'median_ms': round(statistics.median(timings) * 1000, 3),
+            'mean_ms': round(statistics.mean(timings) * 1000, 3),
+            'peak_kib': round(peak / 1024, 1),
+            'server_calls': calls,
+            'virtual_wait_s': virtual_wait,
+        }
+        return value
+
+
+def load_baseline(path=BASELINE_PATH):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_results(results, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def compare(results, baseline):
+    """
+    与基线对比确定性指标：服务端调用次数和隐式等待累计时间与机器无关，增加即视为回退
+    :return: 回退描述列表
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        base = baseline.get(name)
+        if not base:
+            continue
+        if base.get('server_calls') is not None and result['server_calls'] is not None \
+                and result['server_calls'] > base['server_calls']:
+            regressions.append(f"{name}: 服务端调用 {base['server_calls']} -> {result['server_calls']}")
+        if base.get('virtual_wait_s') is not None and result.get('virtual_wait_s') is not None \
+                and result['virtual_wait_s'] > base['virtual_wait_s']:
+            regressions.append(f"{name}: 隐式等待 {base['virtual_wait_s']}s -> {result['virtual_wait_s']}s")
+    return regressions
+
+
+def compare_timing(results, baseline, tolerance=DEFAULT_TOLERANCE, min_delta_ms=DEFAULT_MIN_DELTA_MS):
+    """
+    与基线对比耗时：按 min（受调度干扰最小）比较，超过容差且差值不小于 min_delta_ms 时报告
+    墙钟耗时随机器和负载变化，结果只用于提示，不参与 BENCH_STRICT 判定
+    :return: 变慢描述列表
+    """
+    slowdowns = []
+    for name, result in sorted(results.items()):
+        base = (baseline.get(name) or {}).get('min_ms')
+        if not base:
+            continue
+        current = result['min_ms']
+        if current > base * (1 + tolerance) and current - base >= min_delta_ms:
+            slowdowns.append(f"{name}: min {base:.2f}ms -> {current:.2f}ms (+{(current / base - 1) * 100:.0f}%)")
+    return slowdowns
@@ -0,0 +1,206 @@
+import re
+import json
+import time
+from types import SimpleNamespace
+from collections import Counter
+from lxml import etree
+from selenium.common.exceptions import NoSuchElementException, InvalidSelectorException
+from appium.webdriver.common.appiumby import AppiumBy
+from utils.ui_hierarchy import parse_bounds
+
+
+class MockElement:
+    """由层级 XML 节点支撑的元素，每次访问都计为一次服务端调用"""
+
+    def __init__(self, driver, node):
+        self._driver = driver
+        self._node = node
+        self.id = f'mock-{id(node)}'
+
+    def get_attribute(self, name):
+        self._driver._call('getElementAttribute')
+        if name == 'class':
+            return self._node.get('class') or self._node.tag
+        return self._node.get(name)
+
+    @property
+    def text(self):
+        self._driver._call('getElementText')
+        return self._node.get('text') or ''
+
+    @property
+    def tag_name(self):
+        self._driver._call('getElementTagName')
+        return self._node.tag
+
+    @property
+    def rect(self):
+        self._driver._call('getElementRect')
+        x1, y1, x2, y2 = parse_bounds(self._node.get('bounds')) or (0, 0, 0, 0)
+        return {'x': x1, 'y': y1, 'width': x2 - x1, 'height': y2 - y1}
+
+    @property
+    def location(self):
+        rect = self.rect
+        return {'x': rect['x'], 'y': rect['y']}
+
+    def is_displayed(self):
+        self._driver._call('isElementDisplayed')
+        return self._node.get('displayed', 'true') != 'false'
+
+    def click(self):
+        self._driver._call('clickElement')
+
+    def clear(self):
+        self._driver._call('clearElement')
+
+    def send_keys(self, *value):
+        self._driver._call('sendKeysToElement')
+
+
+_UISELECTOR_CALL_RE = re.compile(r'\.(\w+)\(("(?:\\.|[^"\\])*"|[^)]*)\)')
+_UISELECTOR_ATTRIBUTES = {
+    'text': 'text', 'description': 'content-desc', 'resourceId': 'resource-id',
+    'className': 'class', 'packageName': 'package', 'index': 'index',
+    'checkable': 'checkable', 'checked': 'checked', 'clickable': 'clickable', 'enabled': 'enabled',
+    'focusable': 'focusable', 'focused': 'focused', 'scrollable': 'scrollable',
+    'longClickable': 'long-clickable', 'selected': 'selected',
+}
+
+
+def _uiselector_matcher(selector):
+    """
+    将单个 UiSelector 表达式转换为节点过滤函数
+    :return: (match(node), instance)
+    """
+    conditions = []
+    instance = None
+    for method, raw in _UISELECTOR_CALL_RE.findall(selector):
+        argument = json.loads(raw, strict=False) if raw.startswith('"') else raw.strip()
+        if method == 'instance':
+            instance = int(argument)
+            continue
+        for suffix, test in (('Contains', lambda actual, expected: expected in actual),
+                             ('StartsWith', lambda actual, expected: actual.startswith(expected)),
+                             ('Matches', lambda actual, expected: re.fullmatch(expected, actual) is not None),
+                             ('', lambda actual, expected: actual == expected)):
+            if method.endswith(suffix) and method[:len(method) - len(suffix)] in _UISELECTOR_ATTRIBUTES:
+                name = _UISELECTOR_ATTRIBUTES[method[:len(method) - len(suffix)]]
+                conditions.append((name, test, argument))
+                break
+        else:
+            raise InvalidSelectorException(f'Unsupported UiSelector method: {method}')
+
+    def match(node):
+        for name, test, expected in conditions:
+            actual = node.get(name) or (node.tag if name == 'class' else '')
+            if not test(actual, expected):
+                return False
+        return True
+
+    return match, instance
+
+
+class MockDriver:
+    """
+    基于层级 XML 的模拟 WebDriver
+    定位在本地 XML 上执行；按命令统计调用次数，查找未命中时按当前隐式等待累计虚拟等待时间而不真正阻塞。
+    与 UiAutomator2 一样，每次 XPath 查询都会先把整棵层级序列化再解析（按该开销计时），UiSelector 则直接遍历节点
+    """
+
+    def __init__(self, page_source, latency=0.0, current_activity='.MainActivity', current_package='com.example.app'):
+        """
+        :param page_source: 层级 XML
+        :param latency: 每次调用注入的延迟（秒）
+        """
+        self.latency = latency
+        self.current_activity = current_activity
+        self.current_package = current_package
+        self.capabilities = {'platformName': 'Android', 'automationName': 'UiAutomator2',
+                             'platformVersion': '13', 'deviceName': 'mock'}
+        self.calls = Counter()
+        self.implicit_wait = 0
+        self.virtual_wait = 0.0
+        self.set_page_source(page_source)
+
+    def set_page_source(self, page_source):
+        self._source = page_source
+        self._tree = etree.fromstring(page_source.encode('utf-8'))
+
+    def _call(self, command):
+        self.calls[command] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    @property
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    def reset_counters(self):
+        self.calls.clear()
+        self.virtual_wait = 0.0
+
+    @property
+    def page_source(self):
+        self._call('getPageSource')
+        return self._source
+
+    def get_page_source(self):
+        return self.page_source
+
+    @property
+    def timeouts(self):
+        self._call('getTimeouts')
+        return SimpleNamespace(implicit_wait=self.implicit_wait)
+
+    def implicitly_wait(self, seconds):
+        self._call('setTimeouts')
+        self.implicit_wait = seconds
+
+    def _query(self, by, value):
+        if value is None:
+            return []
+        if by == AppiumBy.ID:
+            return [n for n in self._tree.iter() if n.get('resource-id') and
+                    (n.get('resource-id') == value or n.get('resource-id').endswith(f':id/{value}'))]
+        if by == AppiumBy.ACCESSIBILITY_ID:
+            return [n for n in self._tree.iter() if n.get('content-desc') == value]
+        if by == AppiumBy.CLASS_NAME:
+            return [n for n in self._tree.iter() if n.get('class') == value]
+        if by == AppiumBy.ANDROID_UIAUTOMATOR:
+            nodes, seen = [], set()
+            for selector in filter(None, (part.strip() for part in value.split(';'))):
+                match, instance = _uiselector_matcher(selector)
+                matched = [n for n in self._tree.iter() if match(n)]
+                if instance is not None:
+                    matched = matched[instance:instance + 1]
+                for node in matched:
+                    if node not in seen:
+                        seen.add(node)
+                        nodes.append(node)
+            return nodes
+        if by == AppiumBy.XPATH:
+            try:
+                # UiAutomator2 的 XPath 查询先把整棵层级导出为 XML 再求值，这里同样序列化、重新解析；
+                # 命中的节点映射回原树，与其他定位方式返回同一批节点
+                snapshot = etree.fromstring(etree.tostring(self._tree))
+                originals = dict(zip(snapshot.iter(), self._tree.iter()))
+                return [originals[n] for n in snapshot.xpath(value) if isinstance(n, etree._Element)]
+            except etree.XPathError as e:
+                raise InvalidSelectorException(str(e))
+        raise InvalidSelectorException(f'Unsupported locator strategy: {by}')
+
+    def find_elements(self, by=AppiumBy.ID, value=None):
+        self._call('findElements')
+        nodes = self._query(by, value)
+        if not nodes:
+            self.virtual_wait += self.implicit_wait
+        return [MockElement(self, node) for node in nodes]
+
+    def find_element(self, by=AppiumBy.ID, value=None):
+        self._call('findElement')
+        nodes = self._query(by, value)
+        if not nodes:
+            self.virtual_wait += self.implicit_wait
+            raise NoSuchElementException(f'{by}={value}')
+        return MockElement(self, nodes[0])
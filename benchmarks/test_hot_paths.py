@@ -0,0 +1,115 @@
+import pytest
+from appium.webdriver.common.appiumby import AppiumBy
+from benchmarks.corpus import load_corpus
+from benchmarks.mock_driver import MockDriver
+from utils.app_inspector import AppInspector
+from utils.element_finder import ElementFinder
+from pages.base_page import BasePage
+from utils.xpath_translator import optimize_locator
+
+CORPUS_NAMES = sorted(load_corpus())
+
+
+def _first_with(source, attribute):
+    """返回页面中第一个带有指定属性值的节点属性"""
+    from utils.ui_hierarchy import UiHierarchy
+    return next(getattr(node, attribute) for node in UiHierarchy.from_xml(source) if getattr(node, attribute))
+
+
+@pytest.mark.parametrize('name', CORPUS_NAMES)
+def test_parse_page_source(bench, corpus, name):
+    inspector = AppInspector(MockDriver(corpus[name]))
+    inspector.page_source = corpus[name]
+    elements = bench(f'parse_page_source[{name}]', inspector._parse_page_source)
+    assert elements
+
+
+@pytest.mark.parametrize('name', CORPUS_NAMES)
+def test_generate_element_map(bench, corpus, name):
+    driver = MockDriver(corpus[name])
+    element_map = bench(f'generate_element_map[{name}]',
+                        lambda inspector: inspector.generate_element_map(),
+                        setup=lambda: AppInspector(driver), driver=driver)
+    assert element_map['total_elements'] > 0
+
+
+@pytest.mark.parametrize('name', CORPUS_NAMES)
+def test_get_element_locator(bench, corpus, name):
+    driver = MockDriver(corpus[name])
+    finder = ElementFinder(driver)
+    resource_id = _first_with(corpus[name], 'resource_id')
+    locator = bench(f'get_element_locator[{name}]',
+                    lambda: finder.get_element_locator(element_id=resource_id), driver=driver)
+    assert locator == (AppiumBy.ID, resource_id)
+
+
+@pytest.mark.parametrize('name', CORPUS_NAMES)
+def test_generate_page_elements(bench, corpus, name):
+    driver = MockDriver(corpus[name])
+    page = BasePage(driver)
+    code = bench(f'generate_page_elements[{name}]', page.generate_page_elements, driver=driver)
+    assert code
+
+
+def _xpath_queries(source, limit=20):
+    """从页面中取若干常见形式的 XPath：类名 + resource-id、文本相等、文本包含"""
+    from utils.ui_hierarchy import UiHierarchy
+    from utils.locator_generator import xpath_literal
+    queries = []
+    for node in UiHierarchy.from_xml(source):
+        if node.resource_id:
+            queries.append(f"//{node.cls}[@resource-id={xpath_literal(node.resource_id)}]")
+        if node.text:
+            queries.append(f"//*[@text={xpath_literal(node.text)}]")
+            queries.append(f"//*[contains(@text,{xpath_literal(node.text[:3])})]")
+        if len(queries) >= limit:
+            break
+    return [(AppiumBy.XPATH, query) for query in queries[:limit]]
+
+
+@pytest.mark.parametrize('mode', ['xpath', 'uiautomator'])
+@pytest.mark.parametrize('name', CORPUS_NAMES)
+def test_xpath_translation_lookup(bench, corpus, name, mode):
+    """同一组查询分别以 XPath 和改写后的 UiSelector 执行，对比单次查找耗时"""
+    driver = MockDriver(corpus[name])
+    locators = _xpath_queries(corpus[name])
+    if mode == 'uiautomator':
+        locators = [optimize_locator(locator, driver) for locator in locators]
+        assert all(by == AppiumBy.ANDROID_UIAUTOMATOR for by, _ in locators)
+    found = bench(f'lookup_{mode}[{name}]', lambda: [len(driver.find_elements(*locator)) for locator in locators],
+                  driver=driver, rounds=3)
+    xpath_found = [len(driver.find_elements(AppiumBy.XPATH, query)) for _, query in _xpath_queries(corpus[name])]
+    assert found == xpath_found
+
+
+@pytest.mark.parametrize('name', CORPUS_NAMES)
+def test_multi_candidate_probe(bench, corpus, name):
+    """会话隐式等待为 10s 时的多策略搜索：前两个策略必然未命中，虚拟等待应为 0"""
+    from utils.ui_hierarchy import UiHierarchy
+    text = next(node.text for node in UiHierarchy.from_xml(corpus[name])
+                if node.text and "'" not in node.text and not node.desc)
+    driver = MockDriver(corpus[name])
+    driver.implicitly_wait(10)
+    finder = ElementFinder(driver)
+    locator = bench(f'multi_candidate_probe[{name}]', lambda: finder.get_element_locator(element_text=text),
+                    driver=driver)
+    assert locator and locator[0] == AppiumBy.XPATH
+    assert driver.virtual_wait == 0
+
+
+@pytest.mark.parametrize('mode', ['sequential', 'snapshot'])
+@pytest.mark.parametrize('name', CORPUS_NAMES)
+def test_find_first(bench, corpus, name, mode):
+    """
+    8 个必然未命中的候选之后才是命中项：sequential 逐个承担未命中，snapshot 只解析命中的候选
+    每次调用注入 10ms 往返延迟，接近 USB 连接真机上单条命令的开销
+    """
+    resource_id = _first_with(corpus[name], 'resource_id')
+    candidates = [(AppiumBy.ID, f'missing_{i}') for i in range(4)] + \
+                 [(AppiumBy.XPATH, f"//*[@resource-id='missing_{i}']") for i in range(4)] + \
+                 [(AppiumBy.ID, resource_id)]
+    driver = MockDriver(corpus[name], latency=0.01)
+    page = BasePage(driver)
+    locator, element = bench(f'find_first_{mode}[{name}]', lambda: page.find_first(candidates, timeout=0, mode=mode),
+                             driver=driver)
+    assert locator == (AppiumBy.ID, resource_id)
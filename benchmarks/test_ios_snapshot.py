@@ -0,0 +1,68 @@
+import os
+from appium.webdriver.common.appiumby import AppiumBy
+from utils.ui_hierarchy import UiHierarchy
+from utils.locator_generator import LocatorGenerator
+from utils.app_crawler import AppCrawler
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'wda_source.json')
+
+# 与 wda_source.json 对应的 page_source（XML 格式，省略与本测试无关的属性）
+PAGE_SOURCE = """<AppiumAUT>
+<XCUIElementTypeApplication type="XCUIElementTypeApplication" name="Calculator" enabled="true" x="0" y="0" width="390" height="844">
+ <XCUIElementTypeWindow type="XCUIElementTypeWindow" enabled="true" x="0" y="0" width="390" height="844">
+  <XCUIElementTypeOther type="XCUIElementTypeOther" enabled="true" x="0" y="0" width="390" height="844">
+   <XCUIElementTypeStaticText type="XCUIElementTypeStaticText" name="Result" label="0" value="0" enabled="true" x="20" y="200" width="350" height="90"/>
+   <XCUIElementTypeButton type="XCUIElementTypeButton" name="clear" label="AC" enabled="true" x="17" y="400" width="80" height="80"/>
+   <XCUIElementTypeButton type="XCUIElementTypeButton" name="7" label="7" enabled="true" x="17" y="500" width="80" height="80"/>
+   <XCUIElementTypeButton type="XCUIElementTypeButton" name="8" label="8" enabled="false" x="109" y="500" width="80" height="80"/>
+   <XCUIElementTypeTextField type="XCUIElementTypeTextField" name="memo" value="" enabled="true" x="17" y="600" width="355" height="40"/>
+  </XCUIElementTypeOther>
+ </XCUIElementTypeWindow>
+</XCUIElementTypeApplication>
+</AppiumAUT>"""
+
+
+def _load():
+    with open(FIXTURE, 'r', encoding='utf-8') as f:
+        return UiHierarchy.from_xcuitest_json(f.read())
+
+
+def test_wda_json_matches_page_source():
+    json_nodes = list(_load())
+    xml_nodes = list(UiHierarchy.from_xml(PAGE_SOURCE))
+    assert [node.xpath() for node in json_nodes] == [node.xpath() for node in xml_nodes]
+    assert [node.attrs['type'] for node in json_nodes] == [node.attrs['type'] for node in xml_nodes]
+    assert [node.bounds for node in json_nodes] == [node.bounds for node in xml_nodes]
+    assert json_nodes[4].xpath() == \
+        '/AppiumAUT/XCUIElementTypeApplication[1]/XCUIElementTypeWindow[1]/XCUIElementTypeOther[1]/XCUIElementTypeButton[1]'
+
+
+def test_wda_json_clickable_nodes():
+    hierarchy = _load()
+    assert [node.attrs.get('name') for node in hierarchy.clickable_nodes()] == ['clear', '7', 'memo']
+    button = next(node for node in hierarchy if node.attrs.get('name') == '7')
+    assert button.center == (57, 540)
+    assert button.attrs['enabled'] == 'true'
+
+
+def test_xcuitest_attributes_map_to_node_fields():
+    hierarchy = _load()
+    clear = next(node for node in hierarchy if node.attrs.get('name') == 'clear')
+    result = next(node for node in hierarchy if node.attrs.get('name') == 'Result')
+    assert (clear.resource_id, clear.text, clear.desc) == ('clear', 'AC', '')
+    assert (result.resource_id, result.text, result.desc) == ('Result', '0', '0')
+    # 爬取时同类按钮按 name / label 区分，不会合并为一个动作
+    keys = {AppCrawler._node_key(node) for node in hierarchy.clickable_nodes()}
+    assert len(keys) == 3
+
+
+def test_ios_locators():
+    generator = LocatorGenerator(_load())
+    locators = {name: locator for name, locator, _ in generator.generate()}
+    assert locators['ac'] == (AppiumBy.ACCESSIBILITY_ID, 'clear')
+    assert locators['memo'] == (AppiumBy.ACCESSIBILITY_ID, 'memo')
+    assert not any(by == AppiumBy.XPATH for by, _ in locators.values())
+    button = next(node for node in generator.hierarchy if node.attrs.get('name') == '7')
+    values = {candidate.value for candidate in generator.candidates(button)}
+    assert 'label == "7"' in values
+    assert 'type == "XCUIElementTypeButton" AND name == "7"' in values
@@ -0,0 +1,32 @@
+import time
+import pytest
+from utils.logcat_streamer import parse_threadtime
+from utils.playback_probe import PlaybackProbe, classify_player_log
+
+# ExoPlayer EventLogger 的一次起播 + 卡顿
+EVENT_LOGGER_LINES = """\
+10-19 03:50:26.100  4321  4321 D EventLogger: state [eventTime=0.01, mediaPos=0.00, window=0, BUFFERING]
+10-19 03:50:26.600  4321  4321 D EventLogger: state [eventTime=0.51, mediaPos=0.00, window=0, period=0, READY]
+10-19 03:50:26.650  4321  4321 D EventLogger: renderedFirstFrame [eventTime=0.55, mediaPos=0.00, window=0, period=0, Surface(name=null)/@0x1c7a0d1]
+10-19 03:50:30.000  4321  4321 D EventLogger: playWhenReady [eventTime=3.90, mediaPos=3.34, window=0, period=0, true, USER_REQUEST]
+10-19 03:50:31.000  4321  4321 D EventLogger: state [eventTime=4.90, mediaPos=4.31, window=0, period=0, BUFFERING]
+10-19 03:50:32.250  4321  4321 D EventLogger: state [eventTime=6.15, mediaPos=4.31, window=0, period=0, READY]
+10-19 03:50:40.000  4321  4321 D EventLogger: state [eventTime=13.90, mediaPos=12.00, window=0, period=0, ENDED]
+"""
+
+
+def test_classify_event_logger_lines():
+    kinds = [classify_player_log(f"{record.tag}: {record.message}")
+             for record in map(parse_threadtime, EVENT_LOGGER_LINES.splitlines())]
+    assert kinds == ['rebuffer_start', 'rebuffer_end', 'first_frame', None, 'rebuffer_start', 'rebuffer_end',
+                     'rebuffer_end']
+
+
+def test_exoplayer_rebuffer_closes_on_ready():
+    probe = PlaybackProbe('com.example.player')
+    probe._start = time.monotonic() - 20
+    for offset, line in zip((0.1, 0.6, 0.65, 4.0, 5.0, 6.25, 14.0), EVENT_LOGGER_LINES.splitlines()):
+        probe._on_record(parse_threadtime(line)._replace(t=probe._start + offset))
+    assert [pytest.approx(interval) for interval in probe.rebuffers()] == [(5.0, 6.25)]
+    assert probe.startup_ms(0.0) == 650.0
+    assert probe.summary(0.0)['rebuffer_ms'] == 1250.0
@@ -1,5 +1,187 @@
 import os
+import re
 import sys
+import time
+import yaml
+import pytest
 
 # 添加项目根目录到 Python 路径
-sys.path.append(os.path.dirname(os.path.abspath(__file__))) 
\ No newline at end of file
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.driver_metrics import metrics
+from utils.screenshot_pipeline import get_pipeline, close_pipeline
+from utils.resource_sampler import ResourceSampler
+from utils.logcat_streamer import get_streamer, close_streamers
+from utils.hdc_client import close_shells
+from utils.toast_listener import close_toast_listeners
+
+# WebDriver 命令指标输出目录（metrics.prom / metrics.json）
+COMMAND_METRICS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reports', 'command_metrics')
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'config.yaml')
+
+
+def _test_info():
+    try:
+        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+            return (yaml.safe_load(f) or {}).get('test_info') or {}
+    except (OSError, yaml.YAMLError):
+        return {}
+
+
+_TEST_INFO = _test_info()
+
+
+def _find_driver(item):
+    """从测试参数和测试类实例中找到可截图的 WebDriver（兼容 AppiumDriver 包装）"""
+    sources = list(getattr(item, 'funcargs', {}).values())
+    if getattr(item, 'instance', None) is not None:
+        sources.append(item.instance)
+    for source in sources:
+        for obj in (source, getattr(source, 'driver', None), getattr(getattr(source, 'driver', None), 'driver', None)):
+            if obj is not None and callable(getattr(obj, 'get_screenshot_as_base64', None)) \
+                    and getattr(obj, 'session_id', None):
+                return obj
+    return None
+
+
+def _attach_failure_screenshot(item, report):
+    """失败时截图：测试线程只取 base64，编码写盘在后台完成；同时附加到 pytest-html / allure 报告"""
+    driver = _find_driver(item)
+    if driver is None:
+        return
+    name = re.sub(r'[^\w-]+', '_', item.nodeid)
+    try:
+        path, _, png_base64 = get_pipeline().capture(driver, name)
+    except Exception as e:
+        report.sections.append(('failure screenshot', f"截图失败: {str(e)}"))
+        return
+    report.sections.append(('failure screenshot', path))
+    if item.config.pluginmanager.hasplugin('html'):
+        import pytest_html
+        report.extras = getattr(report, 'extras', []) + [pytest_html.extras.png(png_base64, name)]
+    try:
+        import allure
+        import base64
+        allure.attach(base64.b64decode(png_base64), name=name, attachment_type=allure.attachment_type.PNG)
+    except Exception:
+        pass
+
+
+def _android_target(item):
+    """
+    测试所用的 Android 设备
+    :return: (package, serial)；非 Android 会话或找不到驱动时返回 None
+    """
+    driver = _find_driver(item)
+    if driver is None:
+        return None
+    caps = getattr(driver, 'capabilities', None) or {}
+    if str(caps.get('platformName', '')).lower() != 'android':
+        return None
+    package = caps.get('appPackage') or getattr(driver, 'current_package', None)
+    return package, caps.get('udid') or caps.get('deviceUDID')
+
+
+def _start_resource_sampling(item):
+    """为测试启动资源采样（非 Android 会话或找不到驱动时不采样）"""
+    sampler = getattr(item, '_resource_sampler', None)
+    if sampler is not None:
+        return sampler
+    target = _android_target(item)
+    if target is None or not target[0]:
+        return None
+    item._resource_sampler = ResourceSampler(*target,
+                                             interval=_TEST_INFO.get('resource_sample_interval', 1.0)).start()
+    return item._resource_sampler
+
+
+def _stop_resource_sampling(item):
+    sampler = getattr(item, '_resource_sampler', None)
+    if sampler is not None:
+        item._resource_summary = sampler.stop()
+        item._resource_sampler = None
+
+
+@pytest.fixture
+def resource_sampler(request):
+    """
+    当前测试的设备资源采样器，需放在创建驱动的 fixture 之后；无法采样时为 None
+    test_info.resource_sampling 开启时所有测试都会自动采样，不必显式使用该 fixture
+    """
+    sampler = _start_resource_sampling(request.node)
+    yield sampler
+    _stop_resource_sampling(request.node)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    # 驱动通常在测试类的 fixture 中创建，到 call 阶段才能找到
+    target = _android_target(item) if _TEST_INFO.get('logcat_capture', True) else None
+    if target is not None:
+        item._logcat = (get_streamer(target[1]), target[0], time.monotonic())
+    if _TEST_INFO.get('resource_sampling', False):
+        _start_resource_sampling(item)
+    yield
+    _stop_resource_sampling(item)
+    if target is not None:
+        item._logcat += (time.monotonic(),)
+
+
+def _attach_logcat(item, report):
+    """测试期间应用崩溃 / ANR 时标记失败；失败的测试附加该测试时间窗口内的日志片段"""
+    streamer, package, since, until = item._logcat
+    # 日志到达主机有延迟：等读到测试结束之后的日志（或宽限期已过）再切片，
+    # 测试期间产生、结束后才到达的日志（如崩溃堆栈）时间戳晚于 until，窗口相应延长到等待结束
+    streamer.wait_past(until, _TEST_INFO.get('logcat_grace_period', 1.0))
+    until = time.monotonic()
+    crashes = streamer.crashes(since, until, package)
+    if crashes and report.passed and _TEST_INFO.get('fail_on_crash', True):
+        report.outcome = 'failed'
+        report.longrepr = '\n'.join(f"应用在测试期间发生 {event.kind}: {event.process}" for event in crashes)
+    if report.failed:
+        report.sections.append(('logcat', streamer.slice(since, until, limit=_TEST_INFO.get('logcat_slice_lines', 200))))
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    outcome = yield
+    report = outcome.get_result()
+    if report.failed and report.when in ('setup', 'call') and _TEST_INFO.get('screenshot_on_failure', True):
+        _attach_failure_screenshot(item, report)
+    if report.when != 'call':
+        return
+    if getattr(item, '_logcat', None) and len(item._logcat) == 4:
+        _attach_logcat(item, report)
+    slowest = metrics.top_slow_commands(item.nodeid, 5)
+    if slowest:
+        summary = metrics.test_summary(item.nodeid)
+        lines = [f"共 {summary['commands']} 条命令，总耗时 {summary['total_ms']:.0f}ms，最慢:"]
+        lines += [f"  {entry['latency_ms']:>9.1f}ms  {entry['command']:<24} {entry['caller'] or ''}"
+                  for entry in slowest]
+        report.sections.append(('webdriver commands', '\n'.join(lines)))
+    resources = getattr(item, '_resource_summary', None)
+    if resources:
+        report.sections.append(('device resources', '\n'.join(f"{name}: {value}" for name, value in resources.items())))
+        report.user_properties.append(('device_resources', resources))
+
+
+def pytest_sessionfinish(session, exitstatus):
+    close_pipeline()
+    close_toast_listeners()
+    close_streamers()
+    close_shells()
+    if metrics.latency:
+        metrics.write_artifacts(COMMAND_METRICS_DIR)
+
+
+def pytest_terminal_summary(terminalreporter):
+    data = metrics.to_dict()
+    if not data['commands']:
+        return
+    terminalreporter.section('webdriver commands')
+    terminalreporter.write_line(f"{'command':<32}{'count':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for command, stats in sorted(data['commands'].items(), key=lambda kv: -kv[1]['total_ms']):
+        terminalreporter.write_line(
+            f"{command:<32}{stats['count']:>8}{stats['p50_ms']:>10.1f}{stats['p90_ms']:>10.1f}"
+            f"{stats['p99_ms']:>10.1f}{stats['errors']:>8}")
+    terminalreporter.write_line(f"详细报告: {COMMAND_METRICS_DIR}")
@@ -1,3 +1,5 @@
+import os
+import time
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
@@ -5,22 +7,47 @@
 from appium.webdriver.common.multi_action import MultiAction
 from appium.webdriver.common.appiumby import AppiumBy
 from utils.element_finder import ElementFinder
+from utils.locator_generator import LocatorGenerator
+from utils.xpath_translator import optimize_locator
+from utils.implicit_wait import no_implicit_wait, find_first
+from utils.locator_race import find_first_snapshot, find_first_race
+from utils.screenshot_pipeline import get_pipeline
 from utils.media_elements import VideoElement, AudioElement
+from utils.frame_metrics import FrameMetricsCollector
+from utils.startup_benchmark import StartupBenchmark
+from utils.toast_listener import TOAST_LONG_DURATION
+from utils.platform_backend import backend_for
+from utils.element_batch import DEFAULT_ATTRIBUTES
+from utils.logger import logger
 
 class BasePage:
     def __init__(self, driver):
         self.driver = driver
+        self.backend = backend_for(driver)
         self._wait_timeout = 10
         self.element_finder = ElementFinder(self.driver)
+        self._frame_metrics = None
+        # 创建会话时挂接的 Toast 监听（见 PlatformBackend.create_session），没有时 Toast 查询使用 XPath
+        self.toast_listener = getattr(driver, 'toast_listener', None)
+        # 最近一次界面操作开始的时间（time.monotonic），Toast 查询默认只接受其后出现的
+        self._last_action_at = None
+
+    def _mark_action(self):
+        self._last_action_at = time.monotonic()
+
+    def _wait_until(self, condition, timeout, negate=False):
+        """显式等待条件成立（或不成立），期间隐式等待置 0，总时长严格受 timeout 限制"""
+        with no_implicit_wait(self.driver):
+            wait = WebDriverWait(self.driver, timeout)
+            return wait.until_not(condition) if negate else wait.until(condition)
 
     def find_element(self, locator, timeout=None):
         """查找元素"""
         if timeout is None:
             timeout = self._wait_timeout
         try:
-            element = WebDriverWait(self.driver, timeout).until(
-                EC.presence_of_element_located(locator)
-            )
+            element = self._wait_until(
+                EC.presence_of_element_located(optimize_locator(locator, self.driver)), timeout)
             return element
         except TimeoutException:
             raise TimeoutException(f"Element not found with locator: {locator}")
@@ -30,22 +57,42 @@ def find_elements(self, locator, timeout=None):
         if timeout is None:
             timeout = self._wait_timeout
         try:
-            elements = WebDriverWait(self.driver, timeout).until(
-                EC.presence_of_all_elements_located(locator)
-            )
+            elements = self._wait_until(
+                EC.presence_of_all_elements_located(optimize_locator(locator, self.driver)), timeout)
             return elements
         except TimeoutException:
             return []
 
+    def find_first(self, candidates, timeout=None, mode='snapshot'):
+        """从多个候选定位器中找出第一个命中的元素
+        Args:
+            candidates: [(by, value), ...]，按优先级排列
+            timeout: 总等待上限，默认 self._wait_timeout
+            mode: snapshot - 每轮一次页面快照，本地筛选后只在设备上解析命中的候选；
+                  race - 并发查找所有候选，取最先返回的命中；
+                  sequential - 按顺序逐个查找
+        Returns:
+            (locator, element)，locator 为命中的候选
+        """
+        if timeout is None:
+            timeout = self._wait_timeout
+        strategies = {'snapshot': find_first_snapshot, 'race': find_first_race, 'sequential': find_first}
+        locator, element = strategies[mode](self.driver, list(candidates), timeout)
+        if element is None:
+            raise TimeoutException(f"Element not found with any of: {candidates}")
+        return locator, element
+
     # 基础操作
     def click(self, locator):
         """点击元素"""
         element = self.find_element(locator)
+        self._mark_action()
         element.click()
 
     def input_text(self, locator, text):
         """输入文本"""
         element = self.find_element(locator)
+        self._mark_action()
         element.clear()
         element.send_keys(text)
 
@@ -65,22 +112,27 @@ def is_element_present(self, locator, timeout=3):
     # 手势操作
     def tap(self, x, y, count=1):
         """点击坐标"""
-        TouchAction(self.driver).tap(x=x, y=y, count=count).perform()
+        self._mark_action()
+        self.backend.tap(self.driver, x, y, count)
 
     def press(self, x, y, duration=1000):
         """长按坐标"""
-        TouchAction(self.driver).press(x=x, y=y).wait(duration).release().perform()
+        self._mark_action()
+        self.backend.long_press(self.driver, x, y, duration)
 
     def swipe(self, start_x, start_y, end_x, end_y, duration=None):
         """滑动"""
-        self.driver.swipe(start_x, start_y, end_x, end_y, duration)
+        self._mark_action()
+        self.backend.swipe(self.driver, start_x, start_y, end_x, end_y, duration)
 
     def scroll(self, origin_el, destination_el):
         """元素间滚动"""
+        self._mark_action()
         self.driver.scroll(origin_el, destination_el)
 
     def drag_and_drop(self, origin_el, destination_el):
         """拖拽"""
+        self._mark_action()
         self.driver.drag_and_drop(origin_el, destination_el)
 
     # 多点触控
@@ -110,24 +162,62 @@ def zoom(self, element=None):
             actions.add(action1, action2)
             actions.perform()
 
+    @property
+    def frame_metrics(self):
+        """当前应用的帧渲染统计收集器，results 中保存每次测量的结果"""
+        if self._frame_metrics is None:
+            caps = self.driver.capabilities
+            package = caps.get('appPackage') or self.driver.current_package
+            self._frame_metrics = FrameMetricsCollector(package, caps.get('udid') or caps.get('deviceUDID'))
+        return self._frame_metrics
+
+    def measure_frames(self, label):
+        """测量一段手势操作的帧耗时分位数和卡顿帧比例
+        Args:
+            label: 操作名称，如 'swipe_5_videos'
+        Returns:
+            上下文管理器，退出后产出的字典中填入 p50_ms / p90_ms / p99_ms / janky_percent 等统计
+        """
+        return self.frame_metrics.measure(label)
+
     # 键盘操作
     def hide_keyboard(self):
         """隐藏键盘"""
+        self._mark_action()
         self.driver.hide_keyboard()
 
     def keycode(self, keycode):
         """发送键码"""
+        self._mark_action()
         self.driver.press_keycode(keycode)
 
     # 应用操作
     def background_app(self, seconds):
         """应用切后台"""
+        self._mark_action()
         self.driver.background_app(seconds)
 
     def launch_app(self):
         """启动应用"""
+        self._mark_action()
         self.driver.launch_app()
 
+    def measure_app_start(self, mode='cold', runs=1):
+        """测量应用启动耗时（am start -W）
+        Args:
+            mode: cold - force-stop 后启动；warm - 进程保留、Activity 重新创建（--activity-clear-task）；hot - 回到桌面后启动
+            runs: 启动次数
+        Returns:
+            {'total_time': {...}, 'wait_time': {...}, ...}，时间单位毫秒
+        """
+        caps = self.driver.capabilities
+        bench = StartupBenchmark(caps.get('appPackage') or self.driver.current_package, caps.get('appActivity'),
+                                 caps.get('udid') or caps.get('deviceUDID'))
+        try:
+            return bench.run(mode, runs)
+        finally:
+            bench.close()
+
     def close_app(self):
         """关闭应用"""
         self.driver.close_app()
@@ -155,9 +245,8 @@ def wait_for_element_visible(self, locator, timeout=None):
         if timeout is None:
             timeout = self._wait_timeout
         try:
-            element = WebDriverWait(self.driver, timeout).until(
-                EC.visibility_of_element_located(locator)
-            )
+            element = self._wait_until(
+                EC.visibility_of_element_located(optimize_locator(locator, self.driver)), timeout)
             return element
         except TimeoutException:
             raise TimeoutException(f"Element not visible with locator: {locator}")
@@ -167,21 +256,42 @@ def wait_for_element_clickable(self, locator, timeout=None):
         if timeout is None:
             timeout = self._wait_timeout
         try:
-            element = WebDriverWait(self.driver, timeout).until(
-                EC.element_to_be_clickable(locator)
-            )
+            element = self._wait_until(
+                EC.element_to_be_clickable(optimize_locator(locator, self.driver)), timeout)
             return element
         except TimeoutException:
             raise TimeoutException(f"Element not clickable with locator: {locator}")
 
     # 截图方法
     def take_screenshot(self, filename):
-        """截图"""
-        self.driver.get_screenshot_as_file(filename)
+        """截图
+        测试线程只获取 base64 数据，解码、去重和写盘在后台完成；
+        编码格式取 filename 的扩展名，不带扩展名时使用 config.yaml 中的 screenshot_format。
+        返回的 Future 在文件写入后返回实际路径，需要立即使用文件时调用 future.result()
+        """
+        _, future, _ = get_pipeline().capture(self.driver, os.path.abspath(filename))
+        return future
 
     def get_page_source(self):
         """获取页面源码"""
-        return self.driver.page_source
+        return self.backend.page_source(self.driver)
+
+    def snapshot(self):
+        """当前界面的层级快照
+        Returns:
+            UiHierarchy，由平台后端以最快的方式获取
+        """
+        return self.backend.snapshot(self.driver)
+
+    def query(self, locators, names=DEFAULT_ATTRIBUTES):
+        """在同一份层级快照上批量查询多个定位器
+        Args:
+            locators: [(by, value), ...]
+            names: 要读取的属性名
+        Returns:
+            与 locators 对应的属性字典列表的列表
+        """
+        return self.backend.query(self.driver, locators, names)
 
     # 设备操作
     def get_device_time(self):
@@ -209,21 +319,27 @@ def find_element_smart(self, text=None, id=None):
 
     def generate_page_elements(self):
         """生成页面元素定位代码"""
-        elements = self.driver.find_elements(AppiumBy.XPATH, "//*[@*]")
-        
-        element_codes = []
-        for element in elements:
-            attrs = self.element_finder.record_element_attributes(element)
-            if attrs.get('text') or attrs.get('resource-id'):
-                locator = self.element_finder.generate_locator_code(
-                    attrs.get('text'), 
-                    attrs.get('resource-id')
-                )
-                if locator:
-                    element_name = attrs.get('text', '').lower().replace(' ', '_')
-                    element_codes.append(f"{element_name} = {locator}")
-        
-        return '\n'.join(element_codes)
+        # 基于一次页面快照在本地生成唯一定位器，不再逐个元素向设备查找
+        generator = LocatorGenerator.from_page_source(self.get_page_source())
+        return generator.page_elements_code()
+
+    def generate_page_object(self, class_name='GeneratedPage', path=None, snapshots=1, interval=1.0):
+        """生成当前页面的页面对象文件
+        Args:
+            class_name: 页面对象类名
+            path: 输出文件路径，为 None 时只返回代码
+            snapshots: 快照次数，多于 1 次时按定位器在各快照中是否仍唯一评估稳定性
+            interval: 快照间隔（秒）
+        """
+        sources = [self.get_page_source()]
+        for _ in range(snapshots - 1):
+            time.sleep(interval)
+            sources.append(self.get_page_source())
+        code = LocatorGenerator.from_page_source(sources[0], sources[1:]).page_object_code(class_name)
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(code)
+        return code
 
     # 多媒体元素处理
     def handle_video(self, video_locator):
@@ -237,49 +353,97 @@ def handle_audio(self, audio_locator):
         return AudioElement(self.driver, audio)
 
     # Toast 提示处理
-    def get_toast_text(self, partial_text=None, timeout=3):
+    def attach_toast_listener(self, listener):
+        """使用事件驱动的 Toast 监听（utils.toast_listener.ToastListener）
+        监听处于活动状态时，Toast 相关方法只查询本地缓冲区；否则回退为 XPath 查询
+        """
+        self.toast_listener = listener
+
+    def _listening_for_toasts(self):
+        return self.toast_listener is not None and self.toast_listener.is_active
+
+    @staticmethod
+    def _toast_locator(partial_text=None):
+        if partial_text:
+            return AppiumBy.XPATH, f"//android.widget.Toast[contains(@text,'{partial_text}')]"
+        return AppiumBy.XPATH, "//android.widget.Toast"
+
+    def _toast_since(self, since):
+        """Toast 查询的起始时间：显式传入的 since，否则为最近一次界面操作开始的时间，都没有时往前追溯一个 LENGTH_LONG"""
+        if since is not None:
+            return since
+        if self._last_action_at is not None:
+            return self._last_action_at
+        return time.monotonic() - TOAST_LONG_DURATION
+
+    def get_toast_text(self, partial_text=None, timeout=3, since=None):
         """获取 Toast 提示文本
         Args:
             partial_text: Toast 文本的部分内容，用于定位
             timeout: 等待超时时间
+            since: 只接受该时间（time.monotonic）之后出现的 Toast，默认为最近一次 click / tap / swipe 等操作开始时；
+                   不经 BasePage 触发 Toast 时，在操作前取 time.monotonic() 传入
         """
-        if partial_text:
-            locator = (AppiumBy.XPATH, f"//android.widget.Toast[contains(@text,'{partial_text}')]")
-        else:
-            locator = (AppiumBy.XPATH, "//android.widget.Toast")
+        if self._listening_for_toasts():
+            toast = self.toast_listener.wait_for(partial_text, timeout, since=self._toast_since(since))
+            if toast is not None:
+                return toast.text
+            if self.backend.name != 'uiautomator2':
+                return None
+            # 监听没有捕获时用一次 XPath 确认：UiAutomator2 服务保留最近 3.5 秒内的 Toast，
+            # 能查到说明监听的日志匹配规则（test_info.toast_log_pattern）与设备不符
+            with no_implicit_wait(self.driver):
+                elements = self.driver.find_elements(*self._toast_locator(partial_text))
+            if not elements:
+                return None
+            logger.warning(f"Toast 监听未捕获 {partial_text or 'Toast'}，XPath 查询到了，请检查 Toast 监听的日志匹配规则")
+            return elements[0].get_attribute("text")
+
+        locator = self._toast_locator(partial_text)
         
         try:
-            toast = WebDriverWait(self.driver, timeout).until(
-                EC.presence_of_element_located(locator)
-            )
+            toast = self._wait_until(EC.presence_of_element_located(locator), timeout)
             return toast.get_attribute("text")
         except TimeoutException:
             return None
 
-    def wait_toast_disappear(self, partial_text=None, timeout=3):
+    def wait_toast_disappear(self, partial_text=None, timeout=TOAST_LONG_DURATION + 1, since=None):
         """等待 Toast 消失
+        使用 Toast 监听时事件流只有出现事件，消失时间按 Toast.LENGTH_LONG（3.5 秒）推断：
+        LENGTH_SHORT（2 秒）的 Toast 会多等约 1.5 秒，刚出现的 Toast 需要 timeout 不小于 3.5 秒才能等到消失
         Args:
             partial_text: Toast 文本的部分内容
-            timeout: 等待超时时间
+            timeout: 等待超时时间，默认覆盖一个 LENGTH_LONG
+            since: 同 get_toast_text
+        Returns:
+            timeout 内消失返回 True，否则等满 timeout 后返回 False
         """
-        if partial_text:
-            locator = (AppiumBy.XPATH, f"//android.widget.Toast[contains(@text,'{partial_text}')]")
-        else:
-            locator = (AppiumBy.XPATH, "//android.widget.Toast")
+        if self._listening_for_toasts():
+            since = max(self._toast_since(since), time.monotonic() - TOAST_LONG_DURATION)
+            toast = self.toast_listener.find(partial_text, since)
+            if toast is None:
+                return True
+            remaining = toast.t + TOAST_LONG_DURATION - time.monotonic()
+            if remaining > timeout:
+                time.sleep(timeout)
+                return False
+            time.sleep(max(remaining, 0))
+            return True
+
+        locator = self._toast_locator(partial_text)
             
         try:
-            WebDriverWait(self.driver, timeout).until_not(
-                EC.presence_of_element_located(locator)
-            )
+            self._wait_until(EC.presence_of_element_located(locator), timeout, negate=True)
             return True
         except TimeoutException:
             return False
 
-    def verify_toast(self, expected_text, timeout=3):
+    def verify_toast(self, expected_text, timeout=3, since=None):
         """验证 Toast 提示内容
         Args:
             expected_text: 预期的 Toast 文本
             timeout: 等待超时时间
+            since: 同 get_toast_text
         """
-        actual_text = self.get_toast_text(expected_text, timeout)
-        return actual_text and expected_text in actual_text 
\ No newline at end of file
+        actual_text = self.get_toast_text(expected_text, timeout, since)
+        return actual_text and expected_text in actual_text
@@ -1,6 +1,9 @@
 from pages.base_page import BasePage
 from selenium.webdriver.common.by import By
+from appium.webdriver.common.appiumby import AppiumBy
 from utils.harmony_utils import HarmonyUtils
+from utils.xpath_translator import optimize_locator
+from utils.hypium_driver import HypiumToastListener
 
 class HarmonyBasePage(BasePage):
     """鸿蒙系统页面基类"""
@@ -8,6 +11,9 @@ class HarmonyBasePage(BasePage):
     def __init__(self, driver):
         super().__init__(driver)
         self.harmony_utils = HarmonyUtils()
+        if self.backend.name == 'hypium':
+            # hypium 后端直接订阅 uitest 的 Toast 事件
+            self.attach_toast_listener(HypiumToastListener(self.driver).start())
     
     def handle_harmony_permissions(self):
         """处理鸿蒙系统的权限弹窗"""
@@ -19,7 +25,7 @@ def get_harmony_device_info(self):
     
     def find_element_by_accessibility_id(self, aid):
         """通过 Accessibility ID 查找元素"""
-        return self.driver.find_element_by_accessibility_id(aid)
+        return self.driver.find_element(AppiumBy.ACCESSIBILITY_ID, aid)
     
     def find_element_by_hitest(self, hitest_id):
         """通过鸿蒙 HiTest ID 查找元素"""
@@ -27,4 +33,4 @@ def find_element_by_hitest(self, hitest_id):
     
     def find_element_by_text(self, text):
         """通过文本内容查找元素"""
-        return self.driver.find_element(By.XPATH, f"//*[@text='{text}']")
\ No newline at end of file
+        return self.driver.find_element(*optimize_locator((By.XPATH, f"//*[@text='{text}']"), self.driver))
\ No newline at end of file
@@ -8,6 +8,9 @@
 from utils.test_generator import AutoTestGenerator
 from utils.environment_checker import EnvironmentChecker
 from utils.logger import logger
+from pages.base_page import BasePage
+from appium.webdriver.common.appiumby import AppiumBy
+from selenium.common.exceptions import TimeoutException
 
 class TestAutomation:
     @classmethod
@@ -29,13 +32,6 @@ def setup_class(cls, platform = 'Android Emulator'):
             
             cls.driver = AppiumDriver(platform=platform, check_env=False)
             
-            # 如果是鸿蒙平台，初始化特定工具
-            if platform == 'harmony':
-                from utils.harmony_utils import HarmonyUtils
-                cls.harmony_utils = HarmonyUtils()
-                # 处理权限弹窗
-                cls.harmony_utils.handle_permissions(cls.driver.driver)
-            
             if not cls.driver.start_server():
                 error_msg = "\nAppium 服务器启动失败，请检查:"
                 error_msg += "\n1. Appium 是否正确安装"
@@ -81,6 +77,12 @@ def setup_class(cls, platform = 'Android Emulator'):
                     logger.info(f"错误堆栈:\n{traceback.format_exc()}", file=sys.stderr)
                 pytest.skip(str(e))
             
+            # 鸿蒙设备在会话创建后处理权限弹窗
+            if cls.driver.backend.name == 'hypium':
+                from utils.harmony_utils import HarmonyUtils
+                cls.harmony_utils = HarmonyUtils()
+                cls.harmony_utils.handle_permissions(cls.driver.driver)
+            
             # 4. 初始化 App 检查器
             cls.inspector = AppInspector(cls.driver)
             logger.info("✓ App 检查器初始化成功", file=sys.stderr)
@@ -233,8 +235,8 @@ def test_test_generation(self):
 
     def test_basic_interactions(self):
         """测试 Chrome 浏览器基本交互"""
-        # 1. 查找地址栏 (尝试多种可能的 ID)
-        address_bar = None
+        # 1. 查找地址栏 (尝试多种可能的 ID 和 XPath)
+        # 所有候选基于一次页面快照筛选，只在设备上解析命中的那一个，不再逐个承担未命中的等待
         possible_ids = [
             'url_bar', 
             'search_box_text', 
@@ -242,32 +244,19 @@ def test_basic_interactions(self):
             'com.android.chrome:id/url_bar', 
             'com.android.chrome:id/search_box_text'
         ]
-        
-        for element_id in possible_ids:
-            logger.info(f"尝试查找地址栏元素: {element_id}", file=sys.stderr)
-            elements = self.inspector.find_elements_by_id(element_id)
-            if elements:
-                address_bar = elements[0]
-                logger.info(f"✓ 找到地址栏元素: {element_id}", file=sys.stderr)
-                break
-        
-        # 如果通过 ID 没找到，尝试使用 XPath
-        if not address_bar:
-            logger.info("通过 ID 未找到地址栏，尝试使用 XPath", file=sys.stderr)
-            xpath_expressions = [
-                "//android.widget.EditText[@resource-id='com.android.chrome:id/url_bar']",
-                "//android.widget.EditText[@resource-id='com.android.chrome:id/search_box_text']",
-                "//android.widget.EditText[contains(@resource-id, 'url')]",
-                "//android.widget.EditText[contains(@resource-id, 'search')]"
-            ]
-            
-            for xpath in xpath_expressions:
-                logger.info(f"尝试 XPath: {xpath}", file=sys.stderr)
-                elements = self.driver.find_elements_by_xpath(xpath)
-                if elements:
-                    address_bar = elements[0]
-                    logger.info(f"✓ 通过 XPath 找到地址栏: {xpath}", file=sys.stderr)
-                    break
+        xpath_expressions = [
+            "//android.widget.EditText[@resource-id='com.android.chrome:id/url_bar']",
+            "//android.widget.EditText[@resource-id='com.android.chrome:id/search_box_text']",
+            "//android.widget.EditText[contains(@resource-id, 'url')]",
+            "//android.widget.EditText[contains(@resource-id, 'search')]"
+        ]
+        candidates = [(AppiumBy.ID, element_id) for element_id in possible_ids] + \
+                     [(AppiumBy.XPATH, xpath) for xpath in xpath_expressions]
+        try:
+            locator, address_bar = BasePage(self.driver.driver).find_first(candidates, timeout=5)
+            logger.info(f"✓ 找到地址栏: {locator}", file=sys.stderr)
+        except TimeoutException:
+            address_bar = None
         
         assert address_bar, "未找到地址栏"
         
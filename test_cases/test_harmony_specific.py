@@ -7,8 +7,9 @@ class TestHarmonySpecific:
     @pytest.fixture(autouse=True)
     def setup(self):
         self.driver = AppiumDriver(platform='harmony', check_env=False)
+        self.driver.create_session()
         self.harmony_utils = HarmonyUtils()
-        self.base_page = HarmonyBasePage(self.driver)
+        self.base_page = HarmonyBasePage(self.driver.driver)
         yield
         self.driver.quit()
 
@@ -0,0 +1,275 @@
+import time
+import queue
+import threading
+from collections import namedtuple
+from selenium.common.exceptions import WebDriverException
+from utils.platform_backend import backend_for
+from utils.screen_fingerprint import ScreenFingerprint, FingerprintIndex
+from utils.logger import logger
+
+# 点击动作：记录设备上的坐标、便于阅读的描述、节点键 (class, resource-id, desc/text)
+# 以及相对屏幕尺寸的坐标；在其他设备上重放时先按节点键定位，找不到再按相对坐标点击
+CrawlAction = namedtuple('CrawlAction', ['x', 'y', 'label', 'key', 'rx', 'ry'])
+
+
+class ScreenState:
+    """爬取过程中发现的一个界面状态"""
+
+    def __init__(self, fingerprint, activity, hierarchy, path, depth):
+        self.fingerprint = fingerprint
+        self.activity = activity
+        self.hierarchy = hierarchy
+        # 从应用启动页到达该界面的点击序列
+        self.path = path
+        self.depth = depth
+        # 无法重放路径到达该界面的设备（id(driver)）
+        self.unreachable = set()
+
+
+class AppCrawler:
+    """
+    广度优先的应用爬虫
+    以界面结构指纹作为已访问集合的键，frontier 中保存待展开的界面，
+    每个界面只通过一次 page_source 快照分析，点击使用坐标而非元素句柄，
+    多个设备共享同一个 frontier 和已访问集合并行展开；
+    设备分辨率可能不同，重放路径时按节点键在当前快照中重新定位，找不到时按相对坐标换算，
+    某台设备无法到达的界面交给其他设备展开
+    """
+
+    def __init__(self, drivers, max_depth=3, time_budget=300, max_actions_per_screen=30,
+                 settle_timeout=5, settle_interval=0.3, app_package=None, near_duplicate_threshold=0.95):
+        """
+        :param drivers: 一个或多个 WebDriver（或 AppiumDriver）实例
+        :param max_depth: 最大点击深度
+        :param time_budget: 总时间预算（秒）
+        :param max_actions_per_screen: 每个界面最多尝试的点击数
+        :param settle_timeout: 等待界面稳定的最长时间（秒）
+        :param settle_interval: 界面稳定检测的轮询间隔（秒）
+        :param app_package: 被测应用包名，默认取第一个设备的当前包名
+        :param near_duplicate_threshold: 与已访问界面结构相似度达到该值时视为同一界面，None 表示只做精确匹配
+        """
+        if not isinstance(drivers, (list, tuple)):
+            drivers = [drivers]
+        self.drivers = [getattr(d, 'driver', None) or d for d in drivers]
+        self._backends = {id(driver): backend_for(driver) for driver in self.drivers}
+        self._window_sizes = {}
+        self.max_depth = max_depth
+        self.time_budget = time_budget
+        self.max_actions_per_screen = max_actions_per_screen
+        self.settle_timeout = settle_timeout
+        self.settle_interval = settle_interval
+        self.app_package = app_package
+        self.near_duplicate_threshold = near_duplicate_threshold
+
+        self.states = {}
+        self.visited = FingerprintIndex(threshold=near_duplicate_threshold or 1.0)
+        self._frontier = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._deadline = None
+
+    # 快照与等待
+    def _snapshot(self, driver):
+        hierarchy = self._backends[id(driver)].snapshot(driver)
+        return hierarchy, ScreenFingerprint.from_hierarchy(hierarchy)
+
+    def _wait_settled(self, driver):
+        """轮询直到连续两次快照结构一致，替代固定 sleep"""
+        hierarchy, fingerprint = self._snapshot(driver)
+        end = time.time() + self.settle_timeout
+        while time.time() < end:
+            time.sleep(self.settle_interval)
+            next_hierarchy, next_fingerprint = self._snapshot(driver)
+            if next_fingerprint == fingerprint:
+                return next_hierarchy, next_fingerprint
+            hierarchy, fingerprint = next_hierarchy, next_fingerprint
+        return hierarchy, fingerprint
+
+    def _current_activity(self, driver):
+        try:
+            return driver.current_activity
+        except WebDriverException:
+            return ''
+
+    def _out_of_budget(self):
+        return time.time() >= self._deadline
+
+    def _window_size(self, driver):
+        size = self._window_sizes.get(id(driver))
+        if size is None:
+            window = driver.get_window_size()
+            size = self._window_sizes[id(driver)] = (window['width'], window['height'])
+        return size
+
+    # 导航
+    def _restart_app(self, driver):
+        driver.terminate_app(self.app_package)
+        driver.activate_app(self.app_package)
+
+    @staticmethod
+    def _node_key(node):
+        return node.cls, node.resource_id, node.desc or node.text
+
+    def _replay_point(self, driver, action, hierarchy):
+        """在当前设备上重放点击的坐标：优先按节点键在当前快照中定位，找不到时按相对坐标换算"""
+        for node in hierarchy.clickable_nodes():
+            if self._node_key(node) == action.key:
+                return node.center
+        width, height = self._window_size(driver)
+        return round(action.rx * width), round(action.ry * height)
+
+    def _navigate_to(self, driver, state):
+        """重启应用并重放点击序列到达目标界面"""
+        self._restart_app(driver)
+        hierarchy, _ = self._wait_settled(driver)
+        for action in state.path:
+            driver.tap([self._replay_point(driver, action, hierarchy)])
+            hierarchy, _ = self._wait_settled(driver)
+        return self._snapshot(driver)[1] == state.fingerprint
+
+    def _return_to(self, driver, state):
+        """优先使用返回键回到上一界面，失败时重放路径"""
+        try:
+            driver.back()
+            if self._wait_settled(driver)[1] == state.fingerprint:
+                return True
+        except WebDriverException:
+            pass
+        return self._navigate_to(driver, state)
+
+    def _candidate_actions(self, driver, hierarchy):
+        """从当前设备的快照中选取待点击的节点，同一 id/class 组合只点一次"""
+        actions = []
+        seen = set()
+        width, height = self._window_size(driver)
+        for node in hierarchy.clickable_nodes():
+            if self.app_package and node.package and node.package != self.app_package:
+                continue
+            key = self._node_key(node)
+            if key in seen:
+                continue
+            seen.add(key)
+            x, y = node.center
+            label = node.desc or node.text or node.resource_id or node.cls
+            actions.append(CrawlAction(x, y, label, key, x / width, y / height))
+            if len(actions) >= self.max_actions_per_screen:
+                break
+        return actions
+
+    # 状态登记
+    def _register(self, driver, hierarchy, fingerprint, path, depth):
+        with self._lock:
+            if fingerprint in self.visited:
+                return None
+            if self.near_duplicate_threshold and self.visited.find_similar(fingerprint):
+                # 近似重复的界面只记录指纹，不再展开
+                self.visited.add(fingerprint)
+                return None
+            state = ScreenState(fingerprint, self._current_activity(driver), hierarchy, path, depth)
+            self.visited.add(fingerprint, state)
+            self.states[fingerprint.digest] = state
+            if depth < self.max_depth:
+                self._pending += 1
+                self._frontier.put(state)
+        logger.info(f"发现新界面 [{depth}] {state.activity} ({fingerprint.digest[:8]})，共 {len(self.states)} 个")
+        return state
+
+    def _defer(self, driver, state):
+        """当前设备无法到达该界面：交给其他设备展开，所有设备都无法到达时放弃"""
+        with self._lock:
+            state.unreachable.add(id(driver))
+            if len(state.unreachable) < len(self.drivers):
+                self._pending += 1
+                self._frontier.put(state)
+                logger.info(f"无法到达界面 {state.fingerprint.digest[:8]}，交给其他设备展开")
+                return
+        logger.warning(f"所有设备都无法到达界面 {state.fingerprint.digest[:8]}，放弃展开")
+
+    def _expand(self, driver, state):
+        """
+        展开一个界面：逐个点击候选节点，登记新出现的界面
+        界面可能由分辨率不同的设备发现，候选节点取自本设备上的快照，坐标与本设备一致
+        """
+        hierarchy, fingerprint = self._snapshot(driver)
+        if fingerprint != state.fingerprint:
+            if not self._navigate_to(driver, state):
+                self._defer(driver, state)
+                return
+            hierarchy = self._snapshot(driver)[0]
+
+        for action in self._candidate_actions(driver, hierarchy):
+            if self._out_of_budget():
+                return
+            try:
+                driver.tap([(action.x, action.y)])
+                hierarchy, fingerprint = self._wait_settled(driver)
+                if fingerprint == state.fingerprint:
+                    continue
+
+                if self.app_package and driver.current_package != self.app_package:
+                    logger.debug(f"点击 {action.label} 离开了被测应用，忽略")
+                else:
+                    self._register(driver, hierarchy, fingerprint, state.path + (action,), state.depth + 1)
+
+                if not self._return_to(driver, state):
+                    logger.warning(f"无法回到界面 {state.fingerprint.digest[:8]}，停止展开")
+                    return
+            except WebDriverException as e:
+                logger.warning(f"点击 {action.label} 失败: {str(e)}")
+                # 点击可能已生效或会话停在其他界面，回到本界面后再继续
+                try:
+                    returned = self._return_to(driver, state)
+                except WebDriverException:
+                    returned = False
+                if not returned:
+                    logger.warning(f"无法回到界面 {state.fingerprint.digest[:8]}，停止展开")
+                    return
+
+    def _worker(self, driver):
+        while not self._out_of_budget():
+            try:
+                state = self._frontier.get(timeout=0.5)
+            except queue.Empty:
+                with self._lock:
+                    if self._pending == 0:
+                        return
+                continue
+            if id(driver) in state.unreachable:
+                # 本设备已无法到达，放回队列留给其他设备
+                self._frontier.put(state)
+                time.sleep(0.5)
+                continue
+            try:
+                self._expand(driver, state)
+            except Exception as e:
+                logger.error(f"展开界面 {state.fingerprint.digest[:8]} 失败: {str(e)}")
+            finally:
+                with self._lock:
+                    self._pending -= 1
+
+    def crawl(self):
+        """
+        从当前界面开始爬取
+        :return: 指纹摘要 -> ScreenState
+        """
+        self._deadline = time.time() + self.time_budget
+        driver = self.drivers[0]
+        if not self.app_package:
+            self.app_package = driver.current_package
+
+        hierarchy, fingerprint = self._wait_settled(driver)
+        self._register(driver, hierarchy, fingerprint, (), 0)
+
+        threads = [
+            threading.Thread(target=self._worker, args=(d,), name=f'crawler-{i}', daemon=True)
+            for i, d in enumerate(self.drivers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if self._out_of_budget():
+            logger.warning(f"爬取达到时间预算 {self.time_budget}s，剩余 {self._frontier.qsize()} 个界面未展开")
+        logger.info(f"爬取完成，共发现 {len(self.states)} 个界面")
+        return self.states
@@ -1,20 +1,50 @@
 from appium.webdriver.common.appiumby import AppiumBy
 import yaml
 import time
+import copy
+import hashlib
+from collections import OrderedDict
 from selenium.common.exceptions import StaleElementReferenceException, NoSuchElementException, WebDriverException
 from utils.logger import logger
+from utils.feature_diff import diff_app_features
+from utils.app_crawler import AppCrawler
+from utils.screen_fingerprint import ScreenFingerprint
+from utils.xpath_translator import optimize_locator
+from utils.implicit_wait import no_implicit_wait
+from utils.platform_backend import backend_for
+
+# app_features 中手工维护、爬取不会生成的字段
+HAND_WRITTEN_FIELDS = ('validations', 'gestures', 'media')
+# 元素地图缓存保留的页面数，超出时淘汰最久未使用的
+ELEMENT_MAP_CACHE_SIZE = 32
 
 class AppInspector:
     """应用检查器"""
     
-    def __init__(self, driver):
+    def __init__(self, driver, crawl_options=None, crawl_drivers=None):
         """
         初始化应用检查器
         :param driver: AppiumDriver 实例
+        :param crawl_options: config.yaml 的 crawler 配置（max_depth、time_budget 等 AppCrawler 参数）
+        :param crawl_drivers: 参与并行爬取的其他设备的会话，见 AppiumDriver.create_inspector
         """
         self.driver = driver
+        # devices 由 AppiumDriver 用于创建 crawl_drivers，不是 AppCrawler 的参数
+        self.crawl_options = {'max_depth': 2, 'time_budget': 120,
+                              **{k: v for k, v in (crawl_options or {}).items() if k != 'devices'}}
+        # 参与并行爬取的其他设备
+        self.crawl_drivers = list(crawl_drivers or [])
         self.page_source = None
         self.element_map = {}
+        # 最近一次 update_config 产生的 app_features 变更
+        self.last_feature_diff = {}
+        # 按完整页面源码摘要缓存的元素地图；结构指纹不含文本，不能作为缓存键
+        self._element_map_cache = OrderedDict()
+
+    @property
+    def _raw_driver(self):
+        """底层 WebDriver（兼容传入 AppiumDriver 封装的情况）"""
+        return getattr(self.driver, 'driver', None) or self.driver
 
     def get_app_info(self):
         """获取应用基础信息"""
@@ -41,33 +71,11 @@ def _scan_app_features(self):
             # 等待应用加载
             time.sleep(3)
             
-            # 获取所有可见元素
-            elements = self.driver.find_elements(AppiumBy.XPATH, "//*[@*]")
-            
-            # 分析界面结构
-            current_activity = self.driver.current_activity
-            feature_name = current_activity.split('.')[-1].lower()
-            
-            elements_info = []
-            for element in elements:
-                try:
-                    element_info = {
-                        'name': element.get_attribute('content-desc') or element.text or element.tag_name,
-                        'type': self._guess_element_type(element),
-                        'id': element.get_attribute('resource-id'),
-                        'class': element.get_attribute('class'),
-                        'clickable': element.get_attribute('clickable'),
-                        'bounds': element.get_attribute('bounds')
-                    }
-                    elements_info.append(element_info)
-                except (StaleElementReferenceException, NoSuchElementException):
-                    continue
-
-            features[feature_name] = {
-                'description': f"{feature_name} 模块",
-                'activity': current_activity,
-                'elements': elements_info
-            }
+            # 一次快照获取整个界面结构
+            hierarchy = backend_for(self._raw_driver).snapshot(self._raw_driver)
+            fingerprint = ScreenFingerprint.from_hierarchy(hierarchy)
+            self._add_feature(features, self._raw_driver.current_activity, fingerprint,
+                              self._elements_from_hierarchy(hierarchy))
 
             # 尝试进行页面导航和扫描其他页面
             self._scan_other_pages(features)
@@ -77,9 +85,32 @@ def _scan_app_features(self):
             logger.error(f"扫描应用功能失败: {str(e)}")
             return {}
 
+    def _add_feature(self, features, activity, fingerprint, elements):
+        """
+        登记一个界面，同一 activity 下结构不同的界面（fragment、Compose 页面）分别记录
+        :return: 功能模块名
+        """
+        base_name = (activity or '').split('.')[-1].lower() or 'screen'
+        feature_name = base_name
+        existing = features.get(feature_name)
+        if existing and existing.get('fingerprint') != fingerprint.digest:
+            feature_name = f"{base_name}_{fingerprint.digest[:6]}"
+        features[feature_name] = {
+            'description': f"{feature_name} 模块",
+            'activity': activity,
+            'fingerprint': fingerprint.digest,
+            'elements': elements
+        }
+        return feature_name
+
     def _guess_element_type(self, element):
         """推测元素类型"""
-        class_name = element.get_attribute('class').lower()
+        return self._guess_type_from_class(element.get_attribute('class'))
+
+    @staticmethod
+    def _guess_type_from_class(class_name):
+        """根据 class 名称推测元素类型"""
+        class_name = (class_name or '').lower()
         if 'edit' in class_name:
             return 'input'
         elif 'button' in class_name:
@@ -96,60 +127,37 @@ def _guess_element_type(self, element):
             return 'audio'
         return 'unknown'
 
+    def _elements_from_hierarchy(self, hierarchy):
+        """从层级快照中提取元素信息，无需逐个元素请求属性"""
+        return [
+            {
+                'name': node.desc or node.text or node.tag,
+                'type': self._guess_type_from_class(node.cls),
+                'id': node.resource_id,
+                'class': node.cls,
+                'clickable': node.attrs.get('clickable'),
+                'bounds': node.attrs.get('bounds')
+            }
+            for node in hierarchy
+        ]
+
     def _scan_other_pages(self, features):
-        """扫描其他页面"""
+        """通过广度优先爬取扫描其他页面"""
         try:
-            # 查找可点击元素
-            clickable_elements = self.driver.find_elements(
-                AppiumBy.XPATH, "//*[@clickable='true']")
-            
-            for element in clickable_elements[:5]:  # 限制扫描深度
-                try:
-                    # 记录当前页面
-                    original_activity = self.driver.current_activity
-                    
-                    # 点击元素进入新页面
-                    element.click()
-                    time.sleep(2)
-                    
-                    # 如果进入了新页面
-                    new_activity = self.driver.current_activity
-                    if new_activity != original_activity:
-                        # 扫描新页面
-                        elements = self.driver.find_elements(AppiumBy.XPATH, "//*[@*]")
-                        feature_name = new_activity.split('.')[-1].lower()
-                        
-                        elements_info = []
-                        for el in elements:
-                            try:
-                                element_info = {
-                                    'name': el.get_attribute('content-desc') or el.text or el.tag_name,
-                                    'type': self._guess_element_type(el),
-                                    'id': el.get_attribute('resource-id'),
-                                    'class': el.get_attribute('class'),
-                                    'clickable': el.get_attribute('clickable'),
-                                    'bounds': el.get_attribute('bounds')
-                                }
-                                elements_info.append(element_info)
-                            except (StaleElementReferenceException, NoSuchElementException):
-                                continue
-
-                        features[feature_name] = {
-                            'description': f"{feature_name} 模块",
-                            'activity': new_activity,
-                            'elements': elements_info
-                        }
-                        
-                        # 返回上一页
-                        self.driver.back()
-                        time.sleep(1)
-                except (StaleElementReferenceException, NoSuchElementException, WebDriverException):
+            crawler = AppCrawler([self.driver] + list(self.crawl_drivers), **self.crawl_options)
+            states = crawler.crawl()
+            for state in states.values():
+                # 起始界面已由 _scan_app_features 记录
+                if state.depth == 0:
                     continue
+                self._add_feature(features, state.activity, state.fingerprint,
+                                  self._elements_from_hierarchy(state.hierarchy))
         except Exception as e:
             logger.error(f"扫描其他页面失败: {str(e)}")
 
     def update_config(self, config_path):
         """更新配置文件"""
+        self.last_feature_diff = {}
         try:
             # 获取应用信息
             app_info = self.get_app_info()
@@ -167,11 +175,25 @@ def update_config(self, config_path):
                     'appActivity': app_info['app_basic']['activity_name']
                 })
 
-            # 更新或添加功能描述
-            if 'app_features' not in config:
-                config['app_features'] = {}
-            
-            config['app_features'].update(app_info['app_features'])
+            # 以本次爬取结果替换功能描述，已消失的模块随之删除
+            new_features = app_info['app_features']
+            if not new_features:
+                logger.warning("未扫描到任何功能模块，保留原有 app_features")
+                return False
+            old_features = config.get('app_features') or {}
+            for module, info in new_features.items():
+                # 手工维护的校验数据、手势、媒体配置无法爬取得到，沿用原有内容
+                for field in HAND_WRITTEN_FIELDS:
+                    if field not in info and field in old_features.get(module, {}):
+                        info[field] = copy.deepcopy(old_features[module][field])
+            config['app_features'] = new_features
+
+            # 逐模块、逐元素记录变更，供增量生成测试使用
+            self.last_feature_diff = diff_app_features(old_features, config['app_features'])
+            if not self.last_feature_diff:
+                logger.info("app_features 未发生变化，跳过写入配置文件")
+                return True
+            logger.info(f"app_features 变更模块: {', '.join(self.last_feature_diff)}")
 
             # 保存更新后的配置
             with open(config_path, 'w', encoding='utf-8') as f:
@@ -190,13 +212,15 @@ def analyze_current_page(self):
         self.page_source = self.driver.get_page_source()
         return self._parse_page_source()
 
-    def find_interactive_elements(self):
+    def find_interactive_elements(self, elements=None):
         """
         查找页面中的可交互元素
+        :param elements: 已解析的页面元素，默认重新获取当前页面
         :return: 可交互元素列表
         """
         try:
-            elements = self.analyze_current_page()
+            if elements is None:
+                elements = self.analyze_current_page()
             if not elements:
                 logger.warning("未找到页面元素，无法查找可交互元素")
                 return []
@@ -230,12 +254,13 @@ def find_elements_by_type(self, element_type):
         :return: 元素列表
         """
         try:
-            if element_type == 'button':
-                return self.driver.find_elements_by_xpath('//*[@type="button" or contains(@class, "button")]')
-            elif element_type == 'input':
-                return self.driver.find_elements_by_xpath('//*[@type="text" or @type="input"]')
-            elif element_type == 'switch':
-                return self.driver.find_elements_by_xpath('//*[@type="switch" or contains(@class, "switch")]')
+            with no_implicit_wait(self._raw_driver):
+                if element_type == 'button':
+                    return self.driver.find_elements_by_xpath('//*[@type="button" or contains(@class, "button")]')
+                elif element_type == 'input':
+                    return self.driver.find_elements_by_xpath('//*[@type="text" or @type="input"]')
+                elif element_type == 'switch':
+                    return self.driver.find_elements_by_xpath('//*[@type="switch" or contains(@class, "switch")]')
         except Exception as e:
             logger.error(f"查找元素失败: {str(e)}")
             return []
@@ -254,26 +279,30 @@ def find_elements_by_id(self, element_id):
             # 尝试多种定位策略
             elements = []
             
-            # 1. 直接使用 ID 定位
-            try:
-                from appium.webdriver.common.appiumby import AppiumBy
-                elements = self.driver.driver.find_elements(AppiumBy.ID, element_id)
-            except Exception as e1:
-                logger.warning(f"通过 ID 直接定位失败: {str(e1)}")
-                
-                # 2. 尝试使用 resource-id 属性定位
+            # 探测性查找：隐式等待置 0，未命中立即返回
+            with no_implicit_wait(self.driver.driver):
+                # 1. 直接使用 ID 定位
                 try:
-                    xpath = f"//*[@resource-id='{element_id}']"
-                    elements = self.driver.driver.find_elements(AppiumBy.XPATH, xpath)
-                except Exception as e2:
-                    logger.warning(f"通过 resource-id 定位失败: {str(e2)}")
-                    
-                    # 3. 尝试使用部分匹配
+                    from appium.webdriver.common.appiumby import AppiumBy
+                    elements = self.driver.driver.find_elements(AppiumBy.ID, element_id)
+                except Exception as e1:
+                    logger.warning(f"通过 ID 直接定位失败: {str(e1)}")
+                
+                    # 2. 尝试使用 resource-id 属性定位
                     try:
-                        xpath = f"//*[contains(@resource-id, '{element_id}')]"
-                        elements = self.driver.driver.find_elements(AppiumBy.XPATH, xpath)
-                    except Exception as e3:
-                        logger.warning(f"通过部分 ID 匹配定位失败: {str(e3)}")
+                        xpath = f"//*[@resource-id='{element_id}']"
+                        elements = self.driver.driver.find_elements(
+                            *optimize_locator((AppiumBy.XPATH, xpath), self.driver.driver))
+                    except Exception as e2:
+                        logger.warning(f"通过 resource-id 定位失败: {str(e2)}")
+                    
+                        # 3. 尝试使用部分匹配
+                        try:
+                            xpath = f"//*[contains(@resource-id, '{element_id}')]"
+                            elements = self.driver.driver.find_elements(
+                                *optimize_locator((AppiumBy.XPATH, xpath), self.driver.driver))
+                        except Exception as e3:
+                            logger.warning(f"通过部分 ID 匹配定位失败: {str(e3)}")
             
             logger.info(f"通过 ID '{element_id}' 找到 {len(elements)} 个元素")
             return elements
@@ -287,17 +316,30 @@ def generate_element_map(self):
         :return: 元素地图字典
         """
         try:
-            elements = self.analyze_current_page()
+            # 页面源码与已生成过的地图完全一致时直接复用，不再解析；返回副本，调用方修改不影响缓存
+            self.page_source = self.driver.get_page_source()
+            source_digest = hashlib.sha1((self.page_source or '').encode('utf-8')).hexdigest()
+            cached = self._element_map_cache.get(source_digest)
+            if cached:
+                self._element_map_cache.move_to_end(source_digest)
+                logger.info(f"页面未变化 ({source_digest[:8]})，复用元素地图")
+                element_map = copy.deepcopy(cached)
+                element_map['timestamp'] = time.strftime('%Y-%m-%d %H:%M:%S')
+                return element_map
+
+            elements = self._parse_page_source()
             if not elements:
                 logger.warning("未找到页面元素，无法生成元素地图")
                 return {}
+            fingerprint = ScreenFingerprint.from_page_source(self.page_source)
             
             # 生成元素地图
             element_map = {
                 'page_title': 'Chrome 浏览器页面',
                 'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'fingerprint': fingerprint.digest,
                 'total_elements': len(elements),
-                'interactive_elements': len(self.find_interactive_elements()),
+                'interactive_elements': len(self.find_interactive_elements(elements)),
                 'elements': {}
             }
             
@@ -312,6 +354,9 @@ def generate_element_map(self):
                     'attributes': element.get('attributes', {})
                 })
             
+            self._element_map_cache[source_digest] = copy.deepcopy(element_map)
+            if len(self._element_map_cache) > ELEMENT_MAP_CACHE_SIZE:
+                self._element_map_cache.popitem(last=False)
             logger.info(f"生成元素地图，包含 {len(element_map['elements'])} 种元素类型")
             return element_map
         except Exception as e:
@@ -1,4 +1,3 @@
-from appium import webdriver
 import yaml
 import os
 from utils.app_inspector import AppInspector
@@ -11,10 +10,19 @@
 from appium.webdriver.common.appiumby import AppiumBy
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.keys import Keys
-from appium.options.android import UiAutomator2Options
+from appium.webdriver.appium_connection import AppiumConnection
+from utils.session_replay import SessionRecorder
+from utils.xpath_translator import optimize_locator
+from utils.implicit_wait import set_implicit_wait
+from utils.platform_backend import get_backend, DEFAULT_AUTOMATION
 
 class AppiumDriver:
-    def __init__(self, platform='android emulator', check_env=True):
+    def __init__(self, platform='android emulator', check_env=True, device_config=None):
+        """
+        :param platform: config.yaml devices 下的平台名
+        :param check_env: 是否检查测试环境
+        :param device_config: 使用的设备配置，默认按 DEVICE_NAME / test_info.default_device 选择
+        """
         self.platform = platform.lower()
         # 添加鸿蒙 OS 平台支持
         if self.platform not in ['ios', 'android', 'harmony', 'android emulator', 'ios emulator']:
@@ -23,14 +31,11 @@ def __init__(self, platform='android emulator', check_env=True):
         self.driver = None
         self.platform = platform.lower()
         self.server_process = None
-        
-        # 环境检查
-        if check_env:
-            checker = EnvironmentChecker()
-            results = checker.check_all()
-            if not results['status']:
-                checker.print_report()
-                raise EnvironmentError("环境配置不完整，请按建议进行安装配置")
+        self.recorder = None
+        self.backend = None
+        self.device_config = device_config
+        # 为并行爬取创建的其他设备的 AppiumDriver，quit 时一并关闭
+        self.crawl_sessions = []
         
         logger.info(f"初始化 {platform.upper()} 测试环境...")
         
@@ -41,14 +46,26 @@ def __init__(self, platform='android emulator', check_env=True):
         except Exception as e:
             logger.error(f"✗ 配置文件加载失败: {str(e)}")
             raise
+
+        # 环境检查
+        if check_env:
+            checker = EnvironmentChecker()
+            if self.platform == 'harmony':
+                # 鸿蒙设备经 hdc 直连，只检查 hdc、设备状态和被测应用是否已安装
+                results = checker.check_harmony_environment(self._select_device_config().get('appPackage'))
+            else:
+                results = checker.check_all()
+            if not results['status']:
+                checker.print_report()
+                raise EnvironmentError("环境配置不完整，请按建议进行安装配置")
         
         # 设置 Appium 服务器地址
         self.appium_host = self.config.get('appium_server', {}).get('host') or os.getenv('APPIUM_HOST', 'localhost')
         self.appium_port = self.config.get('appium_server', {}).get('port') or os.getenv('APPIUM_PORT', '4723')
         logger.info(f"✓ Appium 服务器地址: {self.appium_host}:{self.appium_port}")
 
-        # 获取可用的 Android 虚拟设备
-        if self.platform == 'android emulator':
+        # 获取可用的 Android 虚拟设备（爬取用的附加会话指定了设备配置，不再启动模拟器）
+        if self.platform == 'android emulator' and device_config is None:
             avd_list = subprocess.run(['emulator', '-list-avds'], capture_output=True, text=True).stdout.strip().split('\n')
             if not avd_list:
                 raise ValueError("未找到可用的 Android 虚拟设备。请确保已安装并配置了 Android Studio 的虚拟设备。")
@@ -77,7 +94,10 @@ def _load_config(self):
             raise RuntimeError(f"加载配置文件失败: {str(e)}") from e
 
     def create_session(self):
-        """创建 Appium 会话"""
+        """创建会话，由设备配置的 automationName 选择平台后端"""
+        caps = self._get_device_capabilities()
+        if not self.backend.requires_appium_server:
+            return self._create_native_session(caps)
         logger.info("创建 Appium 会话...")
         try:
             # 1. 检查 Appium 服务器状态
@@ -107,7 +127,7 @@ def create_session(self):
                     raise ConnectionError(error_msg)
 
             # 3. 检查 Appium 设置应用
-            if not self._check_appium_settings():
+            if self.backend.name == 'uiautomator2' and not self._check_appium_settings():
                 error_msg = "\n系统自带通讯录应用未正确安装，请检查:\n"
                 error_msg += "1. 通讯录应用是否已安装\n"
                 error_msg += "2. 应用权限是否正确\n"
@@ -116,8 +136,7 @@ def create_session(self):
                 error_msg += "1. 检查通讯录应用安装: adb shell pm list packages | grep com.android.chrome\n"
                 raise RuntimeError(error_msg)
 
-            # 4. 获取并验证设备配置
-            caps = self._get_device_capabilities()
+            # 4. 设备配置
             server_url = f'http://{self.appium_host}:{self.appium_port}/wd/hub'
             logger.info(f"✓ 正在连接服务器: {server_url}")
             logger.info(f"✓ 使用配置参数: {caps}")
@@ -143,33 +162,35 @@ def create_session(self):
                 # 记录开始时间
                 start_time = time.time()
                 
-                # 确保 Chrome 应用已安装并可用
-                logger.info("检查 Chrome 应用是否已安装...")
-                result = subprocess.run(
-                    ['adb', '-s', 'emulator-5554', 'shell', 'pm', 'list', 'packages', 'com.android.chrome'],
-                    capture_output=True,
-                    text=True
-                )
-                # todo 检查应用是否可用
-                if 'com.android.chrome' not in result.stdout:
-                    logger.error("Chrome 应用未安装，尝试安装...")
-                    # 可以在这里添加安装 Chrome 的代码
+                if self.backend.name == 'uiautomator2':
+                    # 确保 Chrome 应用已安装并可用
+                    logger.info("检查 Chrome 应用是否已安装...")
+                    result = subprocess.run(
+                        ['adb', '-s', 'emulator-5554', 'shell', 'pm', 'list', 'packages', 'com.android.chrome'],
+                        capture_output=True,
+                        text=True
+                    )
+                    # todo 检查应用是否可用
+                    if 'com.android.chrome' not in result.stdout:
+                        logger.error("Chrome 应用未安装，尝试安装...")
+                        # 可以在这里添加安装 Chrome 的代码
                 
-                # 确保 UiAutomator2 服务已安装
-                logger.info("确保 UiAutomator2 服务已安装...")
-                subprocess.run(['appium', 'driver', 'install', 'uiautomator2'], capture_output=True)
+                # 确保平台对应的 Appium 驱动已安装
+                if self.backend.appium_driver:
+                    logger.info(f"确保 {self.backend.appium_driver} 驱动已安装...")
+                    subprocess.run(['appium', 'driver', 'install', self.backend.appium_driver], capture_output=True)
                 
                 # 直接初始化 WebDriver
                 logger.info(f"连接 Appium 服务器: {server_url}")
                 logger.info(f"使用配置参数: {caps}")
-                self.driver = webdriver.Remote(server_url, options=UiAutomator2Options().load_capabilities(caps))
+                self.driver = self.backend.create_session(caps, self._command_executor(server_url))
                 
                 # 计算耗时
                 elapsed_time = time.time() - start_time
                 logger.info(f"✓ WebDriver 初始化成功，耗时 {elapsed_time:.1f} 秒")
                 
                 # 7. 设置等待时间
-                self.driver.implicitly_wait(self.config['test_info']['implicit_wait'])
+                set_implicit_wait(self.driver, self.config['test_info']['implicit_wait'])
                 logger.info(f"✓ 设置隐式等待时间: {self.config['test_info']['implicit_wait']}秒")
                 logger.info("✓ Appium 会话创建成功")
                 
@@ -228,6 +249,86 @@ def create_session(self):
             logger.error(error_msg)
             raise RuntimeError(error_msg) from e
 
+    def _create_native_session(self, caps):
+        """不经过 Appium 服务的后端（如鸿蒙 hypium 经 hdc 直连设备）"""
+        logger.info(f"创建 {self.backend.name} 会话...")
+        start_time = time.time()
+        self.driver = self.backend.create_session(caps)
+        set_implicit_wait(self.driver, self.config['test_info']['implicit_wait'])
+        logger.info(f"✓ {self.backend.name} 会话创建成功: {self.driver.session_id}，耗时 {time.time() - start_time:.1f} 秒")
+        return self.driver
+
+    def quit(self):
+        """结束会话"""
+        self._quit_crawl_sessions()
+        if self.driver:
+            self.driver.quit()
+            self.driver = None
+
+    def _quit_crawl_sessions(self):
+        sessions, self.crawl_sessions = self.crawl_sessions, []
+        for session in sessions:
+            try:
+                session.quit()
+            except Exception as e:
+                logger.warning(f"关闭爬取会话失败: {str(e)}")
+
+    def _crawl_device_configs(self):
+        """
+        参与并行爬取的其他设备配置：同平台、同一被测应用的其他设备
+        crawler.devices 为参与爬取的设备总数（含当前设备），0 或未设置时使用全部配置的设备
+        """
+        current = self._select_device_config()
+        limit = (self.config.get('crawler') or {}).get('devices') or 0
+        others = [d for d in self.config.get('devices', {}).get(self.platform, [])
+                  if d is not current and d.get('appPackage') == current.get('appPackage')]
+        return others[:limit - 1] if limit else others
+
+    def create_inspector(self):
+        """
+        创建用于爬取应用的 AppInspector
+        同平台其他配置设备各创建一个会话，作为 crawl_drivers 分担爬取队列；无法创建会话的设备跳过，
+        这些会话在 quit 时关闭
+        """
+        self._quit_crawl_sessions()
+        for device in self._crawl_device_configs():
+            name = device.get('name', device.get('deviceName'))
+            session = AppiumDriver(self.platform, check_env=False, device_config=device)
+            try:
+                session.create_session()
+            except Exception as e:
+                logger.warning(f"设备 {name} 创建会话失败，不参与爬取: {str(e)}")
+                continue
+            self.crawl_sessions.append(session)
+        logger.info(f"参与爬取的设备: {1 + len(self.crawl_sessions)} 台")
+        return AppInspector(self.driver, self.config.get('crawler'), [s.driver for s in self.crawl_sessions])
+
+    def update_app_features(self, config_path=None):
+        """
+        爬取应用并更新 config.yaml 中的 app_features
+        爬取会多次重启应用、耗时可达 crawler.time_budget，需显式调用，创建会话时不会执行
+        :return: AppInspector（last_feature_diff 为本次变更）；失败时返回 None
+        """
+        config_path = config_path or os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config', 'config.yaml')
+        inspector = self.create_inspector()
+        try:
+            return inspector if inspector.update_config(config_path) else None
+        finally:
+            self._quit_crawl_sessions()
+
+    def _command_executor(self, server_url):
+        """
+        创建到 Appium 服务器的连接
+        设置了环境变量 APPIUM_RECORD 或 test_info.record_session 时录制整个会话，
+        录制文件可通过 utils.session_replay.ReplayServer 在无设备环境下回放
+        """
+        connection = AppiumConnection(server_url, keep_alive=True)
+        record_path = os.getenv('APPIUM_RECORD') or self.config.get('test_info', {}).get('record_session')
+        if record_path:
+            self.recorder = SessionRecorder(record_path)
+            self.recorder.attach(connection)
+        return connection
+
     def _check_appium_settings(self):
         """检查系统自带通讯录应用是否可用"""
         try:
@@ -247,44 +348,42 @@ def _check_appium_settings(self):
             logger.error(f"检查通讯录应用失败: {str(e)}")
             return False
 
+    def _select_device_config(self):
+        """当前平台使用的设备配置：构造时传入的配置，否则为 DEVICE_NAME 指定的设备，再否则为 test_info.default_device"""
+        if self.device_config is not None:
+            return self.device_config
+        # 获取平台特定的配置
+        device_configs = self.config.get('devices', {}).get(self.platform, [])
+        if not device_configs:
+            raise ValueError(f"未找到 {self.platform} 平台的设备配置")
+
+        # 获取指定设备或默认设备的配置
+        device_name = os.getenv('DEVICE_NAME')
+        if device_name:
+            # 如果指定了设备名称，查找匹配的设备
+            device = next(
+                (d for d in device_configs if d.get('deviceName') == device_name),
+                None
+            )
+            if not device:
+                raise ValueError(f"未找到指定的设备配置: {device_name}")
+            return device
+        # 使用默认设备（第一个设备）
+        default_index = self.config.get('test_info', {}).get('default_device', 0)
+        if default_index >= len(device_configs):
+            raise ValueError(f"默认设备索引 {default_index} 超出范围")
+        return device_configs[default_index]
+
     def _get_device_capabilities(self):
         """获取设备配置"""
         try:
-            # 获取平台特定的配置
-            device_configs = self.config.get('devices', {}).get(self.platform, [])
-            if not device_configs:
-                raise ValueError(f"未找到 {self.platform} 平台的设备配置")
-
-            # 获取指定设备或默认设备的配置
-            device_name = os.getenv('DEVICE_NAME')
-            if device_name:
-                # 如果指定了设备名称，查找匹配的设备
-                device = next(
-                    (d for d in device_configs if d.get('deviceName') == device_name),
-                    None
-                )
-                if not device:
-                    raise ValueError(f"未找到指定的设备配置: {device_name}")
-            else:
-                # 使用默认设备（第一个设备）
-                default_index = self.config.get('test_info', {}).get('default_device', 0)
-                if default_index >= len(device_configs):
-                    raise ValueError(f"默认设备索引 {default_index} 超出范围")
-                device = device_configs[default_index]
-
+            device = self._select_device_config()
             logger.info(f"✓ 使用设备配置: {device.get('name', device.get('deviceName'))}")
             
             # 基础配置
             caps = {
                 'platformName': self.config.get('platformName', self.platform.capitalize()),
-                'automationName': 'UiAutomator2',
-                'noReset': True, 
-                'autoGrantPermissions': True,
-                'newCommandTimeout': 120,
-                'autoLaunch': False,
-                'adbExecTimeout': 60000,
-                'avdLaunchTimeout': 60000,
-                'avdReadyTimeout': 60000,
+                'automationName': DEFAULT_AUTOMATION.get(self.platform, 'UiAutomator2'),
             }
 
             # 合并设备特定配置
@@ -293,6 +392,10 @@ def _get_device_capabilities(self):
                 if key not in ['skipServerInstallation', 'uiautomator2ServerInstallTimeout', 'systemPort', 'name']:
                     caps[key] = value
 
+            # 平台后端补充各自的默认配置
+            self.backend = get_backend(caps['automationName'], self.config.get('test_info'))
+            caps = self.backend.capabilities(caps)
+
             # 检查必要的配置项
             required_caps = ['deviceName', 'platformVersion']
             missing_caps = [cap for cap in required_caps if not caps.get(cap)]
@@ -309,6 +412,11 @@ def _get_device_capabilities(self):
     def start_server(self) -> bool:
         """启动 Appium 服务器"""
         try:
+            self._get_device_capabilities()
+            if not self.backend.requires_appium_server:
+                logger.info(f"✓ {self.backend.name} 后端不需要 Appium 服务器")
+                return True
+
             # 检查 Node.js 版本和 Appium 环境
             checker = EnvironmentChecker()
             if not checker.check_node_and_appium():
@@ -432,29 +540,18 @@ def _is_port_in_use(self, port):
 
     def stop_server(self):
         """停止 Appium 服务器"""
+        self._quit_crawl_sessions()
         if self.driver:
             self.driver.quit()
+        if self.recorder:
+            self.recorder.close()
         if self.server_process:
             self.server_process.terminate()
 
     def init_driver(self):
-        """初始化 Appium driver"""
+        """初始化 Appium driver（只创建会话；爬取应用、更新 app_features 见 update_app_features）"""
         try:
-            if self.platform.lower() == 'android':
-                caps = self.config['android']
-            else:
-                caps = self.config['ios']
-
-            # 使用环境变量中的 Appium 服务器地址
-            server_url = f'http://{self.appium_host}:{self.appium_port}/wd/hub'
-            self.driver = webdriver.Remote(server_url, caps)
-            self.driver.implicitly_wait(self.config['test_info']['implicit_wait'])
-            
-            # 自动获取应用信息并更新配置
-            config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config', 'config.yaml')
-            inspector = AppInspector(self.driver)
-            inspector.update_config(config_path)
-            
+            self.create_session()
             return self.driver
         except Exception as e:
             raise Exception(f"Failed to initialize driver: {str(e)}")
@@ -468,7 +565,7 @@ def get_page_source(self):
         """
         try:
             if self.driver:
-                return self.driver.page_source
+                return self.backend.page_source(self.driver) if self.backend else self.driver.page_source
             else:
                 logger.error("WebDriver 未初始化，无法获取页面源代码")
                 return None
@@ -484,7 +581,8 @@ def find_elements_by_xpath(self, xpath):
         """
         try:
             if self.driver:
-                return self.driver.find_elements(AppiumBy.XPATH, xpath)
+                # UiAutomator2 上可改写的 XPath 改用 UiSelector，避免每次查询都导出整棵层级
+                return self.driver.find_elements(*optimize_locator((AppiumBy.XPATH, xpath), self.driver))
             else:
                 logger.error("WebDriver 未初始化，无法查找元素")
                 return []
@@ -0,0 +1,119 @@
+import time
+import queue
+import itertools
+import threading
+import subprocess
+from utils.logger import logger
+
+
+class PersistentShell:
+    """
+    常驻的设备 shell 会话
+    每次 `adb shell <cmd>` 都要新建连接并在设备上拉起一个 shell 进程，高频采样时开销远大于命令本身；
+    这里保持一个交互式 shell，命令写入 stdin，以唯一结束标记截取输出；
+    输出由后台线程读取，超过期限仍未读到结束标记时杀掉 shell，下次调用重新启动
+    """
+
+    def __init__(self, command, timeout=30):
+        """
+        :param command: 启动 shell 的命令，如 ['adb', '-s', serial, 'shell']
+        :param timeout: 单次 run 的默认期限（秒）
+        """
+        self.command = list(command)
+        self.timeout = timeout
+        self._process = None
+        self._lines = None
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+
+    @classmethod
+    def adb(cls, device_id=None, **kwargs):
+        return cls(['adb'] + (['-s', device_id] if device_id else []) + ['shell'], **kwargs)
+
+    @classmethod
+    def hdc(cls, device_id=None, **kwargs):
+        return cls(['hdc'] + (['-t', device_id] if device_id else []) + ['shell'], **kwargs)
+
+    @staticmethod
+    def _read_lines(stream, lines):
+        """后台读取 shell 输出，EOF 时放入 None"""
+        try:
+            for line in stream:
+                lines.put(line)
+        except (OSError, ValueError):
+            pass
+        lines.put(None)
+
+    def _ensure_started(self):
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                             stderr=subprocess.DEVNULL, text=True, errors='replace', bufsize=1)
+            # 每个进程一个队列，被杀掉的旧进程残留的输出不会混入新进程
+            self._lines = queue.Queue()
+            threading.Thread(target=self._read_lines, args=(self._process.stdout, self._lines), daemon=True).start()
+        return self._process, self._lines
+
+    def _discard(self, process):
+        """杀掉 shell 进程；只在它仍是当前进程时清空引用"""
+        if process.poll() is None:
+            process.kill()
+        if self._process is process:
+            self._process = None
+
+    def run(self, script, timeout=None):
+        """
+        在常驻 shell 中执行一段脚本
+        :param script: shell 脚本，可包含多条命令
+        :param timeout: 期限（秒），默认使用构造时的 timeout；超时会杀掉 shell
+        :return: 输出文本；shell 已退出或超时返回 None
+        """
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            process, lines = self._ensure_started()
+            marker = f"__END_{next(self._counter)}__"
+            try:
+                process.stdin.write(f"{script}\necho {marker}\n")
+                process.stdin.flush()
+            except (BrokenPipeError, OSError, ValueError) as e:
+                logger.warning(f"设备 shell 写入失败: {str(e)}")
+                self._discard(process)
+                return None
+            output = []
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    line = lines.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    logger.warning(f"设备 shell 执行超时（{timeout}s），重启 shell: {script.splitlines()[0] if script else ''}")
+                    self._discard(process)
+                    return None
+                if line is None:
+                    logger.warning("设备 shell 已退出")
+                    self._discard(process)
+                    return None
+                if line.rstrip('\r\n') == marker:
+                    return ''.join(output)
+                output.append(line)
+
+    def close(self):
+        """
+        关闭 shell
+        不等待 _lock：其他线程阻塞在 run 中时直接杀掉进程并放入结束标记，run 随即返回 None
+        """
+        process, lines, self._process = self._process, self._lines, None
+        if process is None:
+            return
+        if process.poll() is None:
+            process.kill()
+            try:
+                process.wait(timeout=3)
+            except subprocess.TimeoutExpired:
+                pass
+        # shell 的子进程可能仍持有 stdout，不等 EOF
+        lines.put(None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,255 @@
+import os
+import sys
+import json
+import time
+import heapq
+import bisect
+import threading
+from collections import defaultdict
+from utils.logger import logger
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 延迟直方图桶上限（秒），与 Prometheus 惯例一致
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# 负载大小直方图桶上限（字节）
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    """固定桶直方图"""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count', 'min', 'max')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        """按桶线性插值估算分位数，结果限制在实际观测的最小/最大值之间"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = max(self.bounds[i - 1] if i > 0 else 0.0, self.min)
+                upper = min(self.bounds[i] if i < len(self.bounds) else self.max, self.max)
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.max
+
+    def cumulative(self):
+        """Prometheus 风格的累计计数 [(le, count), ...]"""
+        total, result = 0, []
+        for bound, n in zip(list(self.bounds) + ['+Inf'], self.counts):
+            total += n
+            result.append((bound, total))
+        return result
+
+
+def _payload_size(value):
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value)
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _current_test():
+    return os.environ.get('PYTEST_CURRENT_TEST', '').split(' ')[0] or None
+
+
+def _calling_method(skip_file):
+    """沿调用栈向上找到项目内（pages/、utils/）发起命令的方法，如 BasePage.click"""
+    frame = sys._getframe(2)
+    depth = 0
+    while frame is not None and depth < 30:
+        filename = frame.f_code.co_filename
+        # lambda / 推导式（如 WebDriverWait 的条件函数）归属到外层方法
+        if filename.startswith(PROJECT_ROOT) and filename != skip_file and not frame.f_code.co_name.startswith('<'):
+            owner = frame.f_locals.get('self')
+            name = frame.f_code.co_name
+            return f'{type(owner).__name__}.{name}' if owner is not None else name
+        frame = frame.f_back
+        depth += 1
+    return None
+
+
+class CommandMetrics:
+    """
+    WebDriver 命令指标
+    按命令聚合延迟和负载大小直方图，按测试保留最慢的若干条命令
+    """
+
+    def __init__(self, top_n=10):
+        self.top_n = top_n
+        self._lock = threading.Lock()
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.request_size = defaultdict(lambda: Histogram(SIZE_BUCKETS))
+        self.response_size = defaultdict(lambda: Histogram(SIZE_BUCKETS))
+        self.errors = defaultdict(int)
+        self._slowest = defaultdict(list)
+        self._test_totals = defaultdict(lambda: [0, 0.0])
+        self._seq = 0
+
+    def record(self, command, latency, request_bytes, response_bytes, test=None, caller=None, error=False):
+        """
+        记录一次命令
+        :param command: WebDriver 命令名（即端点名，如 findElement）
+        :param latency: 耗时（秒）
+        """
+        with self._lock:
+            self.latency[command].observe(latency)
+            self.request_size[command].observe(request_bytes)
+            self.response_size[command].observe(response_bytes)
+            if error:
+                self.errors[command] += 1
+            key = test or '<no test>'
+            totals = self._test_totals[key]
+            totals[0] += 1
+            totals[1] += latency
+
+            self._seq += 1
+            item = (latency, self._seq, {
+                'command': command,
+                'caller': caller,
+                'latency_ms': round(latency * 1000, 2),
+                'request_bytes': request_bytes,
+                'response_bytes': response_bytes,
+                'error': error,
+            })
+            heap = self._slowest[key]
+            if len(heap) < self.top_n:
+                heapq.heappush(heap, item)
+            elif latency > heap[0][0]:
+                heapq.heapreplace(heap, item)
+
+    def top_slow_commands(self, test, n=None):
+        """某个测试中最慢的命令，按耗时降序"""
+        with self._lock:
+            items = sorted(self._slowest.get(test, ()), reverse=True)
+        return [entry for _, _, entry in items[:n or self.top_n]]
+
+    def test_summary(self, test):
+        with self._lock:
+            count, total = self._test_totals.get(test, (0, 0.0))
+        return {'commands': count, 'total_ms': round(total * 1000, 2)}
+
+    def reset(self):
+        self.__init__(self.top_n)
+
+    def to_prometheus(self):
+        """导出 Prometheus 文本格式"""
+        lines = []
+
+        def _histogram(metric, help_text, histograms):
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} histogram')
+            for command, histogram in sorted(histograms.items()):
+                for bound, total in histogram.cumulative():
+                    lines.append(f'{metric}_bucket{{command="{command}",le="{bound}"}} {total}')
+                lines.append(f'{metric}_sum{{command="{command}"}} {histogram.sum:.6f}')
+                lines.append(f'{metric}_count{{command="{command}"}} {histogram.count}')
+
+        with self._lock:
+            _histogram('webdriver_command_duration_seconds', 'WebDriver command latency', self.latency)
+            _histogram('webdriver_request_bytes', 'WebDriver request payload size', self.request_size)
+            _histogram('webdriver_response_bytes', 'WebDriver response payload size', self.response_size)
+            lines.append('# HELP webdriver_command_errors_total WebDriver commands that raised')
+            lines.append('# TYPE webdriver_command_errors_total counter')
+            for command, count in sorted(self.errors.items()):
+                lines.append(f'webdriver_command_errors_total{{command="{command}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def to_dict(self):
+        """导出 JSON 结构：命令汇总 + 每个测试的最慢命令"""
+        with self._lock:
+            commands = {
+                command: {
+                    'count': histogram.count,
+                    'total_ms': round(histogram.sum * 1000, 2),
+                    'mean_ms': round(histogram.sum / histogram.count * 1000, 2),
+                    'p50_ms': round(histogram.quantile(0.5) * 1000, 2),
+                    'p90_ms': round(histogram.quantile(0.9) * 1000, 2),
+                    'p99_ms': round(histogram.quantile(0.99) * 1000, 2),
+                    'request_bytes': int(self.request_size[command].sum),
+                    'response_bytes': int(self.response_size[command].sum),
+                    'errors': self.errors.get(command, 0),
+                }
+                for command, histogram in sorted(self.latency.items())
+            }
+            tests = list(self._test_totals)
+        return {
+            'commands': commands,
+            'tests': {
+                test: dict(self.test_summary(test), slowest=self.top_slow_commands(test))
+                for test in tests
+            },
+        }
+
+    def write_artifacts(self, directory):
+        """写出 metrics.prom 和 metrics.json"""
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'metrics.prom'), 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        with open(os.path.join(directory, 'metrics.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        logger.info(f"WebDriver 命令指标已写入: {directory}")
+
+
+# 进程级共享的指标实例
+metrics = CommandMetrics()
+
+
+def instrument(driver, registry=None):
+    """
+    为 WebDriver 安装命令级埋点
+    包装实例的 execute，所有经由该 driver 的命令（AppiumDriver、BasePage、AppInspector 等）都会被记录
+    :param driver: WebDriver 实例
+    :param registry: CommandMetrics，默认使用全局 metrics
+    :return: driver
+    """
+    if getattr(driver, '_metrics_instrumented', False):
+        return driver
+    registry = registry or metrics
+    original_execute = driver.execute
+
+    def _instrumented_execute(driver_command, params=None):
+        start = time.perf_counter()
+        response = None
+        error = False
+        try:
+            response = original_execute(driver_command, params)
+            return response
+        except Exception:
+            error = True
+            raise
+        finally:
+            latency = time.perf_counter() - start
+            registry.record(
+                driver_command,
+                latency,
+                _payload_size(params),
+                _payload_size(response.get('value') if isinstance(response, dict) else response),
+                test=_current_test(),
+                caller=_calling_method(__file__),
+                error=error,
+            )
+
+    driver.execute = _instrumented_execute
+    driver._metrics_instrumented = True
+    return driver
@@ -0,0 +1,128 @@
+import json
+from lxml import etree
+from appium.webdriver.common.appiumby import AppiumBy
+from selenium.common.exceptions import WebDriverException, StaleElementReferenceException, NoSuchElementException
+from utils.logger import logger
+
+# record_element_attributes 读取的属性
+DEFAULT_ATTRIBUTES = ('text', 'content-desc', 'resource-id', 'class', 'package', 'bounds')
+
+# 在 Appium 服务端一次性读取所有元素属性的 webdriverio 脚本（execute_driver）
+_BUNDLE_SCRIPT = """
+const ids = %s;
+const names = %s;
+const result = [];
+for (const id of ids) {
+    const attrs = {};
+    for (const name of names) {
+        try {
+            attrs[name] = name === 'text' ? await driver.getElementText(id) : await driver.getElementAttribute(id, name);
+        } catch (e) {
+            attrs[name] = null;
+        }
+    }
+    result.push(attrs);
+}
+return result;
+"""
+
+
+def match_nodes(tree, by, value):
+    """
+    在本地源码上执行定位，语义与 UiAutomator2 / XCUITest 一致
+    :return: 节点列表；无法在本地求值的定位方式返回 None
+    """
+    if by == AppiumBy.XPATH:
+        try:
+            return [n for n in tree.xpath(value) if isinstance(n, etree._Element)]
+        except etree.XPathError as e:
+            logger.warning(f"本地 XPath 求值失败: {value}: {str(e)}")
+            return None
+    if by == AppiumBy.ID:
+        return [n for n in tree.iter() if n.get('resource-id') and
+                (n.get('resource-id') == value or n.get('resource-id').endswith(f':id/{value}'))]
+    if by == AppiumBy.ACCESSIBILITY_ID:
+        return [n for n in tree.iter() if value in (n.get('content-desc'), n.get('name'))]
+    if by == AppiumBy.CLASS_NAME:
+        return [n for n in tree.iter() if value in (n.get('class'), n.get('type'), n.tag)]
+    return None
+
+
+class BatchAttributeReader:
+    """
+    批量读取元素属性
+    逐个元素读取 6 个属性需要 6N 次请求，这里把一屏的读取合并为 O(1) 次：
+    - read_locator: 取一次页面源码，在本地按定位器求值并读取属性
+    - read: 对已有的 WebElement 使用 execute_driver 脚本在服务端一次读完；
+      服务端未开启该功能时（需 --allow-insecure=execute_driver_script）回退为逐个读取
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self._bundle_supported = None
+
+    @staticmethod
+    def _node_attributes(node, names):
+        attrs = {}
+        for name in names:
+            if name == 'text':
+                attrs[name] = node.get('text') or ''
+            elif name == 'class':
+                attrs[name] = node.get('class') or node.tag
+            else:
+                attrs[name] = node.get(name)
+        return attrs
+
+    def read_locator(self, locator, names=DEFAULT_ATTRIBUTES, page_source=None):
+        """
+        读取定位器匹配到的所有元素的属性，只请求一次页面源码
+        :param locator: (by, value)
+        :param names: 属性名列表
+        :param page_source: 已获取的页面源码，传入时不再请求
+        :return: 属性字典列表（文档顺序）
+        """
+        try:
+            source = page_source if page_source is not None else self.driver.page_source
+            tree = etree.fromstring(source.encode('utf-8') if isinstance(source, str) else source)
+            nodes = match_nodes(tree, *locator)
+        except (WebDriverException, etree.XMLSyntaxError) as e:
+            logger.warning(f"解析页面源码失败，改为逐个读取属性: {str(e)}")
+            nodes = None
+        if nodes is None:
+            return self.read(self.driver.find_elements(*locator), names)
+        return [self._node_attributes(node, names) for node in nodes]
+
+    def _read_bundle(self, elements, names):
+        script = _BUNDLE_SCRIPT % (json.dumps([element.id for element in elements]), json.dumps(list(names)))
+        return self.driver.execute_driver(script).result
+
+    @staticmethod
+    def _read_one(element, names):
+        attrs = {}
+        try:
+            for name in names:
+                attrs[name] = element.text if name == 'text' else element.get_attribute(name)
+        except (StaleElementReferenceException, NoSuchElementException):
+            pass
+        return attrs
+
+    def read(self, elements, names=DEFAULT_ATTRIBUTES):
+        """
+        读取一组元素的属性
+        :param elements: WebElement 列表
+        :param names: 属性名列表
+        :return: 与 elements 对应的属性字典列表
+        """
+        elements = list(elements)
+        if not elements:
+            return []
+        if self._bundle_supported is not False:
+            try:
+                result = self._read_bundle(elements, names)
+                self._bundle_supported = True
+                return result
+            except (WebDriverException, AttributeError, KeyError, TypeError) as e:
+                if self._bundle_supported is None:
+                    logger.info(f"execute_driver 不可用，属性改为逐个读取: {str(e).splitlines()[0] if str(e) else e}")
+                    self._bundle_supported = False
+        return [self._read_one(element, names) for element in elements]
@@ -1,32 +1,37 @@
 from appium.webdriver.common.appiumby import AppiumBy
 import time
 from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException
+from utils.element_batch import BatchAttributeReader
+from utils.locator_generator import LocatorGenerator
+from utils.implicit_wait import no_implicit_wait
 
 class ElementFinder:
     def __init__(self, driver):
         self.driver = driver
+        self.batch_reader = BatchAttributeReader(driver)
 
     def get_element_locator(self, element_text=None, element_id=None, timeout=5):
-        """自动获取元素定位方式"""
+        """自动获取元素定位方式（探测期间隐式等待置 0，未命中的策略立即返回）"""
         start_time = time.time()
-        while time.time() - start_time < timeout:
-            locator_strategies = {
-                'accessibility_id': (AppiumBy.ACCESSIBILITY_ID, element_text),
-                'id': (AppiumBy.ID, element_id or element_text),
-                'xpath_text': (AppiumBy.XPATH, f"//*[@text='{element_text}']"),
-                'xpath_contains': (AppiumBy.XPATH, f"//*[contains(@text,'{element_text}')]"),
-                'class_name': (AppiumBy.CLASS_NAME, element_text),
-            }
-
-            for strategy, locator in locator_strategies.items():
-                try:
-                    element = self.driver.find_element(locator[0], locator[1])
-                    if element.is_displayed():
-                        return locator
-                except (NoSuchElementException, StaleElementReferenceException):
-                    continue
-
-            time.sleep(0.5)
+        with no_implicit_wait(self.driver):
+            while time.time() - start_time < timeout:
+                locator_strategies = {
+                    'accessibility_id': (AppiumBy.ACCESSIBILITY_ID, element_text),
+                    'id': (AppiumBy.ID, element_id or element_text),
+                    'xpath_text': (AppiumBy.XPATH, f"//*[@text='{element_text}']"),
+                    'xpath_contains': (AppiumBy.XPATH, f"//*[contains(@text,'{element_text}')]"),
+                    'class_name': (AppiumBy.CLASS_NAME, element_text),
+                }
+
+                for strategy, locator in locator_strategies.items():
+                    try:
+                        element = self.driver.find_element(locator[0], locator[1])
+                        if element.is_displayed():
+                            return locator
+                    except (NoSuchElementException, StaleElementReferenceException):
+                        continue
+
+                time.sleep(0.5)
         return None
 
     def record_element_attributes(self, element):
@@ -43,9 +48,25 @@ def record_element_attributes(self, element):
             pass
         return attributes
 
+    def record_elements_attributes(self, elements=None, locator=(AppiumBy.XPATH, "//*[@*]")):
+        """批量记录元素属性，一屏只需 O(1) 次请求
+        Args:
+            elements: 已查找到的元素列表；为 None 时按 locator 在页面源码上本地求值
+            locator: elements 为空时使用的定位器
+        """
+        if elements is None:
+            return self.batch_reader.read_locator(locator)
+        return self.batch_reader.read(elements)
+
+    def synthesize_locator(self, element_text=None, element_id=None, page_source=None):
+        """基于页面快照合成开销最低且唯一的定位器，找不到对应节点时返回 None"""
+        generator = LocatorGenerator.from_page_source(page_source or self.driver.page_source)
+        node = generator.find_node(element_text, element_id)
+        return generator.locator_for(node) if node is not None else None
+
     def generate_locator_code(self, element_text=None, element_id=None):
         """生成定位代码"""
-        locator = self.get_element_locator(element_text, element_id)
+        locator = self.synthesize_locator(element_text, element_id)
         if locator:
-            return f"({locator[0]}, '{locator[1]}')"
+            return LocatorGenerator.format_locator(locator)
         return None 
\ No newline at end of file
@@ -13,6 +13,7 @@
 import requests
 import json
 from utils.logger import logger
+from utils.hdc_client import discover_devices
 
 class EnvironmentCache:
     def __init__(self, cache_file='.env_cache', ttl=timedelta(hours=1)):
@@ -895,6 +896,51 @@ def check_ios_environment(self):
             self.results['missing'].append('iOS 环境')
             self.results['details']['ios'] = {'error': str(e)}
 
+    def check_harmony_environment(self, package=None):
+        """检查鸿蒙环境：hdc 是否可用，并行检查所有在线设备"""
+        self.results['details']['harmony'] = {}
+        try:
+            result = self._run_with_retry(['hdc', '-v'])
+            if result.returncode != 0:
+                raise FileNotFoundError('hdc')
+            self.results['details']['harmony']['hdc_version'] = result.stdout.strip()
+            logger.info(f"✓ hdc 版本: {result.stdout.strip()}", file=sys.stderr)
+        except Exception:
+            logger.info("✗ 未找到 hdc", file=sys.stderr)
+            self.results['status'] = False
+            self.results['missing'].append('HarmonyOS hdc')
+            self.results['recommendations'].append("请安装 DevEco Studio 或 OpenHarmony SDK toolchains，并将 hdc 加入 PATH")
+            return self.results
+        self.check_harmony_devices(package)
+        return self.results
+
+    def check_harmony_devices(self, package=None):
+        """检查鸿蒙设备：每台设备的信息查询和应用安装检查在一次 hdc shell 往返中完成"""
+        devices = discover_devices(package)
+        if not devices:
+            logger.info("✗ 未检测到鸿蒙设备", file=sys.stderr)
+            self.results['recommendations'].append("请连接鸿蒙设备并在设备上允许 USB 调试")
+            self.results['status'] = False
+            self.results['missing'].append('鸿蒙设备')
+            return
+        healthy = []
+        for device in devices:
+            serial = device['serial']
+            self.results['details']['harmony'][f'device_{serial}'] = device
+            if device['healthy']:
+                healthy.append(serial)
+                logger.info(f"✓ 设备 {serial}: {device['manufacturer']} {device['model']} "
+                            f"API {device['api_version']}（{device['latency_ms']}ms）", file=sys.stderr)
+            elif device.get('app_installed') is False:
+                logger.info(f"✗ 设备 {serial} 未安装 {package}", file=sys.stderr)
+                self.results['recommendations'].append(f"请在设备 {serial} 上安装 {package}")
+            else:
+                logger.info(f"✗ 设备 {serial} 无响应", file=sys.stderr)
+        self.results['details']['harmony']['devices'] = healthy
+        if not healthy:
+            self.results['status'] = False
+            self.results['missing'].append('可用鸿蒙设备')
+
     def check_ollama_environment(self):
         """检查 Ollama 环境，确保 deepseek-r1:8b 模型可用"""
         try:
@@ -0,0 +1,101 @@
+import json
+import hashlib
+
+# 模块中除 elements 外参与比较的字段
+MODULE_FIELDS = ('description', 'activity', 'validations', 'gestures', 'media')
+
+
+def element_key(element):
+    """
+    元素的稳定标识：优先使用 id，其次使用名称和类型
+    :param element: app_features 中的元素描述
+    """
+    if element.get('id'):
+        return f"id:{element['id']}"
+    return f"name:{element.get('name', '')}|{element.get('type', '')}"
+
+
+def _digest(value):
+    payload = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _index_elements(elements):
+    """按元素标识建立索引，同一标识重复出现时追加序号区分"""
+    index = {}
+    for element in elements or []:
+        key = element_key(element)
+        unique_key, n = key, 1
+        while unique_key in index:
+            n += 1
+            unique_key = f'{key}#{n}'
+        index[unique_key] = element
+    return index
+
+
+def diff_module(old_info, new_info):
+    """
+    比较单个模块的新旧描述
+    :return: 变更字典，无变化时返回 None
+    """
+    old_elements = _index_elements((old_info or {}).get('elements'))
+    new_elements = _index_elements((new_info or {}).get('elements'))
+
+    added = [key for key in new_elements if key not in old_elements]
+    removed = [key for key in old_elements if key not in new_elements]
+    changed = [
+        key for key in new_elements
+        if key in old_elements and _digest(new_elements[key]) != _digest(old_elements[key])
+    ]
+    fields = [
+        field for field in MODULE_FIELDS
+        if _digest((old_info or {}).get(field)) != _digest((new_info or {}).get(field))
+    ]
+
+    if not (added or removed or changed or fields):
+        return None
+    return {
+        'added': added,
+        'removed': removed,
+        'changed': changed,
+        'fields': fields,
+    }
+
+
+def diff_app_features(old_features, new_features):
+    """
+    逐模块、逐元素比较 app_features
+    :param old_features: 更新前的 app_features
+    :param new_features: 更新后的 app_features
+    :return: 模块名 -> {'status': 'added'|'removed'|'changed', ...}，未变化的模块不出现
+    """
+    old_features = old_features or {}
+    new_features = new_features or {}
+    diff = {}
+
+    for module, new_info in new_features.items():
+        if module not in old_features:
+            diff[module] = {
+                'status': 'added',
+                'added': list(_index_elements((new_info or {}).get('elements'))),
+                'removed': [],
+                'changed': [],
+                'fields': [],
+            }
+            continue
+        module_diff = diff_module(old_features[module], new_info)
+        if module_diff:
+            module_diff['status'] = 'changed'
+            diff[module] = module_diff
+
+    for module in old_features:
+        if module not in new_features:
+            diff[module] = {
+                'status': 'removed',
+                'added': [],
+                'removed': list(_index_elements((old_features[module] or {}).get('elements'))),
+                'changed': [],
+                'fields': [],
+            }
+
+    return diff
@@ -0,0 +1,140 @@
+import subprocess
+from contextlib import contextmanager
+import numpy as np
+from utils.logger import logger
+
+# framestats 中参与计算的列（纳秒时间戳）
+_INTENDED_VSYNC = 'IntendedVsync'
+_FRAME_COMPLETED = 'FrameCompleted'
+_FLAGS = 'Flags'
+_PROFILE_MARKER = '---PROFILEDATA---'
+
+DEFAULT_REFRESH_RATE = 60.0
+
+
+def parse_framestats(output):
+    """
+    解析 dumpsys gfxinfo <pkg> framestats 输出中的 PROFILEDATA 段
+    只保留 Flags 为 0 的有效帧（非 0 表示首帧、窗口尺寸变化等不计入统计的帧）
+    :return: (intended_vsync, frame_completed) 两个 int64 数组（纳秒）；多个窗口的数据合并
+    """
+    vsyncs, completed = [], []
+    columns = None
+    in_section = False
+    for line in output.splitlines():
+        line = line.strip()
+        if line == _PROFILE_MARKER:
+            in_section, columns = not in_section, None
+            continue
+        if not in_section or not line:
+            continue
+        fields = line.rstrip(',').split(',')
+        if columns is None:
+            columns = {name: index for index, name in enumerate(fields)}
+            continue
+        try:
+            if int(fields[columns[_FLAGS]]) != 0:
+                continue
+            vsyncs.append(int(fields[columns[_INTENDED_VSYNC]]))
+            completed.append(int(fields[columns[_FRAME_COMPLETED]]))
+        except (KeyError, IndexError, ValueError):
+            continue
+    return np.array(vsyncs, dtype=np.int64), np.array(completed, dtype=np.int64)
+
+
+def estimate_frame_budget(intended_vsync, refresh_rate=None):
+    """
+    单帧预算（毫秒）
+    连续渲染时相邻帧的 IntendedVsync 间隔就是刷新周期，取最小间隔附近的中位数，
+    数据不足时按 refresh_rate（默认 60Hz）计算
+    """
+    if refresh_rate:
+        return 1000.0 / refresh_rate
+    diffs = np.diff(np.sort(intended_vsync))
+    diffs = diffs[diffs > 0]
+    if len(diffs) < 2:
+        return 1000.0 / DEFAULT_REFRESH_RATE
+    period = diffs[diffs < diffs.min() * 1.5]
+    return float(np.median(period)) / 1e6
+
+
+def frame_statistics(intended_vsync, frame_completed, refresh_rate=None):
+    """
+    帧耗时统计
+    :return: {'frames', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms', 'budget_ms', 'janky_frames', 'janky_percent'}
+    """
+    durations = (frame_completed - intended_vsync) / 1e6
+    budget = estimate_frame_budget(intended_vsync, refresh_rate)
+    if not len(durations):
+        return {'frames': 0, 'p50_ms': None, 'p90_ms': None, 'p99_ms': None, 'max_ms': None,
+                'budget_ms': round(budget, 2), 'janky_frames': 0, 'janky_percent': 0.0}
+    p50, p90, p99 = np.percentile(durations, [50, 90, 99])
+    janky = int(np.count_nonzero(durations > budget))
+    return {
+        'frames': int(len(durations)),
+        'p50_ms': round(float(p50), 2),
+        'p90_ms': round(float(p90), 2),
+        'p99_ms': round(float(p99), 2),
+        'max_ms': round(float(durations.max()), 2),
+        'budget_ms': round(budget, 2),
+        'janky_frames': janky,
+        'janky_percent': round(janky * 100.0 / len(durations), 2),
+    }
+
+
+class FrameMetricsCollector:
+    """
+    帧渲染与卡顿统计
+    在一段手势操作前执行 dumpsys gfxinfo <pkg> reset，结束后读取 framestats，
+    按操作记录帧耗时分位数和卡顿帧比例。
+    注意 framestats 只保留最近约 120 帧，长时间的操作应拆成多段测量
+    """
+
+    def __init__(self, package, device_id=None, refresh_rate=None):
+        """
+        :param package: 被测应用包名
+        :param device_id: adb 设备序列号
+        :param refresh_rate: 屏幕刷新率（Hz），为空时从帧数据估算
+        """
+        self.package = package
+        self.device_id = device_id
+        self.refresh_rate = refresh_rate
+        self.results = []
+
+    def _gfxinfo(self, *args):
+        command = ['adb'] + (['-s', self.device_id] if self.device_id else []) + \
+                  ['shell', 'dumpsys', 'gfxinfo', self.package, *args]
+        return subprocess.run(command, capture_output=True, text=True, timeout=15).stdout
+
+    def reset(self):
+        self._gfxinfo('reset')
+
+    def collect(self, label):
+        """读取自上次 reset 以来的帧数据并记录"""
+        vsyncs, completed = parse_framestats(self._gfxinfo('framestats'))
+        stats = frame_statistics(vsyncs, completed, self.refresh_rate)
+        stats['action'] = label
+        self.results.append(stats)
+        logger.info(f"帧统计 [{label}]: {stats['frames']} 帧, p50 {stats['p50_ms']}ms, p90 {stats['p90_ms']}ms, "
+                    f"p99 {stats['p99_ms']}ms, 卡顿 {stats['janky_percent']}%")
+        return stats
+
+    @contextmanager
+    def measure(self, label):
+        """
+        测量一段操作的帧渲染情况
+        with collector.measure('swipe_videos') as result: ...
+        退出后 result 中填入统计数据
+        """
+        result = {}
+        try:
+            self.reset()
+        except (subprocess.TimeoutExpired, OSError) as e:
+            logger.error(f"重置 gfxinfo 失败: {str(e)}")
+            yield result
+            return
+        yield result
+        try:
+            result.update(self.collect(label))
+        except (subprocess.TimeoutExpired, OSError) as e:
+            logger.error(f"读取 framestats 失败: {str(e)}")
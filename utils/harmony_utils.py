@@ -1,12 +1,26 @@
+from appium.webdriver.common.appiumby import AppiumBy
 from utils.logger import logger
+from utils.hdc_client import get_device_info as get_hdc_device_info
+from utils.platform_backend import backend_for
 
 class HarmonyUtils:
     """鸿蒙系统特定工具类"""
     
     @staticmethod
     def get_device_info(driver):
-        """获取鸿蒙设备信息"""
+        """获取鸿蒙设备信息；hypium 后端经 hdc 读取，Appium 会话使用 capabilities"""
         try:
+            serial = driver.capabilities.get('deviceUDID') or driver.capabilities.get('udid')
+            if serial and backend_for(driver).name == 'hypium':
+                # 经常驻 hdc shell 批量读取系统参数，不再逐项走会话命令
+                info = get_hdc_device_info(serial)
+                if info.get('model'):
+                    return {
+                        'deviceType': info['device_type'],
+                        'systemVersion': info['os_version'],
+                        'deviceModel': info['model'],
+                        'apiVersion': info['api_version'],
+                    }
             return {
                 'deviceType': driver.capabilities.get('deviceType'),
                 'systemVersion': driver.capabilities.get('platformVersion'),
@@ -20,8 +34,9 @@ def get_device_info(driver):
     def handle_permissions(driver):
         """处理鸿蒙权限弹窗"""
         try:
-            allow_btn = driver.find_element_by_text("允许")
-            if allow_btn:
-                allow_btn.click()
+            # Appium 与 hypium 后端都支持的定位方式；find_elements 未找到时返回空列表
+            allow_buttons = driver.find_elements(AppiumBy.XPATH, "//*[@text='允许']")
+            if allow_buttons:
+                allow_buttons[0].click()
         except:
             pass
\ No newline at end of file
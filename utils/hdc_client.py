@@ -0,0 +1,155 @@
+import time
+import shlex
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from utils.logger import logger
+from utils.device_shell import PersistentShell
+
+# 设备信息对应的系统参数（param get）
+DEVICE_PARAMS = {
+    'model': 'const.product.model',
+    'manufacturer': 'const.product.manufacturer',
+    'brand': 'const.product.brand',
+    'device_type': 'const.product.devicetype',
+    'os_version': 'const.ohos.fullname',
+    'software_version': 'const.product.software.version',
+    'api_version': 'const.ohos.apiversion',
+}
+
+
+def list_targets(timeout=10):
+    """
+    hdc 已连接的设备
+    :return: [(serial, state)]，state 如 Connected / Offline / Unauthorized
+    """
+    try:
+        output = subprocess.run(['hdc', 'list', 'targets', '-v'], capture_output=True, text=True,
+                                timeout=timeout).stdout
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.error(f"获取鸿蒙设备列表失败: {str(e)}")
+        return []
+    targets = []
+    for line in output.splitlines():
+        parts = line.split()
+        if not parts or parts[0] == '[Empty]':
+            continue
+        # -v 输出：<serial> <USB|TCP> <Connected|Offline|...> <host> hdc
+        targets.append((parts[0], parts[2] if len(parts) > 2 else 'Connected'))
+    return targets
+
+
+def connected_devices():
+    """hdc 已连接且在线的设备序列号"""
+    return [serial for serial, state in list_targets() if state == 'Connected']
+
+
+def _param_script(params):
+    return '\n'.join(f'echo "{name}=$(param get {name} 2>&1)"' for name in params)
+
+
+def parse_params(output):
+    """解析批量 param get 的输出，读取失败的参数值为 None"""
+    values = {}
+    for line in (output or '').splitlines():
+        name, sep, value = line.partition('=')
+        if not sep:
+            continue
+        value = value.strip()
+        # 参数不存在时输出 "Get parameter "xxx" fail! errNum is:..."
+        values[name.strip()] = None if not value or 'fail!' in value else value
+    return values
+
+
+_shells = {}
+_shells_lock = threading.Lock()
+
+
+def get_shell(serial=None):
+    """获取设备的常驻 hdc shell（每台设备一个），同一设备的后续命令复用该连接"""
+    with _shells_lock:
+        shell = _shells.get(serial)
+        if shell is None:
+            shell = _shells[serial] = PersistentShell.hdc(serial)
+        return shell
+
+
+def close_shells():
+    """关闭所有设备的常驻 hdc shell"""
+    with _shells_lock:
+        shells = list(_shells.values())
+        _shells.clear()
+    for shell in shells:
+        shell.close()
+
+
+def run_script(serial, script, timeout=15):
+    """
+    在设备上执行一段脚本
+    优先使用常驻 shell；常驻 shell 不可用时（设备断开或 hdc 版本不支持从 stdin 读取命令）
+    回退为一次 hdc shell 调用，多条命令仍在同一次连接中执行
+    :param timeout: 总期限（秒），常驻 shell 和回退调用共用
+    :return: 输出文本；执行失败或超时返回 None
+    """
+    deadline = time.monotonic() + timeout
+    try:
+        output = get_shell(serial).run(script, timeout=timeout)
+    except OSError as e:
+        logger.warning(f"启动 hdc shell 失败: {str(e)}")
+        return None
+    if output is not None:
+        return output
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        logger.warning(f"hdc shell 执行超时 {serial or 'default'}（{timeout}s）")
+        return None
+    command = ['hdc'] + (['-t', serial] if serial else []) + ['shell', script.replace('\n', '; ')]
+    try:
+        return subprocess.run(command, capture_output=True, text=True, errors='replace', timeout=remaining).stdout
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"hdc shell 执行失败 {serial or 'default'}: {str(e)}")
+        return None
+
+
+def get_params(serial, names):
+    """一次往返批量读取多个系统参数，返回 {name: value}"""
+    return parse_params(run_script(serial, _param_script(names)))
+
+
+def get_device_info(serial=None):
+    """设备型号、系统版本等信息，键见 DEVICE_PARAMS"""
+    values = get_params(serial, DEVICE_PARAMS.values())
+    return {key: values.get(name) for key, name in DEVICE_PARAMS.items()}
+
+
+def check_device(serial, package=None):
+    """
+    设备健康检查：设备信息、应用是否已安装在同一次 shell 往返中完成
+    :param package: 被测应用 bundleName，为空时不检查安装状态
+    :return: {'serial', 'healthy', 'latency_ms', 'app_installed', 以及 DEVICE_PARAMS 中的各项}
+    """
+    script = _param_script(DEVICE_PARAMS.values())
+    if package:
+        script += f'\necho "app_installed=$(bm dump -a | grep -c -w {shlex.quote(package)})"'
+    start = time.monotonic()
+    values = parse_params(run_script(serial, script))
+    latency_ms = round((time.monotonic() - start) * 1000, 1)
+    result = {'serial': serial, 'latency_ms': latency_ms}
+    result.update({key: values.get(name) for key, name in DEVICE_PARAMS.items()})
+    if package:
+        result['app_installed'] = (values.get('app_installed') or '0') != '0'
+    result['healthy'] = bool(result['api_version']) and result.get('app_installed', True)
+    return result
+
+
+def discover_devices(package=None, serials=None, max_workers=8):
+    """
+    并行检查所有在线的鸿蒙设备
+    :param serials: 要检查的设备，默认为 hdc 列出的全部在线设备
+    :return: [check_device 的结果]，顺序与设备列表一致
+    """
+    serials = connected_devices() if serials is None else list(serials)
+    if not serials:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(serials))) as pool:
+        return list(pool.map(lambda serial: check_device(serial, package), serials))
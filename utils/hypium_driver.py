@@ -0,0 +1,478 @@
+import os
+import json
+import time
+import base64
+import tempfile
+from collections import deque
+from types import SimpleNamespace
+from lxml import etree
+from appium.webdriver.common.appiumby import AppiumBy
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
+from utils.logger import logger
+from utils.xpath_translator import parse_xpath_conditions
+from utils.toast_listener import Toast, TOAST_LONG_DURATION
+
+AUTOMATION_NAME = 'hypium'
+
+# XPath / Appium 属性名 -> hypium 选择器方法
+_STRING_SELECTORS = {'text': 'text', 'resource-id': 'id', 'id': 'id', 'key': 'key', 'class': 'type', 'type': 'type'}
+_BOOLEAN_SELECTORS = {'clickable': 'clickable', 'long-clickable': 'longClickable', 'scrollable': 'scrollable',
+                      'enabled': 'enabled', 'focused': 'focused', 'selected': 'selected', 'checked': 'checked',
+                      'checkable': 'checkable'}
+# 元素属性名 -> UiComponent 读取方法
+_COMPONENT_GETTERS = {'text': 'getText', 'name': 'getText', 'resource-id': 'getId', 'id': 'getId', 'key': 'getKey',
+                      'class': 'getType', 'type': 'getType', 'content-desc': 'getDescription',
+                      'description': 'getDescription', 'clickable': 'isClickable', 'enabled': 'isEnabled',
+                      'focused': 'isFocused', 'long-clickable': 'isLongClickable', 'scrollable': 'isScrollable',
+                      'checked': 'isChecked', 'checkable': 'isCheckable', 'selected': 'isSelected'}
+# dumpLayout 属性 -> 与 UiAutomator2 一致的 XML 属性，使 XPath、定位器生成等本地工具可以直接复用
+_LAYOUT_ATTRIBUTES = {'text': 'text', 'id': 'resource-id', 'description': 'content-desc', 'type': 'class',
+                      'bundleName': 'package', 'bounds': 'bounds', 'clickable': 'clickable',
+                      'longClickable': 'long-clickable', 'scrollable': 'scrollable', 'enabled': 'enabled',
+                      'focused': 'focused', 'selected': 'selected', 'checked': 'checked', 'checkable': 'checkable',
+                      'key': 'key', 'visible': 'displayed'}
+
+_REMOTE_LAYOUT = '/data/local/tmp/moautopilot_layout.json'
+
+NATIVE_CONTEXT = 'NATIVE_APP'
+
+_hypium = None
+
+
+def load_hypium():
+    """按需导入 hypium（导入耗时约 0.5 秒且会输出提示信息），未安装时抛出 ImportError"""
+    global _hypium
+    if _hypium is None:
+        try:
+            from hypium import UiDriver, BY
+            from hypium.model import MatchPattern, DisplayRotation
+        except ImportError as e:
+            raise ImportError("未安装 hypium，请按 hypium-5.0.7.200/readme.txt 安装") from e
+        _hypium = SimpleNamespace(UiDriver=UiDriver, BY=BY, MatchPattern=MatchPattern, DisplayRotation=DisplayRotation)
+    return _hypium
+
+
+def _xpath_selector(xpath):
+    """只有一个合取子句、且条件都能用 hypium 选择器表达的 XPath 转为 BY，其余使用 BY.xpath"""
+    hypium = load_hypium()
+    clauses = parse_xpath_conditions(xpath)
+    if clauses and len(clauses) == 1:
+        selector = hypium.BY
+        try:
+            for attr, op, value in clauses[0]:
+                if attr in _BOOLEAN_SELECTORS and op == 'eq' and value in ('true', 'false'):
+                    selector = getattr(selector, _BOOLEAN_SELECTORS[attr])(value == 'true')
+                elif attr == 'text':
+                    pattern = {'eq': hypium.MatchPattern.EQUALS, 'contains': hypium.MatchPattern.CONTAINS,
+                               'starts': hypium.MatchPattern.STARTS_WITH}[op]
+                    selector = selector.text(value, pattern)
+                elif attr in _STRING_SELECTORS and op == 'eq':
+                    selector = getattr(selector, _STRING_SELECTORS[attr])(value)
+                else:
+                    raise KeyError(attr)
+            return selector
+        except KeyError:
+            pass
+    return hypium.BY.xpath(xpath)
+
+
+def to_selector(by, value):
+    """
+    Appium 定位器转换为 hypium 选择器
+    :param by: AppiumBy.ID / ACCESSIBILITY_ID / CLASS_NAME / XPATH
+    """
+    BY = load_hypium().BY
+    if by in (AppiumBy.ID, 'id'):
+        return BY.id(value)
+    if by == AppiumBy.ACCESSIBILITY_ID:
+        return BY.key(value)
+    if by == AppiumBy.CLASS_NAME:
+        return BY.type(value)
+    if by == AppiumBy.XPATH:
+        return _xpath_selector(value)
+    raise WebDriverException(f"hypium 后端不支持的定位方式: {by}")
+
+
+def layout_to_xml(layout):
+    """
+    uitest dumpLayout 的 JSON 转为 UiAutomator2 风格的 XML 源码
+    :param layout: dumpLayout 根节点（dict）
+    """
+    def _build(node, parent):
+        attributes = node.get('attributes', {})
+        tag = str(attributes.get('type') or 'node').replace(' ', '_') or 'node'
+        element = etree.SubElement(parent, tag if tag[0].isalpha() else f'node_{tag}')
+        for source, target in _LAYOUT_ATTRIBUTES.items():
+            value = attributes.get(source)
+            if value not in (None, ''):
+                element.set(target, str(value))
+        if not element.get('resource-id') and attributes.get('key'):
+            element.set('resource-id', str(attributes['key']))
+        for child in node.get('children', []):
+            _build(child, element)
+
+    root = etree.Element('hierarchy', rotation='0')
+    _build(layout, root)
+    return etree.tostring(root, encoding='unicode')
+
+
+class HypiumElement:
+    """hypium UiComponent 的 WebElement 风格封装，供 BasePage 和 expected_conditions 使用"""
+
+    def __init__(self, driver, component):
+        self.parent = driver
+        self.component = component
+
+    @property
+    def id(self):
+        return str(id(self.component))
+
+    @property
+    def text(self):
+        return self.component.getText()
+
+    def click(self):
+        self.parent.before_action()
+        self.component.click()
+
+    def send_keys(self, *values):
+        self.parent.before_action()
+        self.component.inputText(''.join(str(value) for value in values))
+
+    def clear(self):
+        self.parent.before_action()
+        self.component.clearText()
+
+    def get_attribute(self, name):
+        if name == 'bounds':
+            bounds = self.component.getBounds()
+            return f"[{bounds.left},{bounds.top}][{bounds.right},{bounds.bottom}]"
+        getter = _COMPONENT_GETTERS.get(name)
+        if getter is None:
+            value = (self.component.getAllProperties() or {}).get(name)
+        else:
+            value = getattr(self.component, getter)()
+        # 与 Appium 一致，布尔属性返回 'true' / 'false'
+        return str(value).lower() if isinstance(value, bool) else value
+
+    @property
+    def rect(self):
+        bounds = self.component.getBounds()
+        return {'x': bounds.left, 'y': bounds.top,
+                'width': bounds.right - bounds.left, 'height': bounds.bottom - bounds.top}
+
+    @property
+    def location(self):
+        rect = self.rect
+        return {'x': rect['x'], 'y': rect['y']}
+
+    @property
+    def size(self):
+        rect = self.rect
+        return {'width': rect['width'], 'height': rect['height']}
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return self.component.isEnabled()
+
+    def is_selected(self):
+        return self.component.isSelected()
+
+
+class _SwitchTo:
+    """driver.switch_to 的子集：hypium 只能操作原生界面，只支持切换到 NATIVE_APP"""
+
+    def context(self, name):
+        if name != NATIVE_CONTEXT:
+            raise WebDriverException(f"hypium 后端不支持切换到上下文 {name}，只支持 {NATIVE_CONTEXT}")
+
+    def __getattr__(self, name):
+        raise WebDriverException(f"hypium 后端不支持 switch_to.{name}")
+
+
+class HypiumDriver:
+    """
+    基于 hypium UiDriver 的鸿蒙原生后端
+    直接经 hdc 与设备上的 uitest 通信，不经过 Appium 服务；
+    对外提供 BasePage 使用的 WebDriver 子集（查找元素、页面源码、截图、手势、设备、应用管理）；
+    没有 WebView 上下文，switch_to 只支持 NATIVE_APP
+    """
+
+    def __init__(self, device_sn=None, app_package=None, app_ability=None, implicit_wait=0):
+        """
+        :param device_sn: 设备序列号，为空时连接 hdc 列出的第一台设备
+        :param app_package: 被测应用包名（bundleName）
+        :param app_ability: 启动的 Ability 名
+        :param implicit_wait: 查找元素的隐式等待（秒）
+        """
+        UiDriver = load_hypium().UiDriver
+        self.ui = UiDriver.connect(device_sn=device_sn) if device_sn else UiDriver.connect()
+        self.app_package = app_package
+        self.app_ability = app_ability
+        self.session_id = self.ui.device_sn
+        # 挂接的 HypiumToastListener，每次操作前重新开始监听
+        self.toast_listener = None
+        self.switch_to = _SwitchTo()
+        self.implicitly_wait(implicit_wait)
+        self.capabilities = {
+            'platformName': 'HarmonyOS',
+            'automationName': AUTOMATION_NAME,
+            'deviceUDID': self.session_id,
+            'appPackage': app_package,
+            'appActivity': app_ability,
+        }
+
+    @classmethod
+    def from_capabilities(cls, caps, implicit_wait=0):
+        """按 config.yaml 中的设备配置创建；appActivity 视为 Ability 名"""
+        return cls(caps.get('udid'), caps.get('appPackage') or caps.get('bundleId'),
+                   (caps.get('appActivity') or '').lstrip('.') or None, implicit_wait)
+
+    def before_action(self):
+        """执行会改变界面的操作前调用：重新开始 Toast 监听，使读到的 Toast 来自本次操作之后"""
+        if self.toast_listener is not None:
+            self.toast_listener.arm()
+
+    # 查找元素
+    def find_elements(self, by=AppiumBy.ID, value=None):
+        components = self.ui.find_all_components(to_selector(by, value))
+        if components is None:
+            return []
+        if not isinstance(components, list):
+            components = [components]
+        return [HypiumElement(self, component) for component in components]
+
+    def find_element(self, by=AppiumBy.ID, value=None):
+        component = self.ui.find_component(to_selector(by, value))
+        if component is None:
+            raise NoSuchElementException(f"未找到元素: {by}={value}")
+        return HypiumElement(self, component)
+
+    def implicitly_wait(self, seconds):
+        self.ui.set_implicit_wait_time(seconds)
+
+    @property
+    def timeouts(self):
+        return SimpleNamespace(implicit_wait=self.ui.get_implicit_wait_time())
+
+    # 页面与截图
+    @property
+    def page_source(self):
+        """当前界面层级（uitest dumpLayout），转换为 UiAutomator2 风格的 XML"""
+        self.ui.shell(f"uitest dumpLayout -p {_REMOTE_LAYOUT}")
+        with tempfile.TemporaryDirectory() as directory:
+            local_path = os.path.join(directory, 'layout.json')
+            self.ui.pull_file(_REMOTE_LAYOUT, local_path)
+            with open(local_path, 'r', encoding='utf-8') as f:
+                return layout_to_xml(json.load(f))
+
+    def get_screenshot_as_base64(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.ui.capture_screen(os.path.join(directory, 'screen.png'))
+            with open(path, 'rb') as f:
+                return base64.b64encode(f.read()).decode('ascii')
+
+    def get_screenshot_as_file(self, filename):
+        self.ui.capture_screen(os.path.abspath(filename))
+        return True
+
+    def get_window_size(self):
+        width, height = self.ui.get_display_size()
+        return {'width': width, 'height': height}
+
+    # 手势
+    def tap(self, positions, duration=None):
+        self.before_action()
+        for x, y in positions:
+            self.ui.touch((x, y), mode='long' if duration else 'normal')
+
+    def swipe(self, start_x, start_y, end_x, end_y, duration=None):
+        self.before_action()
+        self.ui.slide((start_x, start_y), (end_x, end_y), slide_time=(duration or 300) / 1000)
+
+    @staticmethod
+    def _center(element):
+        rect = element.rect
+        return rect['x'] + rect['width'] // 2, rect['y'] + rect['height'] // 2
+
+    def scroll(self, origin_el, destination_el, duration=None):
+        """从 origin_el 中心滑动到 destination_el 中心"""
+        (start_x, start_y), (end_x, end_y) = self._center(origin_el), self._center(destination_el)
+        self.swipe(start_x, start_y, end_x, end_y, duration or 600)
+
+    def drag_and_drop(self, origin_el, destination_el):
+        """长按 origin_el 后拖到 destination_el"""
+        self.before_action()
+        self.ui.drag(origin_el.component, destination_el.component)
+
+    def press_keycode(self, keycode):
+        self.before_action()
+        self.ui.press_key(keycode)
+
+    def hide_keyboard(self):
+        self.before_action()
+        self.ui.press_back()
+
+    def back(self):
+        self.before_action()
+        self.ui.press_back()
+
+    # 上下文：hypium 只能操作原生界面
+    @property
+    def contexts(self):
+        return [NATIVE_CONTEXT]
+
+    @property
+    def current_context(self):
+        return NATIVE_CONTEXT
+
+    # 设备
+    @property
+    def orientation(self):
+        """与 Appium 一致返回 'PORTRAIT' / 'LANDSCAPE'"""
+        rotation = self.ui.get_display_rotation()
+        return 'LANDSCAPE' if getattr(rotation, 'value', rotation) in (1, 3) else 'PORTRAIT'
+
+    @orientation.setter
+    def orientation(self, value):
+        DisplayRotation = load_hypium().DisplayRotation
+        value = str(value).upper()
+        if value not in ('PORTRAIT', 'LANDSCAPE'):
+            raise WebDriverException(f"不支持的屏幕方向: {value}")
+        self.before_action()
+        self.ui.set_display_rotation(DisplayRotation.ROTATION_90 if value == 'LANDSCAPE'
+                                     else DisplayRotation.ROTATION_0)
+
+    @property
+    def device_time(self):
+        """设备时间，格式与 Appium 一致（ISO 8601，如 2024-01-01T12:00:00+0800）"""
+        return self.ui.shell('date +%Y-%m-%dT%H:%M:%S%z').strip()
+
+    def open_notifications(self):
+        """从屏幕顶部左侧下滑打开通知中心（右侧下滑为控制中心）"""
+        width, height = self.ui.get_display_size()
+        self.swipe(width // 4, 1, width // 4, int(height * 0.6), 500)
+
+    # 应用管理
+    @property
+    def current_package(self):
+        return self.ui.current_app()[0]
+
+    def launch_app(self):
+        self.before_action()
+        self.ui.start_app(self.app_package, self.app_ability)
+
+    def close_app(self):
+        self.ui.stop_app(self.app_package)
+
+    def reset(self):
+        self.ui.stop_app(self.app_package)
+        self.ui.clear_app_data(self.app_package)
+        self.ui.start_app(self.app_package, self.app_ability)
+
+    def background_app(self, seconds):
+        self.ui.go_home()
+        time.sleep(seconds)
+        self.ui.start_app(self.app_package, self.app_ability)
+
+    def quit(self):
+        try:
+            self.ui.close()
+        except Exception as e:
+            logger.warning(f"关闭 hypium 连接失败: {str(e)}")
+
+
+class HypiumToastListener:
+    """
+    hypium 原生 Toast 监听（uitest 的 toastShow 事件），与 utils.toast_listener.ToastListener 接口一致，
+    可通过 BasePage.attach_toast_listener 使用
+    uitest 的事件观察是一次性的，读到事件后不会再记录新的 Toast，重复读取只会得到旧的那一条；
+    因此每次读取后、以及 HypiumDriver 执行每个操作前都重新开始监听，读到的 Toast 连同主机时间缓存在本地。
+    Toast.t 为读到事件的时间，不早于实际出现时间；操作前重新监听会丢弃上一次操作后尚未读取的 Toast，
+    需在触发 Toast 的操作之后、下一次操作之前读取
+    """
+
+    def __init__(self, driver, capacity=50):
+        """
+        :param driver: HypiumDriver
+        :param capacity: 缓存的 Toast 数量
+        """
+        self.driver = driver
+        self.toasts = deque(maxlen=capacity)
+        self._listening = False
+
+    @property
+    def is_active(self):
+        return self._listening
+
+    def start(self):
+        """开始监听，并挂接到驱动上使其在每次操作前重新监听"""
+        self.driver.toast_listener = self
+        self.arm()
+        if self._listening:
+            logger.info("Toast 监听已启动: hypium toastShow")
+        return self
+
+    def stop(self):
+        if self.driver.toast_listener is self:
+            self.driver.toast_listener = None
+        self._listening = False
+
+    def arm(self):
+        """开始新一轮监听，设备端之前记录但尚未读取的事件被清除"""
+        try:
+            self.driver.ui.start_listen_toast()
+            self._listening = True
+        except Exception as e:
+            logger.warning(f"开启 Toast 监听失败，将回退为 XPath 查询: {str(e)}")
+            self._listening = False
+
+    def _collect(self, timeout):
+        """读取本轮监听到的 Toast 并重新开始监听"""
+        try:
+            text = self.driver.ui.get_latest_toast(timeout)
+        except Exception as e:
+            logger.warning(f"读取 Toast 失败: {str(e)}")
+            text = None
+        toast = None
+        if text:
+            toast = Toast(time.monotonic(), text, None)
+            self.toasts.append(toast)
+        self.arm()
+        return toast
+
+    def _find_buffered(self, partial_text, since):
+        for toast in reversed(self.toasts):
+            if toast.t < since:
+                break
+            if partial_text is None or partial_text in toast.text:
+                return toast
+        return None
+
+    def find(self, partial_text=None, since=0.0):
+        """读取已到达的 Toast（不等待），返回 since 之后出现的最近一条匹配的 Toast"""
+        self._collect(0)
+        return self._find_buffered(partial_text, since)
+
+    def wait_for(self, partial_text=None, timeout=3, since=None):
+        """
+        等待 Toast 出现，缓冲区中已有的也算
+        :param since: 只接受该时间（time.monotonic）之后读到的 Toast，默认往前追溯一个 Toast 显示时长
+        :return: Toast；超时返回 None
+        """
+        if since is None:
+            since = time.monotonic() - TOAST_LONG_DURATION
+        deadline = time.monotonic() + timeout
+        while True:
+            toast = self._find_buffered(partial_text, since)
+            remaining = deadline - time.monotonic()
+            if toast is not None or remaining <= 0:
+                return toast
+            if self._collect(remaining) is None:
+                # 部分 agent 模式下超时按整秒取整，避免不足一秒时空转
+                time.sleep(min(0.1, max(deadline - time.monotonic(), 0)))
+
+    def clear(self):
+        self.toasts.clear()
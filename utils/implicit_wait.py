@@ -0,0 +1,78 @@
+import time
+from contextlib import contextmanager
+from utils.logger import logger
+from utils.xpath_translator import optimize_locator
+
+# 记录在 driver 实例上的当前隐式等待（秒），避免每次都向服务端查询
+_CACHE_ATTR = '_lookup_implicit_wait'
+_DEPTH_ATTR = '_lookup_no_wait_depth'
+
+
+def get_implicit_wait(driver):
+    """
+    当前隐式等待时间（秒）
+    优先使用 set_implicit_wait 记录的值，否则查询一次服务端并缓存
+    :return: 秒数，无法获取时返回 None
+    """
+    cached = getattr(driver, _CACHE_ATTR, None)
+    if cached is not None:
+        return cached
+    try:
+        cached = driver.timeouts.implicit_wait
+    except Exception as e:
+        logger.debug(f"获取隐式等待时间失败: {str(e)}")
+        return None
+    setattr(driver, _CACHE_ATTR, cached)
+    return cached
+
+
+def set_implicit_wait(driver, seconds):
+    """设置隐式等待并记录，供 no_implicit_wait 恢复时使用"""
+    driver.implicitly_wait(seconds)
+    setattr(driver, _CACHE_ATTR, seconds)
+
+
+@contextmanager
+def no_implicit_wait(driver):
+    """
+    临时将隐式等待置为 0
+    用于探测性查找和多策略搜索：未命中立即返回，等待交给显式、有上限的条件。
+    可嵌套，只在最外层切换一次；隐式等待本来就是 0 时不发送任何请求
+    """
+    depth = getattr(driver, _DEPTH_ATTR, 0)
+    previous = get_implicit_wait(driver) if depth == 0 else None
+    if previous:
+        set_implicit_wait(driver, 0)
+    setattr(driver, _DEPTH_ATTR, depth + 1)
+    try:
+        yield driver
+    finally:
+        setattr(driver, _DEPTH_ATTR, depth)
+        if previous:
+            set_implicit_wait(driver, previous)
+
+
+def find_first(driver, locators, timeout=0, poll_interval=0.25):
+    """
+    按顺序尝试多个候选定位器，返回第一个命中的
+    每轮在隐式等待为 0 的情况下把所有候选各查一次，直到命中或超过 timeout
+    :param driver: WebDriver
+    :param locators: [(by, value), ...]
+    :param timeout: 总等待上限（秒），0 表示只尝试一轮
+    :param poll_interval: 轮询间隔（秒）
+    :return: (locator, element)，都未命中时返回 (None, None)
+    """
+    deadline = time.monotonic() + timeout
+    with no_implicit_wait(driver):
+        while True:
+            for locator in locators:
+                try:
+                    elements = driver.find_elements(*optimize_locator(locator, driver))
+                except Exception as e:
+                    logger.debug(f"定位器 {locator} 查找失败: {str(e)}")
+                    continue
+                if elements:
+                    return locator, elements[0]
+            if time.monotonic() + poll_interval > deadline:
+                return None, None
+            time.sleep(poll_interval)
@@ -0,0 +1,408 @@
+import re
+import keyword
+import inspect
+from collections import Counter, namedtuple
+from appium.webdriver.common.appiumby import AppiumBy
+from utils.ui_hierarchy import UiHierarchy
+
+# 生成代码中定位方式的写法
+BY_NAMES = {
+    AppiumBy.ID: 'AppiumBy.ID',
+    AppiumBy.ACCESSIBILITY_ID: 'AppiumBy.ACCESSIBILITY_ID',
+    AppiumBy.ANDROID_UIAUTOMATOR: 'AppiumBy.ANDROID_UIAUTOMATOR',
+    AppiumBy.IOS_PREDICATE: 'AppiumBy.IOS_PREDICATE',
+    AppiumBy.XPATH: 'AppiumBy.XPATH',
+    AppiumBy.CLASS_NAME: 'AppiumBy.CLASS_NAME',
+}
+
+# 设备端求值的相对开销：id / accessibility id 走索引查找；UiSelector / iOS predicate 由系统原生遍历；
+# XPath 需要服务端先导出整棵层级再求值，层级越深越慢
+COST_ID = 1.0
+COST_ACCESSIBILITY_ID = 1.0
+COST_UIAUTOMATOR = 2.0
+COST_IOS_PREDICATE = 2.0
+COST_XPATH_ATTRIBUTE = 6.0
+COST_XPATH_ANCHORED = 7.0
+COST_XPATH_ABSOLUTE = 10.0
+# 稳定性低于该值的候选只在没有更稳定的候选时使用
+MIN_STABILITY = 0.5
+
+_DIGITS_RE = re.compile(r'\d')
+_GENERATED_ID_RE = re.compile(r'(\d{2,}|^[a-z]{1,2}\d*$)')
+
+LocatorCandidate = namedtuple('LocatorCandidate', ['by', 'value', 'cost', 'stability', 'kind', 'key'])
+
+
+def xpath_literal(value):
+    """将字符串转换为 XPath 字面量，正确处理引号"""
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    parts = value.split("'")
+    return "concat(" + ", \"'\", ".join(f"'{part}'" for part in parts) + ")"
+
+
+def java_literal(value):
+    """将字符串转换为 UiSelector 使用的 Java 字符串字面量"""
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def predicate_literal(value):
+    """将字符串转换为 iOS predicate（NSPredicate）中的字符串字面量，转义规则与 Java 相同"""
+    return java_literal(value)
+
+
+_reserved_names = None
+
+
+def reserved_names():
+    """生成的页面类继承 BasePage，元素属性名不能与 BasePage 的方法、属性或 Python 关键字重名"""
+    global _reserved_names
+    if _reserved_names is None:
+        # 延迟导入：pages.base_page 依赖本模块
+        from pages.base_page import BasePage
+        # 实例属性（driver、backend 等）在 __init__ 中赋值，不在 dir(BasePage) 中
+        instance_attributes = re.findall(r'self\.(\w+)\s*=', inspect.getsource(BasePage.__init__))
+        _reserved_names = frozenset(dir(BasePage)) | frozenset(instance_attributes) | frozenset(keyword.kwlist)
+    return _reserved_names
+
+
+def element_name(value):
+    """将元素文本 / id 转换为合法的 Python 属性名；与保留名冲突时加 _el 后缀"""
+    name = re.sub(r'\W+', '_', str(value or '').strip().lower()).strip('_')
+    if not name:
+        return 'element'
+    if name[0].isdigit():
+        name = f'_{name}'
+    if name in reserved_names():
+        name = f'{name}_el'
+    return name
+
+
+def short_id(resource_id):
+    """去掉 resource-id 的包名前缀，如 com.app:id/login -> login"""
+    return resource_id.split(':id/', 1)[-1]
+
+
+def _id_stability(resource_id):
+    # 带长数字串或极短的 id 多为自动生成 / 混淆后的名称
+    return 0.6 if _GENERATED_ID_RE.search(short_id(resource_id)) else 1.0
+
+
+def _text_stability(text, base):
+    # 含数字的文本（计数、时间、价格）和长文本容易随数据变化
+    if _DIGITS_RE.search(text):
+        return base * 0.6
+    if len(text) > 30:
+        return base * 0.7
+    return base
+
+
+class _SnapshotIndex:
+    """单个快照上的唯一性索引：属性取值计数 + 锚点节点 + 绝对路径"""
+
+    def __init__(self, hierarchy):
+        self.hierarchy = hierarchy
+        self.counts = Counter()
+        self.nodes_by_key = {}
+        for node in hierarchy:
+            for key in LocatorGenerator.attribute_keys(node):
+                self.counts[key] += 1
+                self.nodes_by_key[key] = node
+        self._absolute = None
+
+    def unique_node(self, key):
+        return self.nodes_by_key[key] if self.counts[key] == 1 else None
+
+    @property
+    def absolute_paths(self):
+        if self._absolute is None:
+            self._absolute = {node.xpath() for node in self.hierarchy}
+        return self._absolute
+
+    def resolves(self, candidate):
+        """候选定位器在该快照上是否唯一命中"""
+        kind, key = candidate.kind, candidate.key
+        if kind == 'attribute':
+            return self.counts[key] == 1
+        if kind == 'instance':
+            _, resource_id, instance = key
+            return self.counts[('id', resource_id)] > instance
+        if kind == 'anchored':
+            anchor_key, steps = key
+            node = self.unique_node(anchor_key)
+            for tag, sibling_index in steps:
+                if node is None:
+                    return False
+                same_tag = [child for child in node.children if child.tag == tag]
+                node = same_tag[sibling_index - 1] if len(same_tag) >= sibling_index else None
+            return node is not None
+        return candidate.value in self.absolute_paths
+
+
+class LocatorGenerator:
+    """
+    定位器合成器
+    对一次（或多次）页面快照在本地统计各属性取值的出现次数，为每个节点列出所有在页面内唯一的候选定位器，
+    按设备端求值开销和跨快照稳定性打分，选择稳定性达标的候选中开销最低的一个：
+    id > accessibility id > UiSelector（-android uiautomator）/ iOS predicate > 锚定 XPath > 绝对 XPath
+    """
+
+    def __init__(self, hierarchy, snapshots=None, platform=None, min_stability=MIN_STABILITY):
+        """
+        :param hierarchy: 生成定位器的页面快照（UiHierarchy）
+        :param snapshots: 同一页面的其他快照，用于评估候选在界面数据变化后是否仍然唯一
+        :param platform: 'android' / 'ios'，默认根据层级内容判断
+        :param min_stability: 稳定性阈值
+        """
+        self.hierarchy = hierarchy
+        self.index = _SnapshotIndex(hierarchy)
+        self.snapshots = [_SnapshotIndex(snapshot) for snapshot in snapshots or ()]
+        self.platform = platform or self._detect_platform(hierarchy)
+        self.min_stability = min_stability
+        # 每个节点在同 resource-id 节点中的序号（UiSelector.instance）
+        self._instances = {}
+        seen = Counter()
+        for node in hierarchy:
+            if node.resource_id:
+                self._instances[node.index] = seen[node.resource_id]
+                seen[node.resource_id] += 1
+
+    @classmethod
+    def from_page_source(cls, page_source, snapshots=None, **kwargs):
+        """
+        :param page_source: 页面源码
+        :param snapshots: 同一页面其他时刻的页面源码列表
+        """
+        return cls(UiHierarchy.from_xml(page_source),
+                   [UiHierarchy.from_xml(source) for source in snapshots or ()], **kwargs)
+
+    @staticmethod
+    def _detect_platform(hierarchy):
+        if hierarchy.root.tag == 'hierarchy' or any('resource-id' in node.attrs for node in hierarchy.nodes[:50]):
+            return 'android'
+        return 'ios'
+
+    @staticmethod
+    def attribute_keys(node):
+        keys = []
+        if node.resource_id:
+            keys.append(('id', node.resource_id))
+            keys.append(('class+id', node.cls, node.resource_id))
+            if node.text:
+                keys.append(('id+text', node.resource_id, node.text))
+        if node.desc:
+            keys.append(('desc', node.desc))
+        if node.text:
+            keys.append(('text', node.text))
+            keys.append(('class+text', node.cls, node.text))
+        return keys
+
+    def is_unique(self, key):
+        return self.index.counts[key] == 1
+
+    def _anchor_for(self, node):
+        """
+        最近的、在页面内唯一的祖先节点，以及从锚点到目标节点的子路径
+        :return: (anchor_key, 锚点 XPath, steps) 或 None
+        """
+        steps = []
+        current = node
+        for ancestor in node.ancestors():
+            steps.append((current.tag, current.sibling_index))
+            current = ancestor
+            names = ancestor.attribute_names
+            if ancestor.resource_id and self.is_unique(('id', ancestor.resource_id)):
+                return ('id', ancestor.resource_id), \
+                    f"//*[@{names['resource_id']}={xpath_literal(ancestor.resource_id)}]", tuple(reversed(steps))
+            if ancestor.desc and self.is_unique(('desc', ancestor.desc)):
+                return ('desc', ancestor.desc), f"//*[@{names['desc']}={xpath_literal(ancestor.desc)}]", \
+                    tuple(reversed(steps))
+        return None
+
+    def _attribute_candidates(self, node):
+        """(kind 为 attribute 的) 候选：(key, by, value, cost, stability)"""
+        rid, desc, text, cls = node.resource_id, node.desc, node.text, node.cls
+        if self.platform == 'ios':
+            yield from self._ios_candidates(node)
+            return
+        android = self.platform == 'android'
+        if rid:
+            yield ('id', rid), AppiumBy.ID, rid, COST_ID, _id_stability(rid)
+        if desc:
+            yield ('desc', desc), AppiumBy.ACCESSIBILITY_ID, desc, COST_ACCESSIBILITY_ID, _text_stability(desc, 0.9)
+        if android:
+            selector = 'new UiSelector()'
+            if text:
+                yield ('text', text), AppiumBy.ANDROID_UIAUTOMATOR, f'{selector}.text({java_literal(text)})', \
+                    COST_UIAUTOMATOR, _text_stability(text, 0.8)
+                yield ('class+text', cls, text), AppiumBy.ANDROID_UIAUTOMATOR, \
+                    f'{selector}.className({java_literal(cls)}).text({java_literal(text)})', \
+                    COST_UIAUTOMATOR, _text_stability(text, 0.8)
+            if rid and text:
+                yield ('id+text', rid, text), AppiumBy.ANDROID_UIAUTOMATOR, \
+                    f'{selector}.resourceId({java_literal(rid)}).text({java_literal(text)})', \
+                    COST_UIAUTOMATOR, _id_stability(rid) * _text_stability(text, 0.9)
+        else:
+            if text:
+                yield ('text', text), AppiumBy.XPATH, f"//*[@text={xpath_literal(text)}]", \
+                    COST_XPATH_ATTRIBUTE, _text_stability(text, 0.8)
+            if rid and text:
+                yield ('id+text', rid, text), AppiumBy.XPATH, \
+                    f"//*[@resource-id={xpath_literal(rid)}][@text={xpath_literal(text)}]", \
+                    COST_XPATH_ATTRIBUTE, _id_stability(rid) * _text_stability(text, 0.9)
+        if rid:
+            yield ('class+id', cls, rid), AppiumBy.XPATH, f"//{cls}[@resource-id={xpath_literal(rid)}]", \
+                COST_XPATH_ATTRIBUTE, _id_stability(rid)
+
+    @staticmethod
+    def _ios_candidates(node):
+        """
+        XCUITest 的属性候选：name 用 accessibility id，label / value 用 iOS predicate，
+        键与 Android 相同（resource_id / text / desc 分别对应 name / label / value）
+        """
+        rid, desc, text, cls = node.resource_id, node.desc, node.text, node.cls
+        if rid:
+            yield ('id', rid), AppiumBy.ACCESSIBILITY_ID, rid, COST_ACCESSIBILITY_ID, _id_stability(rid)
+        if text:
+            yield ('text', text), AppiumBy.IOS_PREDICATE, f'label == {predicate_literal(text)}', \
+                COST_IOS_PREDICATE, _text_stability(text, 0.8)
+            yield ('class+text', cls, text), AppiumBy.IOS_PREDICATE, \
+                f'type == {predicate_literal(cls)} AND label == {predicate_literal(text)}', \
+                COST_IOS_PREDICATE, _text_stability(text, 0.8)
+        if desc:
+            # value 随输入和状态变化，稳定性低于 label
+            yield ('desc', desc), AppiumBy.IOS_PREDICATE, f'value == {predicate_literal(desc)}', \
+                COST_IOS_PREDICATE, _text_stability(desc, 0.6)
+        if rid and text:
+            yield ('id+text', rid, text), AppiumBy.IOS_PREDICATE, \
+                f'name == {predicate_literal(rid)} AND label == {predicate_literal(text)}', \
+                COST_IOS_PREDICATE, _id_stability(rid) * _text_stability(text, 0.9)
+        if rid:
+            yield ('class+id', cls, rid), AppiumBy.IOS_PREDICATE, \
+                f'type == {predicate_literal(cls)} AND name == {predicate_literal(rid)}', \
+                COST_IOS_PREDICATE, _id_stability(rid)
+
+    def candidates(self, node):
+        """
+        节点的全部唯一候选定位器（未排序）
+        :return: [LocatorCandidate]
+        """
+        result = []
+        for key, by, value, cost, stability in self._attribute_candidates(node):
+            if self.is_unique(key):
+                result.append(LocatorCandidate(by, value, cost, stability, 'attribute', key))
+
+        rid = node.resource_id
+        if self.platform == 'android' and rid and not self.is_unique(('id', rid)):
+            # 列表项等重复 id 用 instance 区分，依赖顺序，稳定性较低
+            instance = self._instances[node.index]
+            result.append(LocatorCandidate(
+                AppiumBy.ANDROID_UIAUTOMATOR,
+                f'new UiSelector().resourceId({java_literal(rid)}).instance({instance})',
+                COST_UIAUTOMATOR + 0.5, 0.4 * _id_stability(rid), 'instance', ('id#', rid, instance)))
+
+        anchor = self._anchor_for(node)
+        if anchor:
+            anchor_key, anchor_xpath, steps = anchor
+            path = '/'.join(f'{tag}[{index}]' for tag, index in steps)
+            anchor_stability = _id_stability(anchor_key[1]) if anchor_key[0] == 'id' else 0.9
+            result.append(LocatorCandidate(
+                AppiumBy.XPATH, f'{anchor_xpath}/{path}', COST_XPATH_ANCHORED + 0.5 * len(steps),
+                anchor_stability * 0.9 ** len(steps), 'anchored', (anchor_key, steps)))
+
+        result.append(LocatorCandidate(AppiumBy.XPATH, node.xpath(), COST_XPATH_ABSOLUTE + 0.1 * node.depth,
+                                       0.3, 'absolute', None))
+        return [self._observe(candidate) for candidate in result]
+
+    def _observe(self, candidate):
+        """按候选在其他快照上仍然唯一命中的比例修正稳定性"""
+        if not self.snapshots:
+            return candidate
+        hits = sum(1 for snapshot in self.snapshots if snapshot.resolves(candidate))
+        return candidate._replace(stability=round(candidate.stability * hits / len(self.snapshots), 3))
+
+    def best_candidate(self, node):
+        """稳定性达标的候选中开销最低的一个；都不达标时取最稳定的"""
+        if not self.snapshots:
+            # 单快照时属性候选若已达标，不可能被更贵的 instance / 锚定 / 绝对路径候选超过
+            stable = [LocatorCandidate(by, value, cost, stability, 'attribute', key)
+                      for key, by, value, cost, stability in self._attribute_candidates(node)
+                      if cost <= max(COST_UIAUTOMATOR, COST_IOS_PREDICATE) and stability >= self.min_stability and self.is_unique(key)]
+            if stable:
+                return min(stable, key=lambda c: (c.cost, -c.stability))
+        candidates = self.candidates(node)
+        stable = [c for c in candidates if c.stability >= self.min_stability]
+        if stable:
+            return min(stable, key=lambda c: (c.cost, -c.stability))
+        return max(candidates, key=lambda c: (c.stability, -c.cost))
+
+    def locator_for(self, node):
+        """
+        为节点生成页面内唯一的定位器
+        :return: (by, value)
+        """
+        candidate = self.best_candidate(node)
+        return candidate.by, candidate.value
+
+    def find_node(self, element_text=None, element_id=None):
+        """按 id / 文本在快照中查找节点：id 精确匹配 > 文本精确匹配 > 文本包含"""
+        if element_id:
+            for node in self.hierarchy:
+                if node.resource_id and (node.resource_id == element_id or short_id(node.resource_id) == element_id):
+                    return node
+        if element_text:
+            for match in (lambda node: element_text in (node.text, node.desc),
+                          lambda node: element_text in node.text or element_text in node.desc):
+                for node in self.hierarchy:
+                    if match(node):
+                        return node
+        return None
+
+    @staticmethod
+    def _name_for(node):
+        return element_name(node.text or node.desc or short_id(node.resource_id) or node.cls.rsplit('.', 1)[-1])
+
+    def generate(self, nodes=None):
+        """
+        为带 text / resource-id / content-desc 的节点生成定位器
+        :param nodes: 指定节点，默认整页
+        :return: [(name, (by, value), node)]，名称已去重
+        """
+        result = []
+        used = Counter()
+        for node in nodes if nodes is not None else self.hierarchy:
+            if not (node.text or node.resource_id or node.desc):
+                continue
+            name = self._name_for(node)
+            used[name] += 1
+            if used[name] > 1:
+                name = f'{name}_{used[name]}'
+            result.append((name, self.locator_for(node), node))
+        return result
+
+    @staticmethod
+    def format_locator(locator):
+        by, value = locator
+        return f"({BY_NAMES.get(by, repr(by))}, {value!r})"
+
+    def page_elements_code(self, indent=''):
+        """每个元素一行的定位代码"""
+        return '\n'.join(f"{indent}{name} = {self.format_locator(locator)}"
+                         for name, locator, _ in self.generate())
+
+    def page_object_code(self, class_name='GeneratedPage'):
+        """生成完整的页面对象文件内容"""
+        lines = [
+            'from appium.webdriver.common.appiumby import AppiumBy',
+            'from pages.base_page import BasePage',
+            '',
+            '',
+            f'class {class_name}(BasePage):',
+            '    """由 LocatorGenerator 根据页面快照生成"""',
+            '',
+        ]
+        body = self.page_elements_code(indent='    ')
+        lines.append(body or '    pass')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,90 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from lxml import etree
+from utils.logger import logger
+from utils.element_batch import match_nodes
+from utils.implicit_wait import no_implicit_wait
+from utils.xpath_translator import optimize_locator
+
+
+def _probe(driver, locator):
+    """在设备上查找一次，未命中或出错时返回空列表"""
+    try:
+        return driver.find_elements(*optimize_locator(locator, driver))
+    except Exception as e:
+        logger.debug(f"定位器 {locator} 查找失败: {str(e)}")
+        return []
+
+
+def find_first_snapshot(driver, candidates, timeout=0, poll_interval=0.25):
+    """
+    基于页面快照选出第一个命中的候选
+    每轮只取一次页面源码，在本地按顺序对候选求值，只把第一个本地命中的候选发到设备上解析为元素；
+    无法在本地求值的定位方式（如 -android uiautomator）直接在设备上查找
+    :param driver: WebDriver
+    :param candidates: [(by, value), ...]，按优先级排列
+    :param timeout: 总等待上限（秒），0 表示只尝试一轮
+    :param poll_interval: 轮询间隔（秒）
+    :return: (locator, element)，都未命中时返回 (None, None)
+    """
+    deadline = time.monotonic() + timeout
+    with no_implicit_wait(driver):
+        while True:
+            try:
+                source = driver.page_source
+                tree = etree.fromstring(source.encode('utf-8') if isinstance(source, str) else source)
+            except Exception as e:
+                logger.warning(f"获取页面快照失败，候选改为逐个在设备上查找: {str(e)}")
+                tree = None
+            for locator in candidates:
+                nodes = match_nodes(tree, *locator) if tree is not None else None
+                if nodes == []:
+                    continue
+                elements = _probe(driver, locator)
+                if elements:
+                    return locator, elements[0]
+            if time.monotonic() + poll_interval > deadline:
+                return None, None
+            time.sleep(poll_interval)
+
+
+def find_first_race(driver, candidates, timeout=0, poll_interval=0.25, max_workers=8):
+    """
+    并发查找所有候选，返回优先级最高的命中
+    每个查找在独立线程中经连接池的独立连接发出；Appium 在服务端按会话串行执行命令，
+    因此收益主要来自重叠网络往返（远程设备 / 云真机），本地设备上优先使用 find_first_snapshot。
+    某个候选命中后，要等排在它前面的候选都返回未命中才采用，结果与按顺序查找一致
+    :param driver: WebDriver
+    :param candidates: [(by, value), ...]，按优先级排列
+    :param timeout: 总等待上限（秒），0 表示只尝试一轮
+    :param poll_interval: 轮询间隔（秒）
+    :param max_workers: 最大并发数
+    :return: (locator, element)，都未命中时返回 (None, None)
+    """
+    deadline = time.monotonic() + timeout
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(candidates)) or 1)
+    try:
+        with no_implicit_wait(driver):
+            while True:
+                futures = [pool.submit(_probe, driver, locator) for locator in candidates]
+                index_of = {future: index for index, future in enumerate(futures)}
+                # None 表示尚未返回
+                results = [None] * len(candidates)
+                pending = set(futures)
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        results[index_of[future]] = future.result()
+                    for index, elements in enumerate(results):
+                        if elements is None:
+                            # 更高优先级的候选还在查找
+                            break
+                        if elements:
+                            for other in pending:
+                                other.cancel()
+                            return candidates[index], elements[0]
+                if time.monotonic() + poll_interval > deadline:
+                    return None, None
+                time.sleep(poll_interval)
+    finally:
+        pool.shutdown(wait=False)
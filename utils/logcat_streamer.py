@@ -0,0 +1,213 @@
+import re
+import time
+import threading
+import subprocess
+from collections import deque, namedtuple
+from utils.logger import logger
+
+# t: 行到达主机时的单调时钟时间；time: 设备上的时间戳文本
+LogRecord = namedtuple('LogRecord', ['t', 'time', 'pid', 'tid', 'level', 'tag', 'message'])
+CrashEvent = namedtuple('CrashEvent', ['t', 'kind', 'process', 'record'])
+
+LEVELS = 'VDIWEFA'
+
+# -v threadtime: "10-19 03:50:26.498  1234  1250 E AndroidRuntime: FATAL EXCEPTION: main"
+_THREADTIME_RE = re.compile(r'^(\d\d-\d\d \d\d:\d\d:\d\d\.\d+)\s+(\d+)\s+(\d+)\s+([VDIWEFA])\s+(.*?)\s*: ?(.*)$')
+_PROCESS_RE = re.compile(r'^Process: ([^,\s]+)')
+_ANR_RE = re.compile(r'^ANR in (\S+)')
+_NATIVE_PROCESS_RE = re.compile(r'pid \d+ \(([^)]+)\)')
+
+
+def parse_threadtime(line):
+    """解析一行 threadtime 格式日志，无法解析（如 --------- beginning of）时返回 None"""
+    match = _THREADTIME_RE.match(line.rstrip('\r\n'))
+    if not match:
+        return None
+    timestamp, pid, tid, level, tag, message = match.groups()
+    return LogRecord(time.monotonic(), timestamp, int(pid), int(tid), level, tag, message)
+
+
+class LogcatStreamer:
+    """
+    设备日志流
+    每台设备只保持一个 adb logcat -v threadtime 进程，后台逐行解析为结构化记录放入有界环形缓冲区；
+    FATAL EXCEPTION、ANR 和 native crash 在到达时即建立索引并通知监听者，
+    测试结束后按时间窗口切出相关日志，不再事后拉取整份日志；
+    播放探针、Toast 监听等需要日志的组件通过 add_record_listener 共用该日志流，不再各自启动 logcat
+    """
+
+    def __init__(self, device_id=None, capacity=20000):
+        """
+        :param device_id: adb 设备序列号
+        :param capacity: 环形缓冲区保留的日志行数
+        """
+        self.device_id = device_id
+        self.buffer = deque(maxlen=capacity)
+        self.crash_events = []
+        self._listeners = []
+        self._record_listeners = []
+        self._pending_fatal = {}
+        self._lock = threading.Lock()
+        self._arrived = threading.Condition(self._lock)
+        self._process = None
+        self._thread = None
+
+    @property
+    def is_running(self):
+        return self._process is not None and self._process.poll() is None
+
+    def start(self):
+        """启动日志流（-T 1：只读取启动之后的新日志）"""
+        if self.is_running:
+            return self
+        command = ['adb'] + (['-s', self.device_id] if self.device_id else []) + \
+                  ['logcat', '-v', 'threadtime', '-T', '1']
+        try:
+            self._process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                             text=True, errors='replace', bufsize=1)
+        except OSError as e:
+            logger.error(f"启动 logcat 失败: {str(e)}")
+            self._process = None
+            return self
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+        logger.info(f"logcat 日志流已启动: {self.device_id or 'default'}")
+        return self
+
+    def add_listener(self, callback):
+        """注册崩溃监听，callback(CrashEvent) 在日志读取线程中调用"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def add_record_listener(self, callback):
+        """注册日志监听，callback(LogRecord) 对每一行日志在日志读取线程中调用，需尽快返回"""
+        self._record_listeners.append(callback)
+
+    def remove_record_listener(self, callback):
+        if callback in self._record_listeners:
+            self._record_listeners.remove(callback)
+
+    def wait_past(self, t, timeout=1.0):
+        """
+        等待到达时间晚于 t 的日志，保证 t 之前产生、仍在管道中的日志已进入缓冲区
+        设备长时间没有新日志时最多等待 timeout
+        :return: 是否已读到 t 之后的日志
+        """
+        deadline = time.monotonic() + timeout
+        with self._arrived:
+            while not self.buffer or self.buffer[-1].t <= t:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.is_running:
+                    return False
+                self._arrived.wait(remaining)
+            return True
+
+    def _read(self):
+        for line in self._process.stdout:
+            record = parse_threadtime(line)
+            if record is None:
+                continue
+            with self._arrived:
+                self.buffer.append(record)
+                self._arrived.notify_all()
+            for callback in list(self._record_listeners):
+                try:
+                    callback(record)
+                except Exception as e:
+                    logger.warning(f"日志监听回调失败: {str(e)}")
+            crash = self._detect_crash(record)
+            if crash is not None:
+                with self._lock:
+                    self.crash_events.append(crash)
+                logger.error(f"检测到 {crash.kind}: {crash.process or '-'} {crash.record.message}")
+                for callback in list(self._listeners):
+                    try:
+                        callback(crash)
+                    except Exception as e:
+                        logger.warning(f"崩溃监听回调失败: {str(e)}")
+
+    def _detect_crash(self, record):
+        if record.tag == 'AndroidRuntime':
+            if record.message.startswith('FATAL EXCEPTION'):
+                self._pending_fatal[record.pid] = record
+                return None
+            # 进程名在 FATAL EXCEPTION 的下一行给出
+            fatal = self._pending_fatal.pop(record.pid, None)
+            if fatal is not None:
+                process = _PROCESS_RE.match(record.message)
+                return CrashEvent(fatal.t, 'crash', process.group(1) if process else None, fatal)
+        elif record.tag == 'ActivityManager':
+            anr = _ANR_RE.match(record.message)
+            if anr:
+                return CrashEvent(record.t, 'anr', anr.group(1), record)
+        elif record.tag == 'libc' and record.message.startswith('Fatal signal'):
+            process = _NATIVE_PROCESS_RE.search(record.message)
+            return CrashEvent(record.t, 'native_crash', process.group(1) if process else None, record)
+        return None
+
+    def records(self, since=0.0, until=None, min_level='V', pid=None, tag=None):
+        """按时间窗口和条件过滤缓冲区中的日志"""
+        threshold = LEVELS.index(min_level)
+        with self._lock:
+            records = list(self.buffer)
+        return [record for record in records
+                if record.t >= since and (until is None or record.t <= until)
+                and LEVELS.index(record.level) >= threshold
+                and (pid is None or record.pid == pid) and (tag is None or record.tag == tag)]
+
+    def crashes(self, since=0.0, until=None, package=None):
+        """时间窗口内的崩溃 / ANR；package 不为空时只返回该应用（含其子进程）的"""
+        with self._lock:
+            events = list(self.crash_events)
+        return [event for event in events
+                if event.t >= since and (until is None or event.t <= until)
+                and (package is None or (event.process or '').split(':')[0] == package)]
+
+    def slice(self, since, until=None, min_level='W', limit=200):
+        """
+        测试失败时附加的日志片段：窗口内不低于 min_level 的日志，以及崩溃进程的完整堆栈
+        :return: threadtime 格式的文本
+        """
+        crash_pids = {event.record.pid for event in self.crashes(since, until)}
+        threshold = LEVELS.index(min_level)
+        lines = [record for record in self.records(since, until)
+                 if LEVELS.index(record.level) >= threshold or record.pid in crash_pids]
+        return '\n'.join(f"{r.time} {r.pid:>5} {r.tid:>5} {r.level} {r.tag}: {r.message}" for r in lines[-limit:])
+
+    def stop(self):
+        if self.is_running:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._process = self._thread = None
+
+
+_streamers = {}
+_streamers_lock = threading.Lock()
+
+
+def get_streamer(device_id=None, **kwargs):
+    """获取设备的日志流（每台设备一个），首次调用时启动"""
+    with _streamers_lock:
+        streamer = _streamers.get(device_id)
+        if streamer is None:
+            streamer = _streamers[device_id] = LogcatStreamer(device_id, **kwargs)
+        if not streamer.is_running:
+            streamer.start()
+        return streamer
+
+
+def close_streamers():
+    """停止所有设备的日志流"""
+    with _streamers_lock:
+        streamers = list(_streamers.values())
+        _streamers.clear()
+    for streamer in streamers:
+        streamer.stop()
@@ -1,3 +1,4 @@
+import time
 from selenium.common.exceptions import TimeoutException
 
 class VideoElement:
@@ -59,6 +60,55 @@ def unmute(self):
             self.element
         )
 
+    @staticmethod
+    def _require_streaming(recorder):
+        """appium 模式的帧在 stop 后才解码、时间戳与 mark 不在同一时钟，无法在录制期间测量"""
+        if not recorder.streaming:
+            raise ValueError(f"首帧/切换耗时需要 adb 模式的 ScreenRecorder，当前为 {recorder.mode} 模式")
+
+    def measure_first_frame(self, recorder, action=None, timeout=5.0):
+        """
+        测量首帧耗时：从触发播放到视频区域画面第一次变化
+        需在 recorder 录制期间调用，测量过程只读取本地帧缓冲，不再与设备往返
+        :param recorder: 已开始录制的 ScreenRecorder
+        :param action: 触发播放的操作，默认点击播放
+        :param timeout: 最长等待时间（秒）
+        :return: 秒；超时返回 None
+        """
+        self._require_streaming(recorder)
+        region = recorder.scale_region(self.element.rect)
+        since = recorder.mark('first_frame')
+        (action or self.play)()
+        return recorder.wait_for(lambda: recorder.time_to_first_change(since, region), timeout)
+
+    def measure_switch_latency(self, recorder, action, timeout=5.0, quiet_period=0.3):
+        """
+        测量视频切换耗时：从触发切换（如上滑）到视频区域画面稳定
+        :param recorder: 已开始录制的 ScreenRecorder
+        :param action: 触发切换的操作
+        :param timeout: 最长等待时间（秒）
+        :param quiet_period: 画面保持不变多久视为稳定（秒）
+        :return: 秒；超时或画面没有变化返回 None
+        """
+        self._require_streaming(recorder)
+        region = recorder.scale_region(self.element.rect)
+        since = recorder.mark('switch')
+        action()
+        return recorder.wait_for(lambda: recorder.time_to_settle(since, region, quiet_period=quiet_period),
+                                 timeout + quiet_period)
+
+    def measure_startup(self, probe, action=None, timeout=5.0):
+        """
+        通过播放探针测量启动耗时：从触发播放到播放器上报首帧渲染
+        :param probe: 已启动的 PlaybackProbe
+        :param action: 触发播放的操作，默认点击播放
+        :param timeout: 最长等待时间（秒）
+        :return: 毫秒；超时返回 None
+        """
+        since = probe.mark('play')
+        (action or self.play)()
+        return probe.wait_for_startup(since, timeout)
+
 class AudioElement:
     def __init__(self, driver, element):
         self.driver = driver
@@ -0,0 +1,249 @@
+from appium import webdriver
+from appium.options.common import AppiumOptions
+from appium.options.android import UiAutomator2Options
+from appium.options.ios import XCUITestOptions
+from selenium.common.exceptions import WebDriverException
+from utils.logger import logger
+from utils.driver_metrics import instrument
+from utils.ui_hierarchy import UiHierarchy
+from utils.element_batch import BatchAttributeReader, DEFAULT_ATTRIBUTES
+from utils.hypium_driver import HypiumDriver
+from utils.toast_listener import get_toast_listener
+
+# config.yaml 中的平台名 -> 未配置 automationName 时使用的后端
+DEFAULT_AUTOMATION = {
+    'android': 'UiAutomator2',
+    'android emulator': 'UiAutomator2',
+    'ios': 'XCUITest',
+    'ios emulator': 'XCUITest',
+    'harmony': 'hypium',
+}
+
+# 记录在 driver 实例上的创建该会话的后端，backend_for 优先使用
+_BACKEND_ATTR = '_platform_backend'
+
+# 所有 Appium 后端共用的会话配置
+_COMMON_CAPABILITIES = {
+    'noReset': True,
+    'newCommandTimeout': 120,
+    'autoLaunch': False,
+}
+
+
+class PlatformBackend:
+    """
+    平台后端：会话创建、层级快照、批量查询和手势
+    页面对象和测试只通过后端使用平台相关的能力，各平台实现选用自己最快的原生指令。
+    本类即通用的 Appium 后端，未注册的 automationName 使用它
+    """
+
+    name = 'appium'
+    options_class = AppiumOptions
+    # 需要 Appium 服务时由 AppiumDriver 负责启动服务、创建远程会话
+    requires_appium_server = True
+    # appium driver install 使用的驱动名
+    appium_driver = None
+    default_capabilities = {}
+
+    def __init__(self, settings=None):
+        """
+        :param settings: config.yaml 的 test_info 配置
+        """
+        self.settings = settings or {}
+
+    def capabilities(self, device_config):
+        """合并默认配置和设备配置"""
+        caps = dict(_COMMON_CAPABILITIES)
+        caps.update(self.default_capabilities)
+        caps.update(device_config)
+        return caps
+
+    def create_session(self, caps, command_executor=None):
+        """
+        创建会话
+        :param caps: capabilities
+        :param command_executor: Appium 服务地址或 AppiumConnection
+        :return: WebDriver
+        """
+        driver = webdriver.Remote(command_executor, options=self.options_class().load_capabilities(caps))
+        if self.settings.get('command_metrics', True):
+            instrument(driver)
+        setattr(driver, _BACKEND_ATTR, self)
+        return driver
+
+    # 层级快照
+    def page_source(self, driver):
+        """当前界面的层级 XML"""
+        return driver.page_source
+
+    def snapshot(self, driver):
+        """当前界面的层级快照（UiHierarchy）"""
+        return UiHierarchy.from_xml(self.page_source(driver))
+
+    def query(self, driver, locators, names=DEFAULT_ATTRIBUTES):
+        """
+        批量查询：在同一份层级快照上求值所有定位器
+        :param locators: [(by, value), ...]
+        :return: 与 locators 对应的属性字典列表的列表
+        """
+        reader = BatchAttributeReader(driver)
+        source = self.page_source(driver)
+        return [reader.read_locator(locator, names, page_source=source) for locator in locators]
+
+    # 手势
+    def tap(self, driver, x, y, count=1):
+        for _ in range(count):
+            driver.tap([(x, y)])
+
+    def long_press(self, driver, x, y, duration=1000):
+        driver.tap([(x, y)], duration)
+
+    def swipe(self, driver, start_x, start_y, end_x, end_y, duration=None):
+        driver.swipe(start_x, start_y, end_x, end_y, duration)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}>"
+
+
+class UiAutomator2Backend(PlatformBackend):
+    """Android：UiAutomator2，点击和长按使用 mobile: *Gesture，一次请求在设备端完成"""
+
+    name = 'uiautomator2'
+    options_class = UiAutomator2Options
+    appium_driver = 'uiautomator2'
+    default_capabilities = {
+        'autoGrantPermissions': True,
+        'adbExecTimeout': 60000,
+        'avdLaunchTimeout': 60000,
+        'avdReadyTimeout': 60000,
+    }
+
+    def create_session(self, caps, command_executor=None):
+        """创建会话；test_info.toast_listener 未关闭时为设备挂接 Toast 监听（driver.toast_listener），BasePage 自动使用"""
+        driver = super().create_session(caps, command_executor)
+        source = self.settings.get('toast_listener', 'uiautomator2')
+        if source:
+            driver.toast_listener = get_toast_listener(caps.get('udid') or caps.get('deviceUDID'), source,
+                                                       self.settings.get('toast_log_pattern'))
+        return driver
+
+    def tap(self, driver, x, y, count=1):
+        if count == 2:
+            driver.execute_script('mobile: doubleClickGesture', {'x': x, 'y': y})
+            return
+        for _ in range(count):
+            driver.execute_script('mobile: clickGesture', {'x': x, 'y': y})
+
+    def long_press(self, driver, x, y, duration=1000):
+        driver.execute_script('mobile: longClickGesture', {'x': x, 'y': y, 'duration': duration})
+
+
+class XCUITestBackend(PlatformBackend):
+    """
+    iOS：XCUITest，点击和长按使用 mobile: tap / doubleTap / touchAndHold
+    WebDriverAgent 导出层级时逐个节点计算 visible / accessible，深层级的界面一次 page_source 要数十秒；
+    这里用 mobile: source 并排除这些属性，层级快照使用 JSON 格式直接构建 UiHierarchy，
+    会话启动时通过 settings 让单元素查找使用 firstMatch，配置了 ios_snapshot_max_depth 时同时设置快照深度
+    """
+
+    name = 'xcuitest'
+    options_class = XCUITestOptions
+    appium_driver = 'xcuitest'
+
+    def capabilities(self, device_config):
+        caps = super().capabilities(device_config)
+        settings = {
+            'snapshotMaxDepth': self.settings.get('ios_snapshot_max_depth'),
+            'useFirstMatch': self.settings.get('ios_use_first_match'),
+        }
+        for name, value in settings.items():
+            # 设备配置中已指定的优先
+            if value is not None and f'settings[{name}]' not in caps:
+                caps[f'settings[{name}]'] = value
+        return caps
+
+    def _source(self, driver, source_format):
+        args = {'format': source_format}
+        excluded = self.settings.get('ios_excluded_attributes', 'visible,accessible')
+        if excluded:
+            args['excludedAttributes'] = excluded
+        return driver.execute_script('mobile: source', args)
+
+    def page_source(self, driver):
+        try:
+            return self._source(driver, 'xml')
+        except WebDriverException as e:
+            logger.warning(f"mobile: source 失败，改用 page_source: {str(e).splitlines()[0] if str(e) else e}")
+            return driver.page_source
+
+    def snapshot(self, driver):
+        try:
+            return UiHierarchy.from_xcuitest_json(self._source(driver, 'json'))
+        except (WebDriverException, ValueError, TypeError, AttributeError) as e:
+            logger.warning(f"JSON 层级获取失败，改用 XML: {str(e).splitlines()[0] if str(e) else e}")
+            return UiHierarchy.from_xml(self.page_source(driver))
+
+    def tap(self, driver, x, y, count=1):
+        if count == 2:
+            driver.execute_script('mobile: doubleTap', {'x': x, 'y': y})
+            return
+        for _ in range(count):
+            driver.execute_script('mobile: tap', {'x': x, 'y': y})
+
+    def long_press(self, driver, x, y, duration=1000):
+        driver.execute_script('mobile: touchAndHold', {'x': x, 'y': y, 'duration': duration / 1000})
+
+
+class HypiumBackend(PlatformBackend):
+    """HarmonyOS：hypium 经 hdc 直连设备，层级快照来自 uitest dumpLayout"""
+
+    name = 'hypium'
+    requires_appium_server = False
+
+    def capabilities(self, device_config):
+        return dict(device_config)
+
+    def create_session(self, caps, command_executor=None):
+        driver = HypiumDriver.from_capabilities(caps)
+        setattr(driver, _BACKEND_ATTR, self)
+        return driver
+
+
+_BACKENDS = {backend.name: backend for backend in (UiAutomator2Backend, XCUITestBackend, HypiumBackend)}
+
+
+def register_backend(backend_class):
+    """注册平台后端，按 backend_class.name（小写的 automationName）匹配"""
+    _BACKENDS[backend_class.name.lower()] = backend_class
+    return backend_class
+
+
+def automation_name(capabilities, platform=None):
+    """从 capabilities 中取 automationName，没有时按平台取默认值"""
+    capabilities = capabilities or {}
+    name = capabilities.get('automationName') or capabilities.get('appium:automationName')
+    if not name:
+        platform = platform or str(capabilities.get('platformName') or '')
+        name = DEFAULT_AUTOMATION.get(platform.lower(), '')
+    return str(name).lower()
+
+
+def get_backend(name, settings=None):
+    """
+    按 automationName 获取平台后端
+    :param name: automationName（不区分大小写）
+    :param settings: config.yaml 的 test_info 配置
+    """
+    backend_class = _BACKENDS.get(str(name or '').lower())
+    if backend_class is None:
+        logger.info(f"未注册 {name} 的平台后端，使用通用 Appium 后端")
+        backend_class = PlatformBackend
+    return backend_class(settings)
+
+
+def backend_for(driver, settings=None):
+    """会话对应的平台后端：优先使用创建会话的后端（带有 config 中的配置），否则按 capabilities 选择"""
+    backend = getattr(driver, _BACKEND_ATTR, None)
+    if backend is not None:
+        return backend
+    return get_backend(automation_name(getattr(driver, 'capabilities', None)), settings)
@@ -0,0 +1,253 @@
+import re
+import time
+import threading
+import subprocess
+from collections import namedtuple
+from utils.logger import logger
+from utils.logcat_streamer import get_streamer
+
+# t: 相对探针启动的秒数（主机单调时钟）
+PlaybackEvent = namedtuple('PlaybackEvent', ['t', 'kind', 'message'])
+RenderSample = namedtuple('RenderSample', ['t', 'total_frames', 'janky_frames'])
+
+# 播放相关日志的标签，只有这些标签的日志参与事件识别
+PLAYER_LOG_TAGS = ('MediaCodec', 'ACodec', 'CCodec', 'MediaPlayer', 'MediaPlayerNative', 'NuPlayer',
+                   'NuPlayerRenderer', 'ExoPlayerImpl', 'EventLogger', 'IjkMediaPlayer')
+
+# 日志事件识别规则，按顺序匹配，第一个命中的生效
+PLAYER_EVENT_PATTERNS = (
+    ('rebuffer_start', re.compile(r'MEDIA_INFO_BUFFERING_START|info.*\b701\b|state.*BUFFERING|buffering.*start', re.I)),
+    # ExoPlayer EventLogger：state [eventTime=.., mediaPos=.., window=0, period=0, BUFFERING] -> .. READY / ENDED
+    ('rebuffer_end', re.compile(r'MEDIA_INFO_BUFFERING_END|info.*\b702\b|buffering.*end|'
+                                r'\bstate \[.*\b(READY|ENDED)\]', re.I)),
+    ('first_frame', re.compile(r'MEDIA_INFO_VIDEO_RENDERING_START|info.*\b3\b.*render|renderedFirstFrame|'
+                               r'first.?frame.*render', re.I)),
+    ('codec_start', re.compile(r'\b(configure|start)\b.*(video|avc|hevc|vp9|av01)|'
+                               r'(video|avc|hevc|vp9|av01).*\b(configure|start)\b', re.I)),
+    ('codec_error', re.compile(r'codec.*error|error.*codec', re.I)),
+)
+
+_TOTAL_FRAMES_RE = re.compile(r'Total frames rendered:\s*(\d+)')
+_JANKY_FRAMES_RE = re.compile(r'Janky frames:\s*(\d+)')
+
+
+def classify_player_log(line):
+    """识别一行播放器日志对应的事件类型，无关日志返回 None"""
+    for kind, pattern in PLAYER_EVENT_PATTERNS:
+        if pattern.search(line):
+            return kind
+    return None
+
+
+def parse_gfxinfo_summary(output):
+    """
+    解析 dumpsys gfxinfo <pkg> 的汇总部分
+    :return: (total_frames, janky_frames)，无法解析时返回 None
+    """
+    total = _TOTAL_FRAMES_RE.search(output)
+    janky = _JANKY_FRAMES_RE.search(output)
+    if not total or not janky:
+        return None
+    return int(total.group(1)), int(janky.group(1))
+
+
+class PlaybackProbe:
+    """
+    播放性能探针
+    订阅设备共用的 logcat 日志流（utils.logcat_streamer），按标签识别首帧、卡顿（缓冲）开始/结束等播放事件；
+    另一个线程按固定间隔采样 dumpsys gfxinfo 的渲染帧数与卡顿帧数，形成时间序列。
+    测试线程只打点（mark）和读取汇总，不再逐次查询元素属性
+    """
+
+    def __init__(self, package, device_id=None, interval=1.0, log_tags=PLAYER_LOG_TAGS):
+        """
+        :param package: 被测应用包名
+        :param device_id: adb 设备序列号
+        :param interval: gfxinfo 采样间隔（秒）
+        :param log_tags: 参与事件识别的日志标签
+        """
+        self.package = package
+        self.device_id = device_id
+        self.interval = interval
+        self.log_tags = frozenset(log_tags)
+        self.events = []
+        self.samples = []
+        self.marks = {}
+        self._start = None
+        self._streamer = None
+        self._stop = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _adb(self):
+        return ['adb'] + (['-s', self.device_id] if self.device_id else [])
+
+    def now(self):
+        return time.monotonic() - self._start
+
+    def start(self):
+        """启动探针"""
+        self._start = time.monotonic()
+        self._stop.clear()
+        self.events, self.samples, self.marks = [], [], {}
+        self._streamer = get_streamer(self.device_id)
+        if self._streamer.is_running:
+            # 只接收注册之后到达的日志
+            self._streamer.add_record_listener(self._on_record)
+        else:
+            self._streamer = None
+            logger.error(f"logcat 日志流未运行（{self.device_id or 'default'}），首帧、卡顿等播放事件不会被记录，"
+                         f"startup_ms / rebuffer_* 不可用")
+        try:
+            subprocess.run(self._adb() + ['shell', 'dumpsys', 'gfxinfo', self.package, 'reset'],
+                           capture_output=True, timeout=10)
+        except (subprocess.TimeoutExpired, OSError) as e:
+            logger.warning(f"重置 gfxinfo 失败: {str(e)}")
+        self._threads.append(threading.Thread(target=self._sample_gfxinfo, daemon=True))
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"播放性能探针已启动: {self.package}")
+        return self
+
+    def _on_record(self, record):
+        if record.tag not in self.log_tags:
+            return
+        line = f"{record.tag}: {record.message}"
+        kind = classify_player_log(line)
+        if kind:
+            with self._lock:
+                self.events.append(PlaybackEvent(record.t - self._start, kind, line))
+
+    def _sample_gfxinfo(self):
+        while not self._stop.is_set():
+            try:
+                output = subprocess.run(self._adb() + ['shell', 'dumpsys', 'gfxinfo', self.package],
+                                        capture_output=True, text=True, timeout=10).stdout
+                counts = parse_gfxinfo_summary(output)
+                if counts:
+                    with self._lock:
+                        self.samples.append(RenderSample(self.now(), *counts))
+            except (subprocess.TimeoutExpired, OSError) as e:
+                logger.warning(f"采样 gfxinfo 失败: {str(e)}")
+            self._stop.wait(self.interval)
+
+    def stop(self):
+        """停止探针"""
+        self._stop.set()
+        if self._streamer is not None:
+            self._streamer.remove_record_listener(self._on_record)
+            self._streamer = None
+        for thread in self._threads:
+            thread.join(timeout=self.interval + 10)
+        self._threads = []
+        return self.summary()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def mark(self, label):
+        """记录一个操作（如点击播放）的时间"""
+        self.marks[label] = self.now()
+        return self.marks[label]
+
+    def events_since(self, since, kind=None):
+        with self._lock:
+            return [event for event in self.events if event.t >= since and (kind is None or event.kind == kind)]
+
+    def startup_ms(self, since):
+        """从 since 到第一个首帧事件的耗时（毫秒），尚未出现时返回 None"""
+        first_frames = self.events_since(since, 'first_frame')
+        return round((first_frames[0].t - since) * 1000, 1) if first_frames else None
+
+    def wait_for_startup(self, since, timeout=5.0, poll_interval=0.05):
+        """等待首帧事件，返回启动耗时（毫秒），超时返回 None"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() <= deadline:
+            startup = self.startup_ms(since)
+            if startup is not None:
+                return startup
+            time.sleep(poll_interval)
+        return None
+
+    def rebuffers(self, since=0.0):
+        """
+        卡顿区间列表 [(开始, 结束)]；未结束的卡顿以当前时间作为结束
+        首帧之前的缓冲属于启动耗时，只统计 since 之后第一个首帧事件之后的缓冲
+        """
+        intervals, started, playing = [], None, False
+        for event in self.events_since(since):
+            if event.kind == 'first_frame':
+                playing = True
+            elif not playing:
+                continue
+            if event.kind == 'rebuffer_start' and started is None:
+                started = event.t
+            elif event.kind == 'rebuffer_end' and started is not None:
+                intervals.append((started, event.t))
+                started = None
+        if started is not None:
+            intervals.append((started, self.now()))
+        return intervals
+
+    def _frame_counts(self, since):
+        """
+        since 之后的 (渲染帧数, 卡顿帧数)
+        以 since 时或之前的最后一个采样为基线（没有时取第一个采样），与 timeline 一样按差值计算
+        """
+        with self._lock:
+            samples = list(self.samples)
+        if not samples:
+            return 0, 0
+        baseline = samples[0]
+        for sample in samples:
+            if sample.t > since:
+                break
+            baseline = sample
+        last = samples[-1]
+        return last.total_frames - baseline.total_frames, last.janky_frames - baseline.janky_frames
+
+    def timeline(self):
+        """
+        按采样点汇总的时间序列
+        :return: [{'t', 'frames', 'janky_frames', 'rebuffers', 'first_frames'}]，帧数为相邻采样的增量
+        """
+        with self._lock:
+            samples, events = list(self.samples), list(self.events)
+        series, previous = [], None
+        for sample in samples:
+            begin = previous.t if previous else 0.0
+            window = [event for event in events if begin <= event.t < sample.t]
+            series.append({
+                't': round(sample.t, 3),
+                'frames': sample.total_frames - (previous.total_frames if previous else 0),
+                'janky_frames': sample.janky_frames - (previous.janky_frames if previous else 0),
+                'rebuffers': sum(1 for event in window if event.kind == 'rebuffer_start'),
+                'first_frames': sum(1 for event in window if event.kind == 'first_frame'),
+            })
+            previous = sample
+        return series
+
+    def summary(self, since=None):
+        """
+        播放性能汇总，stall_rate 为每分钟卡顿次数，帧数为 since 之后的增量
+        :param since: 起始时间，默认取 'play' 打点（没有则为 0）
+        """
+        if since is None:
+            since = self.marks.get('play', 0.0)
+        duration = max(self.now() - since, 1e-9)
+        rebuffers = self.rebuffers(since)
+        total_frames, janky_frames = self._frame_counts(since)
+        return {
+            'startup_ms': self.startup_ms(since),
+            'rebuffer_count': len(rebuffers),
+            'rebuffer_ms': round(sum(end - begin for begin, end in rebuffers) * 1000, 1),
+            'stall_rate': round(len(rebuffers) / duration * 60, 3),
+            'total_frames': total_frames,
+            'janky_frames': janky_frames,
+            'janky_percent': round(janky_frames * 100.0 / total_frames, 2) if total_frames else 0.0,
+            'codec_errors': len(self.events_since(since, 'codec_error')),
+            'duration_s': round(duration, 3),
+        }
@@ -0,0 +1,243 @@
+import re
+import time
+import threading
+import numpy as np
+from utils.logger import logger
+from utils.device_shell import PersistentShell
+
+# 采样列：时间（秒）、应用 CPU（占全部核心的百分比）、RSS/PSS（KB）、电量、电池温度（℃）、累计收发字节
+# 收发字节的统计范围见 parse_sample 返回的 net_scope
+COLUMNS = ('t', 'cpu_percent', 'rss_kb', 'pss_kb', 'battery_level', 'battery_temp_c', 'rx_bytes', 'tx_bytes')
+
+# 一次采样在常驻 shell 中执行的脚本；各段以 @name 开头，meminfo 较重，按 {meminfo} 开关隔次执行
+_SAMPLE_SCRIPT = """pid=$(pidof {package} | cut -d' ' -f1)
+echo @pid; echo $pid
+echo @cpu; head -1 /proc/stat
+if [ -n "$pid" ]; then echo @stat; cat /proc/$pid/stat; echo @status; grep VmRSS /proc/$pid/status; echo @uid; stat -c %u /proc/$pid; fi
+echo @battery; dumpsys battery | grep -E ' (level|temperature):'
+if [ -r /proc/net/xt_qtaguid/stats ]; then echo @qtaguid; cat /proc/net/xt_qtaguid/stats; elif [ -n "$pid" ]; then echo @netdev; cat /proc/$pid/net/dev; fi
+if [ -n "$pid" ] && [ {meminfo} = 1 ]; then echo @meminfo; dumpsys meminfo $pid | grep -E '^ *TOTAL'; fi"""
+
+
+class RingBuffer:
+    """定长环形缓冲区，按行保存浮点采样，内存占用固定"""
+
+    def __init__(self, capacity, columns=COLUMNS):
+        self.columns = columns
+        self._data = np.full((capacity, len(columns)), np.nan, dtype=np.float64)
+        self._index = 0
+        self._size = 0
+
+    def append(self, row):
+        self._data[self._index] = [row.get(name, np.nan) for name in self.columns]
+        self._index = (self._index + 1) % len(self._data)
+        self._size = min(self._size + 1, len(self._data))
+
+    def __len__(self):
+        return self._size
+
+    def values(self):
+        """按时间顺序返回所有采样（size x columns）"""
+        if self._size < len(self._data):
+            return self._data[:self._size].copy()
+        return np.roll(self._data, -self._index, axis=0)
+
+    def column(self, name):
+        return self.values()[:, self.columns.index(name)]
+
+
+def _sections(output):
+    sections, current = {}, None
+    for line in output.splitlines():
+        if line.startswith('@'):
+            current = sections.setdefault(line[1:].strip(), [])
+        elif current is not None and line.strip():
+            current.append(line.strip())
+    return sections
+
+
+def parse_sample(output):
+    """
+    解析采样脚本输出
+    :return: 原始计数 {'pid', 'proc_jiffies', 'total_jiffies', 'rss_kb', 'pss_kb', 'battery_level',
+             'battery_temp_c', 'rx_bytes', 'tx_bytes', 'net_scope'}，缺失的项不出现；
+             net_scope 为 'app'（xt_qtaguid 按 UID 统计）或 'device'（整机接口计数）
+    """
+    sections = _sections(output)
+    sample = {}
+    if sections.get('pid'):
+        sample['pid'] = int(sections['pid'][0])
+    if sections.get('cpu'):
+        sample['total_jiffies'] = sum(int(value) for value in sections['cpu'][0].split()[1:])
+    if sections.get('stat'):
+        # comm 字段可能含空格，从最后一个 ')' 之后开始计数：utime / stime 为第 14、15 个字段
+        fields = sections['stat'][0].rsplit(')', 1)[-1].split()
+        sample['proc_jiffies'] = int(fields[11]) + int(fields[12])
+    if sections.get('status'):
+        sample['rss_kb'] = int(re.search(r'(\d+)', sections['status'][0]).group(1))
+    for line in sections.get('battery', []):
+        name, _, value = line.partition(':')
+        if name.strip() == 'level':
+            sample['battery_level'] = int(value)
+        elif name.strip() == 'temperature':
+            sample['battery_temp_c'] = int(value) / 10.0
+    if sections.get('qtaguid'):
+        uid = sections.get('uid', [''])[0]
+        rx = tx = 0
+        for line in sections['qtaguid'][1:]:
+            fields = line.split()
+            # idx iface acct_tag_hex uid_tag_int cnt_set rx_bytes rx_packets tx_bytes ...
+            if len(fields) > 7 and fields[3] == uid and fields[2] == '0x0':
+                rx += int(fields[5])
+                tx += int(fields[7])
+        sample['rx_bytes'], sample['tx_bytes'], sample['net_scope'] = rx, tx, 'app'
+    elif sections.get('netdev'):
+        # Android 10+ 移除了 xt_qtaguid；应用不单独拥有网络命名空间，
+        # /proc/<pid>/net/dev 就是整机的接口计数，包含其他应用的流量
+        rx = tx = 0
+        for line in sections['netdev']:
+            iface, _, counters = line.partition(':')
+            fields = counters.split()
+            if len(fields) >= 9 and iface.strip() != 'lo':
+                rx += int(fields[0])
+                tx += int(fields[8])
+        sample['rx_bytes'], sample['tx_bytes'], sample['net_scope'] = rx, tx, 'device'
+    if sections.get('meminfo'):
+        match = re.search(r'TOTAL(?: PSS)?:?\s+(\d+)', sections['meminfo'][0])
+        if match:
+            sample['pss_kb'] = int(match.group(1))
+    return sample
+
+
+class ResourceSampler:
+    """
+    设备资源采样
+    后台线程按固定间隔在一个常驻 adb shell 中读取 /proc/<pid>/stat、VmRSS、dumpsys battery、
+    网络计数和（隔次）dumpsys meminfo，结果写入环形缓冲区，测试结束后给出汇总
+    """
+
+    def __init__(self, package, device_id=None, interval=1.0, capacity=3600, meminfo_every=5):
+        """
+        :param package: 被测应用包名
+        :param device_id: adb 设备序列号
+        :param interval: 采样间隔（秒）
+        :param capacity: 环形缓冲区容量（采样数）
+        :param meminfo_every: 每隔多少次采样执行一次 dumpsys meminfo
+        """
+        self.package = package
+        self.device_id = device_id
+        self.interval = interval
+        self.meminfo_every = max(1, meminfo_every)
+        self.buffer = RingBuffer(capacity)
+        # 单次采样的期限，保证 stop 能在 join 超时前结束采样线程
+        self._shell = PersistentShell.adb(device_id, timeout=10)
+        self.net_scope = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._start = None
+        self._previous = None
+        self._baseline_net = None
+        self._last_pss = np.nan
+
+    def start(self):
+        self._start = time.monotonic()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        count = 0
+        while not self._stop.is_set():
+            try:
+                self.sample(meminfo=count % self.meminfo_every == 0)
+            except Exception as e:
+                logger.warning(f"资源采样失败: {str(e)}")
+            count += 1
+            self._stop.wait(self.interval)
+
+    def sample(self, meminfo=True):
+        """采样一次并写入缓冲区"""
+        output = self._shell.run(_SAMPLE_SCRIPT.format(package=self.package, meminfo=int(meminfo)))
+        if output is None:
+            return None
+        raw = parse_sample(output)
+        row = {'t': time.monotonic() - self._start}
+        for name in ('rss_kb', 'battery_level', 'battery_temp_c'):
+            if name in raw:
+                row[name] = raw[name]
+        # PSS 隔次采样，中间沿用上一次的值
+        self._last_pss = raw.get('pss_kb', self._last_pss if 'pid' in raw else np.nan)
+        row['pss_kb'] = self._last_pss
+        previous = self._previous
+        if previous and 'proc_jiffies' in raw and 'proc_jiffies' in previous and raw.get('pid') == previous.get('pid'):
+            total = raw['total_jiffies'] - previous['total_jiffies']
+            if total > 0:
+                row['cpu_percent'] = (raw['proc_jiffies'] - previous['proc_jiffies']) * 100.0 / total
+        if 'rx_bytes' in raw:
+            self.net_scope = raw['net_scope']
+            if self._baseline_net is None:
+                self._baseline_net = (raw['rx_bytes'], raw['tx_bytes'])
+            row['rx_bytes'] = raw['rx_bytes'] - self._baseline_net[0]
+            row['tx_bytes'] = raw['tx_bytes'] - self._baseline_net[1]
+        self._previous = raw
+        self.buffer.append(row)
+        return row
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 15)
+            self._thread = None
+        self._shell.close()
+        return self.summary()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def summary(self):
+        """
+        资源汇总
+        rss_growth_kb_per_min 为 RSS 的线性拟合斜率，持续为正提示内存泄漏；
+        流量只有按 UID 统计时才是应用流量（rx_kb / tx_kb），否则为整机流量（device_rx_kb / device_tx_kb）
+        """
+        data = self.buffer.values()
+        result = {'samples': len(data)}
+        if not len(data):
+            return result
+        t = data[:, COLUMNS.index('t')]
+
+        def valid(name):
+            column = data[:, COLUMNS.index(name)]
+            mask = ~np.isnan(column)
+            return t[mask], column[mask]
+
+        _, cpu = valid('cpu_percent')
+        if len(cpu):
+            result.update(cpu_mean=round(float(cpu.mean()), 2), cpu_p95=round(float(np.percentile(cpu, 95)), 2),
+                          cpu_max=round(float(cpu.max()), 2))
+        rss_t, rss = valid('rss_kb')
+        if len(rss):
+            result.update(rss_start_kb=int(rss[0]), rss_end_kb=int(rss[-1]), rss_max_kb=int(rss.max()))
+            if len(rss) >= 3 and rss_t[-1] > rss_t[0]:
+                result['rss_growth_kb_per_min'] = round(float(np.polyfit(rss_t, rss, 1)[0]) * 60, 1)
+        _, pss = valid('pss_kb')
+        if len(pss):
+            result.update(pss_end_kb=int(pss[-1]), pss_max_kb=int(pss.max()))
+        _, level = valid('battery_level')
+        if len(level):
+            result['battery_drop'] = int(level[0] - level[-1])
+        _, temp = valid('battery_temp_c')
+        if len(temp):
+            result['battery_temp_max_c'] = float(temp.max())
+        _, rx = valid('rx_bytes')
+        _, tx = valid('tx_bytes')
+        if len(rx):
+            prefix = 'device_' if self.net_scope == 'device' else ''
+            result.update({f'{prefix}rx_kb': round(float(rx[-1]) / 1024, 1),
+                           f'{prefix}tx_kb': round(float(tx[-1]) / 1024, 1),
+                           'net_scope': self.net_scope})
+        return result
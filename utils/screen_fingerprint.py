@@ -0,0 +1,146 @@
+import hashlib
+from utils.ui_hierarchy import UiHierarchy
+
+
+def _label(node):
+    """节点的结构标签：class + resource-id，忽略文本、描述和坐标"""
+    return f'{node.cls}#{node.resource_id}'
+
+
+def _hash(value):
+    return hashlib.blake2b(value.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _simhash(tokens, bits=64):
+    weights = [0] * bits
+    for token in tokens:
+        value = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big')
+        for i in range(bits):
+            weights[i] += 1 if value >> i & 1 else -1
+    return sum(1 << i for i in range(bits) if weights[i] > 0)
+
+
+class ScreenFingerprint:
+    """
+    界面结构指纹
+    digest 为 class/resource-id 骨架的哈希，相邻的同构兄弟子树（列表项）合并为一个，
+    因此文本变化、列表滚动和条目数量变化都不会改变指纹；
+    shingles 为父子结构标签集合，用于计算近似重复程度
+    """
+
+    __slots__ = ('digest', 'shingles', 'simhash')
+
+    def __init__(self, digest, shingles, simhash):
+        self.digest = digest
+        self.shingles = shingles
+        self.simhash = simhash
+
+    @classmethod
+    def from_hierarchy(cls, hierarchy):
+        """
+        计算层级快照的指纹
+        :param hierarchy: UiHierarchy 实例
+        """
+        subtree = {}
+        # 先序序列倒序遍历保证子节点先于父节点计算
+        for node in reversed(hierarchy.nodes):
+            parts = [_label(node)]
+            previous = None
+            for child in node.children:
+                child_hash = subtree[id(child)]
+                if child_hash != previous:
+                    parts.append(child_hash)
+                previous = child_hash
+            subtree[id(node)] = _hash('(' + '|'.join(parts) + ')')
+
+        top = []
+        previous = None
+        for child in hierarchy.root.children:
+            if subtree[id(child)] != previous:
+                top.append(subtree[id(child)])
+            previous = subtree[id(child)]
+        digest = _hash('|'.join(top))
+
+        shingles = frozenset(
+            f'{_label(node.parent) if node.parent is not hierarchy.root else ""}>{_label(node)}'
+            for node in hierarchy
+        )
+        return cls(digest, shingles, _simhash(shingles))
+
+    @classmethod
+    def from_page_source(cls, page_source):
+        return cls.from_hierarchy(UiHierarchy.from_xml(page_source))
+
+    def similarity(self, other):
+        """结构相似度（shingles 的 Jaccard 系数），取值 0~1"""
+        if self.digest == other.digest:
+            return 1.0
+        union = len(self.shingles | other.shingles)
+        if not union:
+            return 1.0
+        return len(self.shingles & other.shingles) / union
+
+    def hamming(self, other):
+        return bin(self.simhash ^ other.simhash).count('1')
+
+    def is_near_duplicate(self, other, threshold=0.9):
+        return self.similarity(other) >= threshold
+
+    def __eq__(self, other):
+        return isinstance(other, ScreenFingerprint) and self.digest == other.digest
+
+    def __hash__(self):
+        return hash(self.digest)
+
+    def __repr__(self):
+        return f'ScreenFingerprint({self.digest[:12]})'
+
+
+class FingerprintIndex:
+    """
+    指纹索引：精确匹配走字典，近似匹配先用 simhash 汉明距离粗筛再用 Jaccard 确认
+    爬虫的已访问集合、定位器缓存和报告输出可共用同一个索引跳过重复界面
+    """
+
+    # 登记项少于该数量时直接逐个计算 Jaccard，小界面的 simhash 噪声较大
+    PREFILTER_MIN_ITEMS = 256
+
+    def __init__(self, threshold=0.9, max_hamming=16):
+        """
+        :param threshold: 判定为近似重复的最小相似度
+        :param max_hamming: simhash 粗筛允许的最大汉明距离
+        """
+        self.threshold = threshold
+        self.max_hamming = max_hamming
+        self._items = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, fingerprint):
+        return fingerprint.digest in self._items
+
+    def get(self, fingerprint, default=None):
+        entry = self._items.get(fingerprint.digest)
+        return entry[1] if entry else default
+
+    def add(self, fingerprint, value=None):
+        self._items[fingerprint.digest] = (fingerprint, value)
+
+    def find_similar(self, fingerprint):
+        """
+        查找与给定指纹相同或近似重复的已登记项
+        :return: (指纹, 值)，找不到时返回 None
+        """
+        entry = self._items.get(fingerprint.digest)
+        if entry:
+            return entry
+        best, best_score = None, self.threshold
+        prefilter = len(self._items) >= self.PREFILTER_MIN_ITEMS
+        for known, value in self._items.values():
+            if prefilter and known.hamming(fingerprint) > self.max_hamming:
+                continue
+            score = known.similarity(fingerprint)
+            if score >= best_score:
+                best, best_score = (known, value), score
+        return best
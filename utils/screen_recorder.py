@@ -0,0 +1,257 @@
+import os
+import re
+import time
+import base64
+import shutil
+import tempfile
+import threading
+import subprocess
+from collections import deque, namedtuple
+from utils.logger import logger
+
+# timestamp: 相对录制开始的秒数（主机单调时钟）；pixels: 缩小后的灰度帧（bytes，行优先）
+FrameSample = namedtuple('FrameSample', ['timestamp', 'pixels'])
+
+# 帧差阈值（0-255 灰度的平均绝对差），低于该值视为画面未变化
+DEFAULT_CHANGE_THRESHOLD = 6.0
+
+
+def _mean_abs_diff(a, b, width, region=None):
+    """两帧在区域内的平均绝对差；region 为采样坐标系下的 (x1, y1, x2, y2)"""
+    if region is None:
+        total = sum(abs(x - y) for x, y in zip(a, b))
+        return total / max(len(a), 1)
+    x1, y1, x2, y2 = region
+    total = count = 0
+    for row in range(y1, y2):
+        start = row * width
+        total += sum(abs(x - y) for x, y in zip(a[start + x1:start + x2], b[start + x1:start + x2]))
+        count += x2 - x1
+    return total / max(count, 1)
+
+
+class ScreenRecorder:
+    """
+    屏幕录制与帧采样
+    adb 模式：adb exec-out screenrecord --output-format=h264 的码流直接送入 ffmpeg 解码为低分辨率灰度帧，
+    帧到达主机时打时间戳；screenrecord 只在画面变化时产出帧，帧时间即画面变化时间。
+    appium 模式：start_recording_screen / stop_recording_screen 取回 mp4，按容器时间戳离线解码。
+    两种模式测量期间都不需要逐帧与设备往返，首帧、切换耗时等指标在本地帧序列上计算。
+    appium 模式的帧在 stop 之后才可用，且时间戳来自设备端容器（从设备开始录制算起），
+    与 mark 使用的主机时钟之间有未知的启动延迟，不能与 marks 比较，只适合分析帧间间隔等相对指标
+    """
+
+    def __init__(self, device_id=None, mode='adb', driver=None, sample_width=72, bit_rate=4000000,
+                 max_frames=5000, latency_offset=0.0):
+        """
+        :param device_id: adb 设备序列号
+        :param mode: 'adb'（流式）或 'appium'（录制结束后解码）
+        :param driver: appium 模式使用的 WebDriver
+        :param sample_width: 采样帧宽度（像素），高度按屏幕比例计算
+        :param bit_rate: screenrecord 码率
+        :param max_frames: 内存中保留的最大帧数
+        :param latency_offset: 编码+传输的固定延迟（秒），从帧时间戳中扣除
+        """
+        self.device_id = device_id
+        self.mode = mode
+        self.driver = driver
+        self.sample_width = sample_width
+        self.bit_rate = bit_rate
+        self.latency_offset = latency_offset
+        self.frames = deque(maxlen=max_frames)
+        self.marks = {}
+        self.screen_size = None
+        self.sample_height = None
+        self._start = None
+        self._processes = []
+        self._reader = None
+        self._lock = threading.Lock()
+
+    @property
+    def streaming(self):
+        """帧是否实时到达且时间戳与 mark 同一时钟（adb 模式）"""
+        return self.mode == 'adb'
+
+    def _adb(self):
+        return ['adb'] + (['-s', self.device_id] if self.device_id else [])
+
+    def _query_screen_size(self):
+        if self.mode == 'appium' and self.driver is not None:
+            size = self.driver.get_window_size()
+            return int(size['width']), int(size['height'])
+        output = subprocess.run(self._adb() + ['shell', 'wm', 'size'], capture_output=True, text=True,
+                                timeout=10).stdout
+        # 存在 Override size 时以其为准
+        sizes = re.findall(r'(\d+)x(\d+)', output)
+        if not sizes:
+            raise RuntimeError(f"无法获取屏幕尺寸: {output.strip()}")
+        width, height = sizes[-1]
+        return int(width), int(height)
+
+    def _decoder_command(self, source):
+        return ['ffmpeg', '-loglevel', 'error', '-fflags', 'nobuffer', '-flags', 'low_delay',
+                *(['-probesize', '32', '-f', 'h264'] if source == 'pipe:0' else []),
+                '-i', source, '-vf', f'scale={self.sample_width}:{self.sample_height}',
+                '-vsync', 'passthrough', '-pix_fmt', 'gray', '-f', 'rawvideo', 'pipe:1']
+
+    def start(self):
+        """开始录制"""
+        if shutil.which('ffmpeg') is None:
+            raise RuntimeError("未找到 ffmpeg，屏幕录制需要 ffmpeg 解码")
+        self.screen_size = self._query_screen_size()
+        width, height = self.screen_size
+        self.sample_height = max(2, round(height * self.sample_width / width / 2) * 2)
+        self.frames.clear()
+        self.marks.clear()
+
+        if self.mode == 'appium':
+            self.driver.start_recording_screen(timeLimit=180, bitRate=self.bit_rate, forceRestart=True)
+            self._start = time.monotonic()
+            return self
+
+        record = subprocess.Popen(
+            self._adb() + ['exec-out', 'screenrecord', '--output-format=h264', f'--bit-rate={self.bit_rate}', '-'],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        decode = subprocess.Popen(self._decoder_command('pipe:0'), stdin=record.stdout,
+                                  stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        record.stdout.close()
+        self._processes = [record, decode]
+        self._start = time.monotonic()
+        self._reader = threading.Thread(target=self._read_frames, args=(decode.stdout,), daemon=True)
+        self._reader.start()
+        logger.info(f"屏幕录制已开始: {width}x{height} -> {self.sample_width}x{self.sample_height}")
+        return self
+
+    def _read_frames(self, stream):
+        frame_size = self.sample_width * self.sample_height
+        while True:
+            pixels = stream.read(frame_size)
+            if not pixels or len(pixels) < frame_size:
+                break
+            timestamp = time.monotonic() - self._start - self.latency_offset
+            with self._lock:
+                self.frames.append(FrameSample(timestamp, pixels))
+
+    def now(self):
+        """当前录制时间（秒）"""
+        return time.monotonic() - self._start
+
+    def mark(self, label):
+        """记录一个事件（如点击播放、滑动结束）的录制时间"""
+        self.marks[label] = self.now()
+        return self.marks[label]
+
+    def stop(self):
+        """停止录制，返回帧序列"""
+        if self.mode == 'appium':
+            self._decode_recording(self.driver.stop_recording_screen())
+            return list(self.frames)
+        for process in reversed(self._processes):
+            if process.poll() is None:
+                process.terminate()
+        for process in self._processes:
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if self._reader:
+            self._reader.join(timeout=5)
+        self._processes = []
+        logger.info(f"屏幕录制已停止，共 {len(self.frames)} 帧")
+        return list(self.frames)
+
+    def _decode_recording(self, video_base64):
+        """解码 appium 录制的 mp4：ffprobe 取每帧时间戳，ffmpeg 输出同序的灰度帧"""
+        with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as f:
+            f.write(base64.b64decode(video_base64))
+            path = f.name
+        try:
+            probe = subprocess.run(['ffprobe', '-loglevel', 'error', '-select_streams', 'v:0',
+                                    '-show_entries', 'frame=best_effort_timestamp_time', '-of', 'csv=p=0', path],
+                                   capture_output=True, text=True, timeout=120)
+            timestamps = [float(line.strip(',')) for line in probe.stdout.split() if line.strip(',')]
+            raw = subprocess.run(self._decoder_command(path), capture_output=True, timeout=300).stdout
+            frame_size = self.sample_width * self.sample_height
+            for index, timestamp in enumerate(timestamps):
+                pixels = raw[index * frame_size:(index + 1) * frame_size]
+                if len(pixels) < frame_size:
+                    break
+                self.frames.append(FrameSample(timestamp - self.latency_offset, pixels))
+        finally:
+            os.remove(path)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def scale_region(self, rect):
+        """
+        将设备坐标的元素区域换算为采样帧坐标
+        :param rect: {'x', 'y', 'width', 'height'}（WebElement.rect）
+        """
+        if rect is None:
+            return None
+        scale = self.sample_width / self.screen_size[0]
+        x1 = max(0, int(rect['x'] * scale))
+        y1 = max(0, int(rect['y'] * scale))
+        x2 = min(self.sample_width, max(x1 + 1, int((rect['x'] + rect['width']) * scale)))
+        y2 = min(self.sample_height, max(y1 + 1, int((rect['y'] + rect['height']) * scale)))
+        return x1, y1, x2, y2
+
+    def _snapshot(self):
+        with self._lock:
+            return list(self.frames)
+
+    def time_to_first_change(self, since, region=None, threshold=DEFAULT_CHANGE_THRESHOLD):
+        """
+        事件发生后画面（区域）第一次相对事件前的画面发生变化的耗时，如视频首帧
+        :param since: 事件的录制时间（mark 的返回值）
+        :param region: 采样坐标系下的区域，None 为全屏
+        :return: 秒；未出现变化时返回 None
+        """
+        frames = self._snapshot()
+        baseline = None
+        for frame in frames:
+            if frame.timestamp <= since:
+                baseline = frame
+                continue
+            if baseline is None:
+                baseline = frame
+                continue
+            if _mean_abs_diff(frame.pixels, baseline.pixels, self.sample_width, region) > threshold:
+                return frame.timestamp - since
+        return None
+
+    def time_to_settle(self, since, region=None, threshold=DEFAULT_CHANGE_THRESHOLD, quiet_period=0.3):
+        """
+        事件发生后画面稳定下来的耗时，如滑动切换视频
+        以事件后最后一次帧间变化的时间计算，且其后 quiet_period 内没有新的变化
+        :return: 秒；事件后尚未出现变化或尚未稳定返回 None
+        """
+        previous = last_change = None
+        for frame in self._snapshot():
+            if frame.timestamp > since and previous is not None and \
+                    _mean_abs_diff(frame.pixels, previous.pixels, self.sample_width, region) > threshold:
+                last_change = frame.timestamp
+            previous = frame
+        if last_change is None:
+            # 画面尚未开始变化，不能与"已经稳定"区分
+            return None
+        if self.now() - self.latency_offset - last_change < quiet_period and self._processes:
+            return None
+        return last_change - since
+
+    def wait_for(self, measure, timeout=5.0, poll_interval=0.05):
+        """
+        在本地帧缓冲上轮询指标直到得出结果
+        :param measure: 无参函数，返回 None 表示尚无结果
+        :return: 指标值；超时返回 None
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            value = measure()
+            if value is not None or time.monotonic() > deadline:
+                return value
+            time.sleep(poll_interval)
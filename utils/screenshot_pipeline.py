@@ -0,0 +1,252 @@
+import os
+import io
+import base64
+import shutil
+import hashlib
+import tempfile
+import threading
+import yaml
+from concurrent.futures import ThreadPoolExecutor
+from utils.logger import logger
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# dHash 边长：16 -> 256 位哈希，区分度足以避免不同界面被误判为同一帧
+HASH_SIZE = 16
+# 扩展名 -> Pillow 编码格式
+IMAGE_EXTENSIONS = {'.png': 'PNG', '.webp': 'WEBP', '.jpg': 'JPEG', '.jpeg': 'JPEG'}
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config', 'config.yaml')
+
+
+def perceptual_hash(image, hash_size=HASH_SIZE):
+    """
+    差值哈希（dHash）
+    灰度缩放到 (hash_size + 1) x hash_size，逐行比较相邻像素亮度
+    :return: hash_size * hash_size 位整数
+    """
+    pixels = image.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR).tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def color_signature(image):
+    """4x4 缩略图的粗量化颜色，dHash 只反映亮度梯度，需要它区分仅颜色不同的帧（如选中态）"""
+    return bytes(value >> 4 for value in image.convert('RGB').resize((4, 4), Image.BILINEAR).tobytes())
+
+
+class ScreenshotPipeline:
+    """
+    截图流水线
+    测试线程只执行一次 get_screenshot_as_base64（不解码、不写盘），
+    解码、去重和 WebP/PNG 编码在后台线程完成
+    默认只对字节完全相同的截图去重；感知哈希去重会把仅有细微差别的帧（如不同的错误提示）
+    链接到同一文件，需显式开启
+    """
+
+    def __init__(self, output_dir, image_format='webp', quality=80, dedupe='exact', max_distance=0, workers=1):
+        """
+        :param output_dir: 输出目录
+        :param image_format: 'webp' 或 'png'；未安装 Pillow 时固定为设备返回的 PNG
+        :param quality: WebP 质量
+        :param dedupe: 'exact' 按截图字节去重，'perceptual' 按感知哈希去重，None 不去重
+        :param max_distance: 感知哈希去重时的最大汉明距离，不超过该值视为同一帧
+        :param workers: 后台编码线程数
+        """
+        self.output_dir = output_dir
+        self.image_format = image_format.lower() if Image is not None else 'png'
+        self.quality = quality
+        self.dedupe = dedupe if Image is not None or dedupe != 'perceptual' else 'exact'
+        self.max_distance = max_distance
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='screenshot')
+        self._lock = threading.Lock()
+        self._frames = []
+        self._futures = []
+        self.stats = {'captured': 0, 'deduplicated': 0, 'raw_bytes': 0, 'written_bytes': 0}
+
+    @property
+    def extension(self):
+        return '.webp' if self.image_format == 'webp' else '.png'
+
+    def path_for(self, name):
+        """
+        截图文件路径
+        name 不带扩展名时按输出格式补全；带扩展名时按扩展名编码，
+        未安装 Pillow 时无法转码，非 .png 的扩展名替换为 .png
+        """
+        root, ext = os.path.splitext(name)
+        if ext.lower() not in IMAGE_EXTENSIONS:
+            name += self.extension
+        elif Image is None and ext.lower() != '.png':
+            name = root + '.png'
+        return name if os.path.isabs(name) else os.path.join(self.output_dir, name)
+
+    def capture(self, driver, name):
+        """
+        截图并提交后台处理
+        :param driver: WebDriver
+        :param name: 文件名（可不带扩展名）
+        :return: (path, Future, png_base64)；path 为实际写入的路径（扩展名可能被替换），
+                 Future 完成后返回该路径
+        """
+        png_base64 = driver.get_screenshot_as_base64()
+        return self.submit(png_base64, name)
+
+    def submit(self, png_base64, name):
+        """提交一张已获取的 base64 PNG 截图"""
+        path = self.path_for(name)
+        future = self._executor.submit(self._process, png_base64, path)
+        with self._lock:
+            self._futures.append(future)
+            self.stats['captured'] += 1
+        return path, future, png_base64
+
+    def _frame_key(self, data, image, path):
+        """去重键；包含输出格式，不同格式的文件不能互相链接"""
+        file_format = IMAGE_EXTENSIONS[os.path.splitext(path)[1].lower()]
+        if self.dedupe == 'perceptual':
+            return file_format, perceptual_hash(image), color_signature(image)
+        return file_format, hashlib.sha1(data).hexdigest()
+
+    def _find_duplicate(self, key):
+        for frame_key, frame_path in self._frames:
+            if self.dedupe == 'perceptual':
+                if frame_key[0] == key[0] and frame_key[2] == key[2] \
+                        and bin(frame_key[1] ^ key[1]).count('1') <= self.max_distance:
+                    return frame_path
+            elif frame_key == key:
+                return frame_path
+        return None
+
+    def _process(self, png_base64, path):
+        try:
+            data = base64.b64decode(png_base64)
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            file_format = IMAGE_EXTENSIONS[os.path.splitext(path)[1].lower()]
+            image = None
+            if Image is not None and (file_format != 'PNG' or self.dedupe == 'perceptual'):
+                image = Image.open(io.BytesIO(data))
+                image.load()
+
+            key = self._frame_key(data, image, path) if self.dedupe else None
+            with self._lock:
+                self.stats['raw_bytes'] += len(data)
+                duplicate = self._find_duplicate(key) if key is not None else None
+            if duplicate is not None:
+                self._link(duplicate, path)
+                with self._lock:
+                    self.stats['deduplicated'] += 1
+                return path
+
+            self._write(path, file_format, data, image)
+            with self._lock:
+                self.stats['written_bytes'] += os.path.getsize(path)
+                # 同一路径的旧内容已被替换，旧登记作废
+                self._frames = [frame for frame in self._frames if frame[1] != path]
+                # 写盘完成后才登记，保证后续重复帧链接到的文件已存在
+                if key is not None:
+                    self._frames.append((key, path))
+            return path
+        except Exception as e:
+            logger.error(f"截图处理失败 {path}: {str(e)}")
+            return None
+
+    def _write(self, path, file_format, data, image):
+        """
+        先写临时文件再 os.replace 到目标路径
+        目标可能是重复帧的硬链接，直接写入会连同被链接的原截图一起覆盖
+        """
+        fd, temp_path = tempfile.mkstemp(prefix='.screenshot-', suffix=os.path.splitext(path)[1],
+                                         dir=os.path.dirname(path) or '.')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if file_format == 'WEBP':
+                    image.save(f, 'WEBP', quality=self.quality, method=4)
+                elif file_format == 'JPEG':
+                    image.convert('RGB').save(f, 'JPEG', quality=self.quality)
+                else:
+                    # 设备返回的就是 PNG，原样写入
+                    f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @staticmethod
+    def _link(source, target):
+        """重复帧不再编码，直接硬链接到已有文件（跨设备时复制）"""
+        if os.path.abspath(source) == os.path.abspath(target):
+            return
+        if os.path.exists(target):
+            os.remove(target)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copyfile(source, target)
+
+    def flush(self):
+        """等待所有截图处理完成"""
+        with self._lock:
+            futures, self._futures = self._futures, []
+        return [future.result() for future in futures]
+
+    def close(self):
+        self.flush()
+        self._executor.shutdown(wait=True)
+        if self.stats['captured']:
+            logger.info(f"截图 {self.stats['captured']} 张，去重 {self.stats['deduplicated']} 张，"
+                        f"原始 {self.stats['raw_bytes'] // 1024}KB -> 写入 {self.stats['written_bytes'] // 1024}KB")
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def configured_options(config_path=CONFIG_PATH):
+    """config.yaml test_info 中的截图配置（screenshot_format / screenshot_dedupe）"""
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            test_info = (yaml.safe_load(f) or {}).get('test_info') or {}
+    except (OSError, yaml.YAMLError) as e:
+        logger.warning(f"读取截图配置失败，使用默认值: {str(e)}")
+        return {}
+    options = {}
+    if test_info.get('screenshot_format'):
+        options['image_format'] = str(test_info['screenshot_format'])
+    if 'screenshot_dedupe' in test_info:
+        options['dedupe'] = test_info['screenshot_dedupe'] or None
+    return options
+
+
+def get_pipeline(output_dir=None, **kwargs):
+    """
+    获取进程内共享的截图流水线，首次调用时按参数创建
+    未指定的参数取 config.yaml test_info 中的截图配置
+    :param output_dir: 输出目录，默认 reports/screenshots
+    """
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            if output_dir is None:
+                output_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                          'reports', 'screenshots')
+            options = configured_options()
+            options.update(kwargs)
+            _pipeline = ScreenshotPipeline(output_dir, **options)
+        return _pipeline
+
+
+def close_pipeline():
+    """等待后台处理完成并关闭共享流水线"""
+    global _pipeline
+    with _pipeline_lock:
+        pipeline, _pipeline = _pipeline, None
+    if pipeline is not None:
+        pipeline.close()
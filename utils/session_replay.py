@@ -0,0 +1,228 @@
+import json
+import time
+import threading
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+from utils.logger import logger
+
+
+def _canonical_body(body):
+    """请求体规范化为排序后的 JSON 字符串，便于匹配"""
+    if body is None:
+        return None
+    if isinstance(body, (bytes, str)):
+        try:
+            body = json.loads(body)
+        except ValueError:
+            return body.decode('utf-8') if isinstance(body, bytes) else body
+    return json.dumps(body, sort_keys=True, ensure_ascii=False)
+
+
+class SessionRecorder:
+    """
+    会话录制器
+    包装 RemoteConnection._request，按顺序记录每条 WebDriver 命令的请求、响应和耗时，
+    逐条追加写入 JSONL 文件，进程中途退出也不会丢失已录制的内容
+    """
+
+    def __init__(self, path):
+        """
+        :param path: 录制文件路径（JSONL）
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+        self.count = 0
+
+    def attach(self, connection):
+        """
+        开始录制某个连接上的请求
+        :param connection: AppiumConnection / RemoteConnection 实例，需在创建 WebDriver 前传入才能录到新建会话
+        :return: connection
+        """
+        base_path = urlparse(connection._url).path.rstrip('/')
+        original_request = connection._request
+
+        def _recording_request(method, url, body=None):
+            start = time.perf_counter()
+            response = original_request(method, url, body)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            path = urlparse(url).path
+            if base_path and path.startswith(base_path):
+                path = path[len(base_path):]
+            self._write({
+                'method': method,
+                'path': path,
+                'body': json.loads(body) if body else None,
+                'response': response,
+                'elapsed_ms': round(elapsed_ms, 3),
+            })
+            return response
+
+        connection._request = _recording_request
+        logger.info(f"开始录制 WebDriver 会话: {self.path}")
+        return connection
+
+    def _write(self, entry):
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+        logger.info(f"会话录制结束，共 {self.count} 条命令: {self.path}")
+
+
+def load_recording(path):
+    """读取录制文件"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class ReplayServer:
+    """
+    本地回放服务器
+    在 W3C WebDriver 端点上按录制顺序返回响应，同一请求多次出现时依次回放，
+    回放完后重复最后一个响应，便于基准测试循环执行；可按录制耗时或固定值注入延迟
+    """
+
+    def __init__(self, recording, host='127.0.0.1', port=0, base_path='/wd/hub', latency=None, latency_scale=1.0):
+        """
+        :param recording: 录制文件路径或已加载的条目列表
+        :param host: 监听地址
+        :param port: 监听端口，0 表示自动分配
+        :param base_path: 客户端使用的服务器路径前缀
+        :param latency: None 不注入延迟；'recorded' 按录制耗时；数字为固定延迟（秒）
+        :param latency_scale: 录制耗时的缩放系数
+        """
+        entries = load_recording(recording) if isinstance(recording, str) else list(recording)
+        self.base_path = base_path.rstrip('/')
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.requests = 0
+        self.unmatched = 0
+
+        self._lock = threading.Lock()
+        self._queues = defaultdict(deque)
+        self._last = {}
+        for entry in entries:
+            entry = dict(entry, canonical_body=_canonical_body(entry.get('body')))
+            self._queues[(entry['method'], entry['path'])].append(entry)
+
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}{self.base_path}'
+
+    def _match(self, method, path, body):
+        """优先匹配同一端点上请求体完全一致的录制项，其次按录制顺序取下一个"""
+        key = (method, path)
+        canonical = _canonical_body(body)
+        with self._lock:
+            self.requests += 1
+            queue = self._queues.get(key)
+            if queue:
+                entry = next((e for e in queue if e['canonical_body'] == canonical), queue[0])
+                queue.remove(entry)
+                self._last[key] = entry
+                return entry
+            entry = self._last.get(key)
+            if entry is None:
+                self.unmatched += 1
+            return entry
+
+    def _delay(self, entry):
+        if self.latency == 'recorded':
+            time.sleep(entry.get('elapsed_ms', 0) / 1000 * self.latency_scale)
+        elif self.latency:
+            time.sleep(float(self.latency))
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else None
+                path = urlparse(self.path).path
+                if server.base_path and path.startswith(server.base_path):
+                    path = path[len(server.base_path):]
+
+                entry = server._match(self.command, path, body)
+                if entry is None:
+                    status = 404
+                    payload = json.dumps({'value': {
+                        'error': 'unknown command',
+                        'message': f'No recorded response for {self.command} {path}',
+                        'stacktrace': ''}})
+                else:
+                    server._delay(entry)
+                    response = entry['response']
+                    status = response.get('status') if isinstance(response.get('status'), int) else 200
+                    if 399 < status <= 500:
+                        payload = response.get('value') or ''
+                    else:
+                        status = 200
+                        payload = json.dumps(response, ensure_ascii=False)
+
+                data = payload.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_DELETE = _handle
+
+            def log_message(self, fmt, *args):
+                logger.debug(f"回放请求: {fmt % args}")
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='replay-server', daemon=True)
+        self._thread.start()
+        logger.info(f"回放服务器已启动: {self.url}")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        logger.info(f"回放服务器已停止，共处理 {self.requests} 个请求，{self.unmatched} 个未匹配")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='回放录制的 Appium 会话')
+    parser.add_argument('recording', help='录制文件路径 (JSONL)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4723)
+    parser.add_argument('--latency', default=None, help="'recorded' 或固定延迟秒数")
+    parser.add_argument('--latency-scale', type=float, default=1.0)
+    args = parser.parse_args()
+
+    latency = args.latency if args.latency in (None, 'recorded') else float(args.latency)
+    replay = ReplayServer(args.recording, args.host, args.port, latency=latency,
+                          latency_scale=args.latency_scale).start()
+    try:
+        replay._thread.join()
+    except KeyboardInterrupt:
+        replay.stop()
@@ -0,0 +1,274 @@
+import os
+import re
+import json
+import time
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import yaml
+from utils.logger import logger
+from utils.device_shell import PersistentShell
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(PROJECT_ROOT, 'config', 'config.yaml')
+BASELINE_PATH = os.path.join(PROJECT_ROOT, 'benchmarks', 'startup_baseline.json')
+RESULTS_PATH = os.path.join(PROJECT_ROOT, 'reports', 'startup', 'latest.json')
+
+# 中位数超过基线该比例时视为回退
+DEFAULT_TOLERANCE = 0.15
+# 首屏加载时间要求（test_cases_source/test_cases.md：首屏加载时间≤1.5秒）
+DEFAULT_SLA_MS = 1500
+
+# cold：force-stop 后启动（进程冷启动）；warm：回到桌面后以 --activity-clear-task 启动，
+# 销毁原任务中的 Activity 并重新创建（进程仍在）；hot：回到桌面后启动（Activity 仍在）
+# Android 12+ 对根 Activity 按返回键只会把任务移到后台，不能用于温启动
+LAUNCH_MODES = ('cold', 'warm', 'hot')
+# 各模式期望的 am start -W LaunchState（Android 10+ 输出）
+EXPECTED_LAUNCH_STATES = {'cold': 'COLD', 'warm': 'WARM', 'hot': 'HOT'}
+
+_AM_FIELD_RE = re.compile(r'^(Status|LaunchState|Activity|TotalTime|WaitTime|ThisTime):\s*(\S+)', re.M)
+
+
+def parse_am_start(output):
+    """
+    解析 am start -W 的输出
+    :return: {'Status', 'LaunchState', 'Activity', 'TotalTime', 'WaitTime', 'ThisTime'}，时间为毫秒整数
+    """
+    result = {}
+    for name, value in _AM_FIELD_RE.findall(output):
+        result[name] = int(value) if name.endswith('Time') and value.isdigit() else value
+    if 'Error' in output and 'Status' not in result:
+        result['Status'] = 'error'
+    return result
+
+
+def distribution(values):
+    """启动耗时分布（毫秒）"""
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return {}
+    return {
+        'runs': int(len(values)),
+        'min': float(values.min()),
+        'median': float(np.median(values)),
+        'mean': round(float(values.mean()), 1),
+        'p90': round(float(np.percentile(values, 90)), 1),
+        'max': float(values.max()),
+        'stdev': round(float(values.std(ddof=1)) if len(values) > 1 else 0.0, 1),
+    }
+
+
+class StartupBenchmark:
+    """
+    应用启动耗时测量
+    通过常驻 adb shell 反复执行 am start -W，采集 TotalTime / WaitTime 分布
+    """
+
+    def __init__(self, package, activity, device_id=None, settle=1.0):
+        """
+        :param package: 应用包名
+        :param activity: 启动 Activity（可为 '.MainActivity' 形式）
+        :param device_id: adb 设备序列号
+        :param settle: 两次启动之间的等待时间（秒），让应用完成首帧后的初始化
+        """
+        self.package = package
+        self.activity = activity
+        self.device_id = device_id
+        self.settle = settle
+        self.shell = PersistentShell.adb(device_id)
+
+    @property
+    def component(self):
+        return f"{self.package}/{self.activity}"
+
+    def _prepare(self, mode):
+        if mode == 'cold':
+            self.shell.run(f"am force-stop {self.package}")
+        elif mode in ('warm', 'hot'):
+            self.shell.run("input keyevent KEYCODE_HOME")
+        else:
+            raise ValueError(f"不支持的启动模式: {mode}")
+        time.sleep(self.settle)
+
+    def launch(self, mode='cold'):
+        """执行一次启动，返回 am start -W 的解析结果"""
+        self._prepare(mode)
+        flags = '--activity-clear-task ' if mode == 'warm' else ''
+        output = self.shell.run(f"am start -W {flags}-n {self.component}") or ''
+        result = parse_am_start(output)
+        if result.get('Status') != 'ok' or 'TotalTime' not in result:
+            logger.warning(f"启动 {self.component} 失败: {output.strip()}")
+        return result
+
+    def run(self, mode='cold', runs=5):
+        """
+        重复启动并统计
+        设备报告的 LaunchState 与模式不符时（如温启动前进程已被回收，实际为冷启动）该次不计入分布，
+        计数记录在 mismatched 中，按实际 LaunchState 分类记录在 mismatched_states 中
+        :return: {'mode', 'launch_states', 'total_time', 'wait_time', 'failures', 'mismatched', 'mismatched_states'}
+        """
+        if mode != 'cold':
+            # 非冷启动需要进程已在运行
+            self.shell.run(f"am start -W -n {self.component}")
+            time.sleep(self.settle)
+        totals, waits, states, failures, mismatched = [], [], [], 0, {}
+        expected = EXPECTED_LAUNCH_STATES[mode]
+        for _ in range(runs):
+            result = self.launch(mode)
+            if 'TotalTime' not in result:
+                failures += 1
+                continue
+            state = result.get('LaunchState', '').upper()
+            # 旧系统没有 LaunchState，部分系统输出 UNKNOWN，这两种情况无法判断，照常计入
+            if state in EXPECTED_LAUNCH_STATES.values() and state != expected:
+                mismatched[state] = mismatched.get(state, 0) + 1
+                logger.warning(f"{self.component} {mode} 启动的 LaunchState 为 {state}，不计入统计")
+                continue
+            totals.append(result['TotalTime'])
+            if 'WaitTime' in result:
+                waits.append(result['WaitTime'])
+            states.append(result.get('LaunchState', ''))
+        summary = {
+            'mode': mode,
+            'launch_states': sorted(set(filter(None, states))),
+            'total_time': distribution(totals),
+            'wait_time': distribution(waits),
+            'failures': failures,
+            'mismatched': sum(mismatched.values()),
+            'mismatched_states': mismatched,
+        }
+        logger.info(f"{self.device_id or 'default'} {self.package} {mode} 启动: "
+                    f"TotalTime 中位数 {summary['total_time'].get('median')}ms，失败 {failures} 次，"
+                    f"启动类型不符 {summary['mismatched']} 次")
+        return summary
+
+    def close(self):
+        self.shell.close()
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, sla_ms=DEFAULT_SLA_MS):
+    """
+    与基线和 SLA 比较
+    :param results: {key: {mode: summary}}，key 为 '<device>/<package>'
+    :return: 问题描述列表
+    """
+    problems = []
+    for key, modes in results.items():
+        for mode, summary in modes.items():
+            median = summary['total_time'].get('median')
+            actual = ', '.join(f"{state} {count} 次" for state, count in summary.get('mismatched_states', {}).items())
+            if median is None:
+                if actual:
+                    problems.append(f"{key} {mode}: 所有启动的 LaunchState 都与模式不符（{actual}）")
+                else:
+                    problems.append(f"{key} {mode}: 没有成功的启动")
+                continue
+            if summary.get('mismatched'):
+                logger.warning(f"{key} {mode}: {summary['mismatched']} 次启动类型与模式不符（{actual}），已从分布中排除")
+            if mode == 'cold' and sla_ms and median > sla_ms:
+                problems.append(f"{key} {mode}: TotalTime 中位数 {median:.0f}ms 超过 {sla_ms}ms")
+            expected = baseline.get(key, {}).get(mode, {}).get('total_time', {}).get('median')
+            if not expected:
+                logger.warning(f"{key} {mode}: 没有基线，跳过回退比较")
+                continue
+            if median > expected * (1 + tolerance):
+                problems.append(f"{key} {mode}: TotalTime 中位数 {expected:.0f}ms -> {median:.0f}ms "
+                                f"(+{(median / expected - 1) * 100:.0f}%)")
+    return problems
+
+
+def connected_devices():
+    """adb 已连接且在线的设备序列号"""
+    try:
+        output = subprocess.run(['adb', 'devices'], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.error(f"获取设备列表失败: {str(e)}")
+        return []
+    return [line.split()[0] for line in output.splitlines()[1:] if line.strip().endswith('device')]
+
+
+def configured_targets(config_path=CONFIG_PATH):
+    """
+    从 config.yaml 的 Android 设备配置中取出已连接设备的 (serial, package, activity)
+    序列号取 udid，没有时取 deviceName
+    """
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f) or {}
+    online = set(connected_devices())
+    targets, seen = [], set()
+    for devices in (config.get('devices') or {}).values():
+        for device in devices or []:
+            serial = device.get('udid') or device.get('deviceName')
+            if str(device.get('platformName', '')).lower() != 'android' or not device.get('appPackage') \
+                    or serial not in online or serial in seen:
+                continue
+            seen.add(serial)
+            targets.append((serial, device['appPackage'], device.get('appActivity')))
+    return targets
+
+
+def run_all(targets, modes=('cold', 'warm'), runs=5):
+    """在所有设备上并行执行启动测量，返回 {'<serial>/<package>': {mode: summary}}"""
+    def _run(target):
+        serial, package, activity = target
+        bench = StartupBenchmark(package, activity, serial)
+        try:
+            return f"{serial}/{package}", {mode: bench.run(mode, runs) for mode in modes}
+        finally:
+            bench.close()
+
+    if not targets:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+        return dict(pool.map(_run, targets))
+
+
+def _load_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logger.warning(f"未找到 {path}")
+        return {}
+    except (OSError, ValueError) as e:
+        logger.error(f"读取 {path} 失败: {str(e)}")
+        return {}
+
+
+def _save_json(data, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False, sort_keys=True)
+
+
+if __name__ == '__main__':
+    import sys
+    import argparse
+
+    parser = argparse.ArgumentParser(description='测量应用冷/温启动耗时（am start -W）')
+    parser.add_argument('--modes', nargs='+', default=['cold', 'warm'], choices=LAUNCH_MODES)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--sla-ms', type=int, default=DEFAULT_SLA_MS)
+    parser.add_argument('--update-baseline', action='store_true', help='用本次结果覆盖基线')
+    args = parser.parse_args()
+
+    targets = configured_targets()
+    if not targets:
+        logger.error("没有已连接且配置了 appPackage 的 Android 设备")
+        sys.exit(2)
+    results = run_all(targets, args.modes, args.runs)
+    _save_json(results, RESULTS_PATH)
+    if args.update_baseline:
+        baseline = _load_json(BASELINE_PATH)
+        baseline.update(results)
+        _save_json(baseline, BASELINE_PATH)
+        logger.info(f"基线已更新: {BASELINE_PATH}")
+        sys.exit(0)
+    baseline = _load_json(BASELINE_PATH)
+    if not baseline:
+        logger.warning("没有启动耗时基线，只检查 SLA；使用 --update-baseline 生成基线")
+    problems = compare(results, baseline, args.tolerance, args.sla_ms)
+    for problem in problems:
+        logger.error(problem)
+    sys.exit(1 if problems else 0)
@@ -1,7 +1,266 @@
 import os
-from jinja2 import Template
+import re
+import json
+import hashlib
+import yaml
+from concurrent.futures import ProcessPoolExecutor
+from jinja2 import Environment, DictLoader, FileSystemBytecodeCache
 from utils.logger import logger
 
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_CACHE_DIR = os.path.join(PROJECT_ROOT, '.jinja_cache')
+MANIFEST_NAME = '.generated_manifest.json'
+# 模块数达到该阈值时才启用多进程渲染，小配置下进程启动开销大于收益
+PARALLEL_THRESHOLD = 8
+
+# 测试模板，按模块名索引；未单独定义模板的模块使用 default
+TEMPLATE_SOURCES = {
+    'login': '''
+from utils.appium_driver import AppiumDriver
+from pages.base_page import BasePage
+from appium.webdriver.common.appiumby import AppiumBy
+import pytest
+
+class Test{{ module|class_name }}:
+    def setup_class(self):
+        self.driver = AppiumDriver().init_driver()
+        self.page = BasePage(self.driver)
+
+    def teardown_class(self):
+        self.driver.quit()
+
+    {% for element in elements %}
+    def test_{{ element.name|identifier }}(self):
+        """测试{{ element.name }}"""
+        {% if element.type == "input" %}
+        self.page.input_text((AppiumBy.ID, "{{ element.id }}"), "test_input")
+        {% elif element.type == "button" %}
+        self.page.click((AppiumBy.ID, "{{ element.id }}"))
+        {% endif %}
+        
+    {% endfor %}
+
+    {% if validations %}
+    @pytest.mark.parametrize("test_input,expected", [
+        {% for validation in validations %}
+        ("{{ validation }}", "{{ validation }}提示"),
+        {% endfor %}
+    ])
+    def test_validations(self, test_input, expected):
+        """测试验证提示"""
+        # 触发验证
+        self.page.click((AppiumBy.ID, "login_button"))
+        # 验证提示
+        assert self.page.verify_toast(expected)
+    {% endif %}
+''',
+    'home': '''
+from utils.appium_driver import AppiumDriver
+from pages.base_page import BasePage
+from appium.webdriver.common.appiumby import AppiumBy
+
+class Test{{ module|class_name }}:
+    def setup_class(self):
+        self.driver = AppiumDriver().init_driver()
+        self.page = BasePage(self.driver)
+
+    def teardown_class(self):
+        self.driver.quit()
+
+    {% for element in elements %}
+    def test_{{ element.name|identifier }}(self):
+        """测试{{ element.name }}"""
+        {% if element.type == "search" %}
+        self.page.input_text((AppiumBy.ID, "{{ element.id }}"), "搜索关键词")
+        {% elif element.type == "swipe" %}
+        # 获取轮播容器
+        banner = self.page.find_element((AppiumBy.ID, "{{ element.id }}"))
+        # 左右滑动
+        self.page.swipe(banner.location['x'], banner.location['y'],
+                       banner.location['x'] + 200, banner.location['y'])
+        {% elif element.type == "list" %}
+        # 获取列表元素
+        products = self.page.find_elements((AppiumBy.ID, "{{ element.id }}"))
+        assert len(products) > 0
+        {% endif %}
+        
+    {% endfor %}
+
+    {% if gestures %}
+    {% for gesture in gestures %}
+    def test_{{ gesture|identifier }}(self):
+        """测试{{ gesture }}"""
+        {% if "下拉" in gesture %}
+        # 下拉刷新
+        self.page.swipe(200, 200, 200, 400)
+        {% elif "上拉" in gesture %}
+        # 上拉加载
+        self.page.swipe(200, 400, 200, 200)
+        {% endif %}
+    {% endfor %}
+    {% endif %}
+''',
+    'product_detail': '''
+from utils.appium_driver import AppiumDriver
+from pages.base_page import BasePage
+from appium.webdriver.common.appiumby import AppiumBy
+
+class Test{{ module|class_name }}:
+    def setup_class(self):
+        self.driver = AppiumDriver().init_driver()
+        self.page = BasePage(self.driver)
+
+    def teardown_class(self):
+        self.driver.quit()
+
+    {% for element in elements %}
+    def test_{{ element.name|identifier }}(self):
+        """测试{{ element.name }}"""
+        {% if element.type == "gallery" %}
+        gallery = self.page.find_element((AppiumBy.ID, "{{ element.id }}"))
+        # 左右滑动查看图片
+        self.page.swipe(gallery.location['x'], gallery.location['y'],
+                       gallery.location['x'] + 200, gallery.location['y'])
+        {% elif element.type == "button" %}
+        self.page.click((AppiumBy.ID, "{{ element.id }}"))
+        {% endif %}
+        
+    {% endfor %}
+
+    {% if media %}
+    {% for item in media %}
+    def test_{{ item.name|identifier }}(self):
+        """测试{{ item.name }}"""
+        {% if item.type == "video" %}
+        video = self.page.handle_video((AppiumBy.ID, "{{ item.id }}"))
+        video.play()
+        assert video.is_playing()
+        video.pause()
+        {% elif item.type == "audio" %}
+        audio = self.page.handle_audio((AppiumBy.ID, "{{ item.id }}"))
+        audio.play()
+        assert audio.is_playing()
+        audio.pause()
+        {% endif %}
+    {% endfor %}
+    {% endif %}
+''',
+    'default': '''
+from utils.appium_driver import AppiumDriver
+from pages.base_page import BasePage
+from appium.webdriver.common.appiumby import AppiumBy
+
+class Test{{ module|class_name }}:
+    def setup_class(self):
+        self.driver = AppiumDriver().init_driver()
+        self.page = BasePage(self.driver)
+
+    def teardown_class(self):
+        self.driver.quit()
+
+    {% for element in elements if element.id %}
+    def test_{{ element.name|identifier }}_{{ loop.index }}(self):
+        """测试{{ element.name }}"""
+        {% if element.type == "input" %}
+        self.page.input_text((AppiumBy.ID, "{{ element.id }}"), "test_input")
+        {% elif element.type == "button" or element.clickable == "true" %}
+        self.page.click((AppiumBy.ID, "{{ element.id }}"))
+        {% else %}
+        assert self.page.is_element_present((AppiumBy.ID, "{{ element.id }}"))
+        {% endif %}
+
+    {% endfor %}
+''',
+}
+
+_environment = None
+
+
+def _identifier(value):
+    """将元素名称转换为合法的 Python 标识符"""
+    name = re.sub(r'\W+', '_', str(value or '').strip().lower()).strip('_')
+    if not name:
+        return 'element'
+    if name[0].isdigit():
+        name = f'_{name}'
+    return name
+
+
+def _class_name(value):
+    """将模块名转换为测试类名"""
+    return ''.join(part.title() for part in _identifier(value).split('_'))
+
+
+def get_environment():
+    """
+    获取共享的 Jinja2 环境（每个进程一个）
+    模板在首次创建时全部预编译，编译结果同时写入字节码缓存，
+    渲染子进程和下一次生成可以直接加载，无需重新解析模板
+    """
+    global _environment
+    if _environment is None:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+        env = Environment(
+            loader=DictLoader(TEMPLATE_SOURCES),
+            bytecode_cache=FileSystemBytecodeCache(TEMPLATE_CACHE_DIR),
+            auto_reload=False,
+            keep_trailing_newline=True,
+        )
+        env.filters['identifier'] = _identifier
+        env.filters['class_name'] = _class_name
+        for name in TEMPLATE_SOURCES:
+            env.get_template(name)
+        _environment = env
+    return _environment
+
+
+def _template_context(module, info):
+    """构造模块模板的渲染上下文"""
+    context = {
+        'module': module,
+        'description': info.get('description', f'{module} 模块'),
+        'elements': info.get('elements') or [],
+    }
+    for key in ('validations', 'gestures', 'media'):
+        if key in info:
+            context[key] = info[key]
+    return context
+
+
+def render_module(module, info):
+    """
+    渲染单个模块的测试代码
+    :param module: 模块名
+    :param info: app_features 中该模块的描述
+    :return: (模块名, 测试代码)
+    """
+    env = get_environment()
+    name = module if module in TEMPLATE_SOURCES else 'default'
+    return module, env.get_template(name).render(**_template_context(module, info))
+
+
+def _content_hash(content):
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+_CLASS_RE = re.compile(r'^class (\w+)', re.M)
+_TEST_RE = re.compile(r'^    def (test_\w+)\(', re.M)
+
+
+def _test_hashes(content):
+    """
+    按测试函数切分生成的代码并计算各函数的哈希
+    :return: (测试类名, {测试函数名: 哈希})
+    """
+    class_match = _CLASS_RE.search(content)
+    matches = list(_TEST_RE.finditer(content))
+    hashes = {}
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(content)
+        hashes[match.group(1)] = _content_hash(content[match.start():end].strip())
+    return (class_match.group(1) if class_match else None), hashes
+
+
 class AutoTestGenerator:  # 改名以避免与测试类混淆
     """测试用例生成器"""
     
@@ -117,166 +376,202 @@ def _create_test_case(self, element):
 
     def _generate_module_tests(self, module, info):
         """生成模块测试用例"""
-        template = self._get_template(module)
-        return template.render(
-            module=module,
-            description=info['description'],
-            elements=info['elements'],
-            **self._get_extra_context(info)
-        )
-    
+        return render_module(module, info)[1]
+
     def _get_template(self, module):
-        """获取测试用例模板"""
-        templates = {
-            'login': Template('''
-from utils.appium_driver import AppiumDriver
-from pages.base_page import BasePage
-from appium.webdriver.common.appiumby import AppiumBy
-import pytest
+        """获取测试用例模板（预编译，未定义的模块使用默认模板）"""
+        env = get_environment()
+        return env.get_template(module if module in TEMPLATE_SOURCES else 'default')
 
-class Test{{ module|title }}:
-    def setup_class(self):
-        self.driver = AppiumDriver().init_driver()
-        self.page = BasePage(self.driver)
+    def _load_app_features(self, config_path=None):
+        """从配置文件读取 app_features"""
+        config_path = config_path or os.path.join(PROJECT_ROOT, 'config', 'config.yaml')
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+        return config.get('app_features') or {}
 
-    def teardown_class(self):
-        self.driver.quit()
+    def render_modules(self, app_features):
+        """
+        渲染所有模块的测试代码
+        :param app_features: 模块名 -> 模块描述
+        :return: 模块名 -> 测试代码
+        """
+        items = list(app_features.items())
+        if len(items) < PARALLEL_THRESHOLD:
+            return dict(render_module(module, info) for module, info in items)
 
-    {% for element in elements %}
-    def test_{{ element.name|lower|replace(" ", "_") }}(self):
-        """测试{{ element.name }}"""
-        {% if element.type == "input" %}
-        self.page.input_text((AppiumBy.ID, "{{ element.id }}"), "test_input")
-        {% elif element.type == "button" %}
-        self.page.click((AppiumBy.ID, "{{ element.id }}"))
-        {% endif %}
-        
-    {% endfor %}
+        # 预热环境，确保字节码缓存已写入，子进程直接加载编译结果
+        get_environment()
+        workers = min(len(items), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            modules, infos = zip(*items)
+            return dict(executor.map(render_module, modules, infos, chunksize=4))
 
-    {% if validations %}
-    @pytest.mark.parametrize("test_input,expected", [
-        {% for validation in validations %}
-        ("{{ validation }}", "{{ validation }}提示"),
-        {% endfor %}
-    ])
-    def test_validations(self, test_input, expected):
-        """测试验证提示"""
-        # 触发验证
-        self.page.click((AppiumBy.ID, "login_button"))
-        # 验证提示
-        assert self.page.verify_toast(expected)
-    {% endif %}
-'''),
-            'home': Template('''
-from utils.appium_driver import AppiumDriver
-from pages.base_page import BasePage
-from appium.webdriver.common.appiumby import AppiumBy
+    def _load_manifest(self, output_dir):
+        try:
+            with open(os.path.join(output_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
 
-class Test{{ module|title }}:
-    def setup_class(self):
-        self.driver = AppiumDriver().init_driver()
-        self.page = BasePage(self.driver)
+    def _save_manifest(self, output_dir, manifest):
+        with open(os.path.join(output_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
 
-    def teardown_class(self):
-        self.driver.quit()
+    def save_test_cases(self, output_dir='test_cases', app_features=None, modules=None):
+        """
+        保存生成的测试用例
+        输出内容哈希与上次生成一致且文件未被改动时跳过写入
+        :param output_dir: 输出目录
+        :param app_features: 模块描述，默认读取 config.yaml 中的 app_features
+        :param modules: 只重新生成这些模块，默认全部
+        :return: {'written': [...], 'unchanged': [...], 'rerun': [...]}，
+                 rerun 为新增或内容变化的测试节点 ID
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        if app_features is None:
+            app_features = self._load_app_features()
+        if modules is not None:
+            app_features = {m: app_features[m] for m in modules if m in app_features}
 
-    {% for element in elements %}
-    def test_{{ element.name|lower|replace(" ", "_") }}(self):
-        """测试{{ element.name }}"""
-        {% if element.type == "search" %}
-        self.page.input_text((AppiumBy.ID, "{{ element.id }}"), "搜索关键词")
-        {% elif element.type == "swipe" %}
-        # 获取轮播容器
-        banner = self.page.find_element((AppiumBy.ID, "{{ element.id }}"))
-        # 左右滑动
-        self.page.swipe(banner.location['x'], banner.location['y'],
-                       banner.location['x'] + 200, banner.location['y'])
-        {% elif element.type == "list" %}
-        # 获取列表元素
-        products = self.page.find_elements((AppiumBy.ID, "{{ element.id }}"))
-        assert len(products) > 0
-        {% endif %}
-        
-    {% endfor %}
+        rendered = self.render_modules(app_features)
+        manifest = self._load_manifest(output_dir)
+        result = {'written': [], 'unchanged': [], 'rerun': []}
 
-    {% if gestures %}
-    {% for gesture in gestures %}
-    def test_{{ gesture|lower|replace(" ", "_") }}(self):
-        """测试{{ gesture }}"""
-        {% if "下拉" in gesture %}
-        # 下拉刷新
-        self.page.swipe(200, 200, 200, 400)
-        {% elif "上拉" in gesture %}
-        # 上拉加载
-        self.page.swipe(200, 400, 200, 200)
-        {% endif %}
-    {% endfor %}
-    {% endif %}
-'''),
-            'product_detail': Template('''
-from utils.appium_driver import AppiumDriver
-from pages.base_page import BasePage
-from appium.webdriver.common.appiumby import AppiumBy
+        for module, content in rendered.items():
+            filename = f'test_{_identifier(module)}.py'
+            path = os.path.join(output_dir, filename)
+            digest = _content_hash(content)
+            entry = manifest.get(filename, {})
 
-class Test{{ module|title }}:
-    def setup_class(self):
-        self.driver = AppiumDriver().init_driver()
-        self.page = BasePage(self.driver)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stat = None
+            if (stat and entry.get('hash') == digest
+                    and entry.get('size') == stat.st_size
+                    and entry.get('mtime_ns') == stat.st_mtime_ns):
+                result['unchanged'].append(path)
+                continue
 
-    def teardown_class(self):
-        self.driver.quit()
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            stat = os.stat(path)
+            class_name, tests = _test_hashes(content)
+            previous = entry.get('tests', {}) if entry.get('class') == class_name else {}
+            result['rerun'].extend(
+                f'{path}::{class_name}::{name}'
+                for name, test_hash in tests.items() if previous.get(name) != test_hash
+            )
+            manifest[filename] = {
+                'module': module,
+                'hash': digest,
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'class': class_name,
+                'tests': tests,
+            }
+            result['written'].append(path)
 
-    {% for element in elements %}
-    def test_{{ element.name|lower|replace(" ", "_") }}(self):
-        """测试{{ element.name }}"""
-        {% if element.type == "gallery" %}
-        gallery = self.page.find_element((AppiumBy.ID, "{{ element.id }}"))
-        # 左右滑动查看图片
-        self.page.swipe(gallery.location['x'], gallery.location['y'],
-                       gallery.location['x'] + 200, gallery.location['y'])
-        {% elif element.type == "button" %}
-        self.page.click((AppiumBy.ID, "{{ element.id }}"))
-        {% endif %}
-        
-    {% endfor %}
+        self._save_manifest(output_dir, manifest)
+        logger.info(f"测试代码生成完成: 写入 {len(result['written'])} 个, 未变化 {len(result['unchanged'])} 个, "
+                    f"需重跑 {len(result['rerun'])} 个测试")
+        return result
 
-    {% if media %}
-    {% for item in media %}
-    def test_{{ item.name|lower|replace(" ", "_") }}(self):
-        """测试{{ item.name }}"""
-        {% if item.type == "video" %}
-        video = self.page.handle_video((AppiumBy.ID, "{{ item.id }}"))
-        video.play()
-        assert video.is_playing()
-        video.pause()
-        {% elif item.type == "audio" %}
-        audio = self.page.handle_audio((AppiumBy.ID, "{{ item.id }}"))
-        audio.play()
-        assert audio.is_playing()
-        audio.pause()
-        {% endif %}
-    {% endfor %}
-    {% endif %}
-''')
-        }
-        return templates.get(module)
-    
-    def _get_extra_context(self, info):
-        """获取额外的模板上下文"""
-        context = {}
-        if 'validations' in info:
-            context['validations'] = info['validations']
-        if 'gestures' in info:
-            context['gestures'] = info['gestures']
-        if 'media' in info:
-            context['media'] = info['media']
-        return context
-
-    def save_test_cases(self, output_dir='test_cases'):
-        """保存生成的测试用例"""
-        os.makedirs(output_dir, exist_ok=True)
-        
-        test_cases = self.generate_test_cases()
-        for module, content in test_cases.items():
-            with open(os.path.join(output_dir, f'test_{module}.py'), 'w', encoding='utf-8') as f:
-                f.write(content)
\ No newline at end of file
+    def regenerate_changed(self, feature_diff, output_dir='test_cases', app_features=None):
+        """
+        根据 app_features 的变更只重新生成受影响的模块
+        :param feature_diff: diff_app_features 的结果
+        :param output_dir: 输出目录
+        :param app_features: 更新后的模块描述，默认读取 config.yaml
+        :return: save_test_cases 的结果，另含 removed（被删除的测试文件）
+        """
+        if app_features is None:
+            app_features = self._load_app_features()
+
+        removed_modules = [m for m, d in feature_diff.items() if d['status'] == 'removed']
+        changed_modules = [m for m, d in feature_diff.items() if d['status'] != 'removed']
+
+        result = self.save_test_cases(output_dir, app_features, modules=changed_modules)
+        result['removed'] = []
+        if removed_modules:
+            manifest = self._load_manifest(output_dir)
+            for module in removed_modules:
+                filename = f'test_{_identifier(module)}.py'
+                path = os.path.join(output_dir, filename)
+                if manifest.pop(filename, None) is not None and os.path.exists(path):
+                    os.remove(path)
+                    result['removed'].append(path)
+            self._save_manifest(output_dir, manifest)
+        return result
+
+    def run_tests(self, node_ids, extra_args=None):
+        """
+        只运行指定的测试节点
+        :param node_ids: 测试节点 ID 列表，通常为 regenerate_changed 返回的 rerun
+        :return: pytest 退出码，无需运行时返回 0
+        """
+        if not node_ids:
+            logger.info("没有需要重新运行的测试")
+            return 0
+        import pytest
+        logger.info(f"重新运行 {len(node_ids)} 个受影响的测试")
+        return pytest.main(list(node_ids) + list(extra_args or []))
+
+    def sync_app_features(self, config_path=None, output_dir='test_cases', rerun=True, extra_args=None):
+        """
+        重新爬取应用更新 app_features，只重新生成并运行受影响的测试
+        :param config_path: 配置文件路径，默认 config/config.yaml
+        :param output_dir: 测试代码输出目录
+        :param rerun: 是否运行新增或变化的测试
+        :param extra_args: 传给 pytest 的额外参数
+        :return: regenerate_changed 的结果，另含 exit_code；更新配置失败时返回 None
+        """
+        config_path = config_path or os.path.join(PROJECT_ROOT, 'config', 'config.yaml')
+        if not self.inspector.update_config(config_path):
+            logger.error("更新 app_features 失败，跳过测试生成")
+            return None
+        return self.apply_feature_diff(self.inspector.last_feature_diff, config_path,
+                                       output_dir, rerun, extra_args)
+
+    def apply_feature_diff(self, feature_diff, config_path=None, output_dir='test_cases',
+                           rerun=True, extra_args=None):
+        """
+        按 app_features 变更重新生成测试，并运行受影响的测试
+        :param feature_diff: diff_app_features 的结果，通常为 AppInspector.last_feature_diff
+        :return: regenerate_changed 的结果，另含 exit_code
+        """
+        result = {'written': [], 'unchanged': [], 'rerun': [], 'removed': []}
+        if feature_diff:
+            result = self.regenerate_changed(feature_diff, output_dir,
+                                             self._load_app_features(config_path))
+        else:
+            logger.info("app_features 未发生变化，无需重新生成测试")
+        result['exit_code'] = self.run_tests(result['rerun'], extra_args) if rerun else 0
+        return result
+
+
+if __name__ == '__main__':
+    import sys
+    import argparse
+    from utils.appium_driver import AppiumDriver
+
+    parser = argparse.ArgumentParser(description='重新爬取应用，按 app_features 变更增量生成并运行测试')
+    parser.add_argument('--platform', default='android emulator')
+    parser.add_argument('--config', default=None, help='配置文件路径，默认 config/config.yaml')
+    parser.add_argument('--output-dir', default='test_cases')
+    parser.add_argument('--no-run', action='store_true', help='只生成测试，不运行')
+    args = parser.parse_args()
+
+    driver = AppiumDriver(args.platform)
+    driver.init_driver()
+    try:
+        # update_app_features 负责爬取、写回配置并关闭爬取用的额外会话
+        inspector = driver.update_app_features(args.config)
+    finally:
+        driver.quit()
+    if inspector is None:
+        sys.exit(2)
+    result = AutoTestGenerator(inspector).apply_feature_diff(
+        inspector.last_feature_diff, args.config, args.output_dir, rerun=not args.no_run)
+    sys.exit(result['exit_code'])
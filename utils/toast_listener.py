@@ -0,0 +1,212 @@
+import re
+import time
+import threading
+import subprocess
+from collections import deque, namedtuple
+from utils.logger import logger
+from utils.logcat_streamer import get_streamer
+
+# t: 主机单调时钟时间（time.monotonic）
+Toast = namedtuple('Toast', ['t', 'text', 'package'])
+
+# Toast.LENGTH_LONG 的显示时长（秒），用于推断 Toast 消失时间
+TOAST_LONG_DURATION = 3.5
+
+# UiAutomator2 服务自身以无障碍监听捕获 Toast（XPath 查到的 android.widget.Toast 即来自它），
+# 捕获时在 logcat 中以 appium 标签打印 Toast 文本；订阅这些日志不需要额外的 UiAutomation 连接
+UIAUTOMATOR2_TOAST_TAG = 'appium'
+UIAUTOMATOR2_TOAST_PATTERN = r'[Tt]oast message[^:]*:\s*\[?(?P<text>.*?)\]?\s*$'
+
+# uiautomator events 的一行事件，例如：
+# EventType: TYPE_NOTIFICATION_STATE_CHANGED; EventTime: 123; PackageName: com.x; ...; ClassName: android.widget.Toast$TN; Text: [已保存]; ...
+_EVENT_TYPE_RE = re.compile(r'EventType:\s*TYPE_NOTIFICATION_STATE_CHANGED')
+_CLASS_RE = re.compile(r'ClassName:\s*([^;]+)')
+_PACKAGE_RE = re.compile(r'PackageName:\s*([^;]+)')
+_TEXT_RE = re.compile(r'Text:\s*\[(.*?)\];')
+
+
+def parse_accessibility_event(line):
+    """
+    解析 uiautomator events 输出中的 Toast 事件
+    :return: (text, package)，非 Toast 事件返回 None
+    """
+    if not _EVENT_TYPE_RE.search(line):
+        return None
+    class_name = _CLASS_RE.search(line)
+    if not class_name or 'Toast' not in class_name.group(1):
+        return None
+    text = _TEXT_RE.search(line)
+    package = _PACKAGE_RE.search(line)
+    return (text.group(1) if text else ''), (package.group(1).strip() if package else None)
+
+
+class ToastListener:
+    """
+    事件驱动的 Toast 监听
+    后台线程订阅设备事件流，把出现过的 Toast 连同时间戳缓存在本地，
+    查询和等待都在本地缓冲区上完成，不再反复对整棵树执行 XPath，也不会错过短暂出现的 Toast。
+    事件源：
+    - uiautomator2（默认）：订阅设备共用的 logcat 日志流（utils.logcat_streamer），
+      匹配 UiAutomator2 服务捕获 Toast 时打印的日志，与 UiAutomator2 会话同时使用
+    - logcat：同样订阅 logcat 日志流，按 pattern 匹配日志内容（不含时间、标签前缀），
+      pattern 需包含名为 text 的分组（适用于在调试包中打印 Toast 的应用）
+    - accessibility：adb shell uiautomator events 的无障碍事件流（TYPE_NOTIFICATION_STATE_CHANGED）；
+      同一时间只能有一个 UiAutomation 连接，只适用于没有 UiAutomator2 会话的场景
+    """
+
+    def __init__(self, device_id=None, source='uiautomator2', pattern=None, tag=None, capacity=50):
+        """
+        :param device_id: adb 设备序列号
+        :param source: 'uiautomator2'、'logcat' 或 'accessibility'
+        :param pattern: 日志源使用的正则，需包含 (?P<text>...) 分组；uiautomator2 源默认为 UIAUTOMATOR2_TOAST_PATTERN
+        :param tag: 只匹配该标签的日志；uiautomator2 源默认为 UIAUTOMATOR2_TOAST_TAG
+        :param capacity: 缓存的 Toast 数量
+        """
+        if source == 'uiautomator2':
+            pattern = pattern or UIAUTOMATOR2_TOAST_PATTERN
+            tag = tag or UIAUTOMATOR2_TOAST_TAG
+        if source in ('uiautomator2', 'logcat') and (pattern is None or 'text' not in re.compile(pattern).groupindex):
+            raise ValueError(f"{source} 源需要包含 (?P<text>...) 分组的 pattern")
+        self.device_id = device_id
+        self.source = source
+        self.pattern = re.compile(pattern) if pattern else None
+        self.tag = tag
+        self.toasts = deque(maxlen=capacity)
+        self._condition = threading.Condition()
+        self._process = None
+        self._thread = None
+        self._streamer = None
+
+    def _command(self):
+        adb = ['adb'] + (['-s', self.device_id] if self.device_id else [])
+        return adb + ['shell', 'uiautomator', 'events']
+
+    @property
+    def is_active(self):
+        if self._streamer is not None:
+            return self._streamer.is_running
+        return self._process is not None and self._process.poll() is None
+
+    def start(self, startup_check=0.5):
+        """
+        启动监听
+        :param startup_check: 启动后等待多久确认事件流没有立即退出（秒）
+        """
+        if self.source != 'accessibility':
+            self._streamer = get_streamer(self.device_id)
+            self._streamer.add_record_listener(self._on_record)
+            if self.is_active:
+                logger.info(f"Toast 监听已启动: {self.source}")
+            else:
+                logger.error(f"Toast 监听启动失败（{self.source}）：{self.device_id or 'default'} 的 logcat 日志流未运行，"
+                             f"Toast 查询将使用 XPath")
+            return self
+        try:
+            self._process = subprocess.Popen(self._command(), stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                             text=True, errors='replace', bufsize=1)
+        except OSError as e:
+            logger.error(f"Toast 监听启动失败（{self.source}）: {str(e)}，Toast 查询将使用 XPath")
+            return self
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+        time.sleep(startup_check)
+        if not self.is_active:
+            logger.error(f"Toast 监听启动失败（{self.source}）：事件流已退出（UiAutomation 可能被 UiAutomator2 占用），"
+                         f"Toast 查询将使用 XPath")
+        else:
+            logger.info(f"Toast 监听已启动: {self.source}")
+        return self
+
+    def _add(self, t, text, package):
+        with self._condition:
+            self.toasts.append(Toast(t, text, package))
+            self._condition.notify_all()
+
+    def _on_record(self, record):
+        if self.tag is not None and record.tag != self.tag:
+            return
+        match = self.pattern.search(record.message)
+        if match:
+            self._add(record.t, match.group('text'), None)
+
+    def _read(self):
+        for line in self._process.stdout:
+            parsed = parse_accessibility_event(line)
+            if parsed is not None:
+                self._add(time.monotonic(), *parsed)
+
+    def stop(self):
+        if self._streamer is not None:
+            self._streamer.remove_record_listener(self._on_record)
+            self._streamer = None
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._process = self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _find_locked(self, partial_text, since):
+        for toast in reversed(self.toasts):
+            if toast.t < since:
+                break
+            if partial_text is None or partial_text in toast.text:
+                return toast
+        return None
+
+    def find(self, partial_text=None, since=0.0):
+        """在缓冲区中查找 since 之后出现的最近一条 Toast"""
+        with self._condition:
+            return self._find_locked(partial_text, since)
+
+    def wait_for(self, partial_text=None, timeout=3, since=None):
+        """
+        等待 Toast 出现，缓冲区中已有的也算
+        :param since: 只接受该时间（time.monotonic）之后出现的 Toast，默认往前追溯一个 Toast 显示时长
+        :return: Toast；超时返回 None
+        """
+        if since is None:
+            since = time.monotonic() - TOAST_LONG_DURATION
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                toast = self._find_locked(partial_text, since)
+                remaining = deadline - time.monotonic()
+                if toast is not None or remaining <= 0:
+                    return toast
+                self._condition.wait(remaining)
+
+    def clear(self):
+        with self._condition:
+            self.toasts.clear()
+
+
+_listeners = {}
+_listeners_lock = threading.Lock()
+
+
+def get_toast_listener(device_id=None, source='uiautomator2', pattern=None):
+    """获取设备的 Toast 监听（每台设备一个），首次调用时启动；启动失败时 is_active 为 False"""
+    with _listeners_lock:
+        listener = _listeners.get(device_id)
+        if listener is None:
+            listener = _listeners[device_id] = ToastListener(device_id, source=source, pattern=pattern).start()
+        return listener
+
+
+def close_toast_listeners():
+    """停止所有设备的 Toast 监听"""
+    with _listeners_lock:
+        listeners = list(_listeners.values())
+        _listeners.clear()
+    for listener in listeners:
+        listener.stop()
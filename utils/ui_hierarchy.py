@@ -0,0 +1,227 @@
+import re
+import json
+import xml.etree.ElementTree as ET
+
+_BOUNDS_RE = re.compile(r'\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]')
+
+# XCUITest 层级没有 clickable 属性，以下类型的可用元素视为可点击
+IOS_TAPPABLE_TYPES = frozenset({
+    'XCUIElementTypeButton', 'XCUIElementTypeCell', 'XCUIElementTypeLink', 'XCUIElementTypeSwitch',
+    'XCUIElementTypeTextField', 'XCUIElementTypeSecureTextField', 'XCUIElementTypeSearchField',
+    'XCUIElementTypeMenuItem', 'XCUIElementTypeTab',
+})
+_XCUI_TYPE_PREFIX = 'XCUIElementType'
+# UiNode.resource_id / text / desc 对应的层级属性名
+# XCUITest：name 为 accessibility id，label 为显示文本，value 为控件取值（输入框内容、开关状态等）
+ANDROID_ATTRIBUTES = {'resource_id': 'resource-id', 'text': 'text', 'desc': 'content-desc'}
+XCUITEST_ATTRIBUTES = {'resource_id': 'name', 'text': 'label', 'desc': 'value'}
+# mobile: source format=json 的字段 -> page_source XML 中的属性名
+_XCUITEST_JSON_ATTRIBUTES = {
+    'type': 'type', 'name': 'name', 'label': 'label', 'value': 'value', 'placeholderValue': 'placeholderValue',
+    'isEnabled': 'enabled', 'isVisible': 'visible', 'isAccessible': 'accessible',
+    'isSelected': 'selected', 'isFocused': 'focused',
+}
+
+
+def _xcuitest_type(value):
+    """WebDriverAgent 的 JSON 层级使用短类型名（Button），补全为 page_source 中的 XCUIElementTypeButton"""
+    value = value or 'Other'
+    return value if value.startswith(_XCUI_TYPE_PREFIX) else _XCUI_TYPE_PREFIX + value
+
+
+def _json_value(key, value):
+    # isEnabled 等标志在不同 WebDriverAgent 版本中为布尔值或 '0' / '1'
+    if key.startswith('is'):
+        return 'true' if value in (True, 1, '1', 'true') else 'false'
+    return str(value)
+
+
+def parse_bounds(value):
+    """
+    解析 UiAutomator2 的 bounds 属性
+    :param value: 形如 '[0,0][1080,2400]' 的字符串
+    :return: (x1, y1, x2, y2)，无法解析时返回 None
+    """
+    if not value:
+        return None
+    match = _BOUNDS_RE.match(value)
+    if not match:
+        return None
+    return tuple(int(v) for v in match.groups())
+
+
+class UiNode:
+    """界面层级中的单个节点（只保存解析后的属性，不持有任何远端元素句柄）"""
+
+    __slots__ = ('tag', 'attrs', 'parent', 'children', 'index', 'depth', 'sibling_index', 'attribute_names',
+                 '_id_attr', '_text_attr', '_desc_attr')
+
+    def __init__(self, tag, attrs, parent=None, index=0, depth=0, sibling_index=1):
+        self.tag = tag
+        self.attrs = attrs
+        self.parent = parent
+        self.children = []
+        # 文档顺序中的序号
+        self.index = index
+        self.depth = depth
+        # 同一父节点下同标签节点中的序号（从 1 开始，对应 XPath 下标）
+        self.sibling_index = sibling_index
+        # resource_id / text / desc 在本节点层级中的属性名（XPath 中使用），构造时确定，避免每次读取都判断平台
+        self.attribute_names = XCUITEST_ATTRIBUTES if tag.startswith(_XCUI_TYPE_PREFIX) else ANDROID_ATTRIBUTES
+        self._id_attr = self.attribute_names['resource_id']
+        self._text_attr = self.attribute_names['text']
+        self._desc_attr = self.attribute_names['desc']
+
+    @property
+    def cls(self):
+        return self.attrs.get('class') or self.tag
+
+    @property
+    def is_xcuitest(self):
+        return self.attribute_names is XCUITEST_ATTRIBUTES
+
+    @property
+    def resource_id(self):
+        return self.attrs.get(self._id_attr) or ''
+
+    @property
+    def text(self):
+        return self.attrs.get(self._text_attr) or ''
+
+    @property
+    def desc(self):
+        return self.attrs.get(self._desc_attr) or ''
+
+    @property
+    def package(self):
+        return self.attrs.get('package') or ''
+
+    @property
+    def bounds(self):
+        if 'bounds' in self.attrs:
+            return parse_bounds(self.attrs['bounds'])
+        # XCUITest：x / y / width / height
+        try:
+            x, y = int(self.attrs['x']), int(self.attrs['y'])
+            return x, y, x + int(self.attrs['width']), y + int(self.attrs['height'])
+        except (KeyError, ValueError):
+            return None
+
+    @property
+    def center(self):
+        bounds = self.bounds
+        if not bounds:
+            return None
+        x1, y1, x2, y2 = bounds
+        return (x1 + x2) // 2, (y1 + y2) // 2
+
+    def is_true(self, name):
+        return self.attrs.get(name) == 'true'
+
+    @property
+    def clickable(self):
+        if 'clickable' in self.attrs:
+            return self.is_true('clickable')
+        return self.tag in IOS_TAPPABLE_TYPES and self.attrs.get('enabled') != 'false'
+
+    def xpath(self):
+        """节点的绝对 XPath（从文档根元素开始，带同名兄弟下标）"""
+        parts = []
+        node = self
+        while node is not None and node.parent is not None:
+            parts.append(f'{node.tag}[{node.sibling_index}]')
+            node = node.parent
+        if node is not None:
+            parts.append(node.tag)
+        return '/' + '/'.join(reversed(parts))
+
+    def ancestors(self):
+        node = self.parent
+        while node is not None and node.parent is not None:
+            yield node
+            node = node.parent
+
+    def __repr__(self):
+        return f"UiNode({self.cls!r}, id={self.resource_id!r}, text={self.text!r})"
+
+
+class UiHierarchy:
+    """页面层级的紧凑模型，由一次 page_source 解析得到"""
+
+    def __init__(self, root, source=None):
+        self.root = root
+        self.source = source
+        self.nodes = []
+        self._index(root)
+
+    def _index(self, root):
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if node is not root:
+                self.nodes.append(node)
+            stack.extend(reversed(node.children))
+        for i, node in enumerate(self.nodes):
+            node.index = i
+
+    @classmethod
+    def from_xml(cls, source):
+        """
+        解析 page_source XML
+        :param source: page_source 字符串或字节串
+        """
+        data = source.encode('utf-8') if isinstance(source, str) else source
+        element = ET.fromstring(data)
+        root = UiNode(element.tag, dict(element.attrib))
+        stack = [(element, root)]
+        while stack:
+            parent_element, parent_node = stack.pop()
+            counters = {}
+            for child in parent_element:
+                counters[child.tag] = counters.get(child.tag, 0) + 1
+                node = UiNode(child.tag, dict(child.attrib), parent=parent_node,
+                              depth=parent_node.depth + 1, sibling_index=counters[child.tag])
+                parent_node.children.append(node)
+                stack.append((child, node))
+        return cls(root, source)
+
+    @classmethod
+    def from_xcuitest_json(cls, source):
+        """
+        解析 XCUITest mobile: source format=json 的层级
+        属性名与 page_source XML 一致（type / name / label / value / enabled / x / y / width / height），
+        短类型名补全为 XCUIElementType 前缀，根节点与 XML 一样为 AppiumAUT，
+        节点的绝对 XPath 因此与 page_source 上的相同
+        :param source: JSON 字符串或已解析的字典
+        """
+        data = json.loads(source) if isinstance(source, (str, bytes)) else source
+        root = UiNode('AppiumAUT', {})
+        stack = [([data], root)]
+        while stack:
+            children, parent_node = stack.pop()
+            counters = {}
+            for child in children:
+                tag = _xcuitest_type(child.get('type'))
+                attrs = {name: _json_value(key, child[key]) for key, name in _XCUITEST_JSON_ATTRIBUTES.items()
+                         if child.get(key) is not None}
+                attrs['type'] = tag
+                rect = child.get('rect') or {}
+                for name in ('x', 'y', 'width', 'height'):
+                    if name in rect:
+                        attrs[name] = str(int(rect[name]))
+                counters[tag] = counters.get(tag, 0) + 1
+                node = UiNode(tag, attrs, parent=parent_node,
+                              depth=parent_node.depth + 1, sibling_index=counters[tag])
+                parent_node.children.append(node)
+                if child.get('children'):
+                    stack.append((child['children'], node))
+        return cls(root, source)
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def clickable_nodes(self):
+        return [node for node in self.nodes if node.clickable and node.bounds]
@@ -0,0 +1,208 @@
+import re
+from functools import lru_cache
+from itertools import product
+from appium.webdriver.common.appiumby import AppiumBy
+from utils.locator_generator import java_literal
+
+# XPath 属性 -> UiSelector 方法（等于, 包含, 前缀）；None 表示用 *Matches 正则实现
+_STRING_METHODS = {
+    'text': ('text', 'textContains', 'textStartsWith', 'textMatches'),
+    'content-desc': ('description', 'descriptionContains', 'descriptionStartsWith', 'descriptionMatches'),
+    'resource-id': ('resourceId', None, None, 'resourceIdMatches'),
+    'class': ('className', None, None, 'classNameMatches'),
+    'package': ('packageName', None, None, 'packageNameMatches'),
+}
+_BOOLEAN_METHODS = {
+    'checkable': 'checkable', 'checked': 'checked', 'clickable': 'clickable', 'enabled': 'enabled',
+    'focusable': 'focusable', 'focused': 'focused', 'scrollable': 'scrollable',
+    'long-clickable': 'longClickable', 'selected': 'selected',
+}
+# Toast 不在无障碍节点树中，UiAutomator2 只在 XPath 查询的层级导出里附加它，必须保留 XPath
+_XPATH_ONLY_CLASSES = {'android.widget.Toast'}
+
+_TOKEN_RE = re.compile(r"""\s*(?:
+    (?P<string>'[^']*'|"[^"]*")
+    |(?P<number>\d+)
+    |(?P<name>[A-Za-z_][\w.\-]*)
+    |(?P<op>//|@|\[|\]|\(|\)|=|,|\*)
+)""", re.X)
+
+
+class _Untranslatable(Exception):
+    pass
+
+
+def _tokenize(xpath):
+    tokens, pos = [], 0
+    xpath = xpath.strip()
+    while pos < len(xpath):
+        match = _TOKEN_RE.match(xpath, pos)
+        if not match or match.end() == pos:
+            raise _Untranslatable(xpath[pos:])
+        kind = match.lastgroup
+        value = match.group(kind)
+        tokens.append((kind, value[1:-1] if kind == 'string' else value))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """
+    只解析可以等价改写为 UiSelector 的 XPath 子集：
+    //name-test[谓词]...，谓词由 @attr='v'、contains(@attr,'v')、starts-with(@attr,'v') 经 and / or / 括号组合而成。
+    结果为析取范式：[[(attr, op, value), ...], ...]
+    """
+
+    def __init__(self, xpath):
+        self.tokens = _tokenize(xpath)
+        self.pos = 0
+
+    def _peek(self, offset=0):
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def _take(self, kind=None, value=None):
+        token = self._peek()
+        if (kind and token[0] != kind) or (value and token[1] != value):
+            raise _Untranslatable(f'unexpected {token}')
+        self.pos += 1
+        return token[1]
+
+    def parse(self):
+        self._take('op', '//')
+        if self._peek() == ('op', '*'):
+            self._take()
+            clause = []
+        else:
+            clause = [('class', 'eq', self._take('name'))]
+        disjunction = [clause]
+        while self._peek() == ('op', '['):
+            self._take()
+            predicate = self._or()
+            self._take('op', ']')
+            disjunction = [left + right for left, right in product(disjunction, predicate)]
+        if self._peek()[0] is not None:
+            raise _Untranslatable(f'trailing {self._peek()}')
+        return disjunction
+
+    def _or(self):
+        result = self._and()
+        while self._peek() == ('name', 'or'):
+            self._take()
+            result = result + self._and()
+        return result
+
+    def _and(self):
+        result = self._term()
+        while self._peek() == ('name', 'and'):
+            self._take()
+            right = self._term()
+            result = [left + other for left, other in product(result, right)]
+        return result
+
+    def _attribute(self):
+        self._take('op', '@')
+        return self._take('name')
+
+    def _term(self):
+        kind, value = self._peek()
+        if (kind, value) == ('op', '('):
+            self._take()
+            result = self._or()
+            self._take('op', ')')
+            return result
+        if (kind, value) == ('op', '@'):
+            attr = self._attribute()
+            self._take('op', '=')
+            return [[(attr, 'eq', self._take('string'))]]
+        if kind == 'name' and value in ('contains', 'starts-with'):
+            self._take()
+            self._take('op', '(')
+            attr = self._attribute()
+            self._take('op', ',')
+            literal = self._take('string')
+            self._take('op', ')')
+            return [[(attr, 'contains' if value == 'contains' else 'starts', literal)]]
+        # 位置谓词（[n]）等在 XPath 中按父节点计数，与 UiSelector.instance 语义不同，不改写
+        raise _Untranslatable(f'unsupported predicate {value}')
+
+
+def _selector(clause):
+    """将一个合取子句转换为 UiSelector 链"""
+    calls = {}
+    for attr, op, value in clause:
+        if attr in _BOOLEAN_METHODS:
+            if op != 'eq' or value not in ('true', 'false'):
+                raise _Untranslatable(attr)
+            method, argument = _BOOLEAN_METHODS[attr], value
+        elif attr == 'index' and op == 'eq' and value.isdigit():
+            method, argument = 'index', value
+        elif attr in _STRING_METHODS:
+            if attr == 'class' and op == 'eq' and value in _XPATH_ONLY_CLASSES:
+                raise _Untranslatable(value)
+            eq, contains, starts, matches = _STRING_METHODS[attr]
+            escaped = re.escape(value)
+            if op == 'eq':
+                method, argument = eq, java_literal(value)
+            elif op == 'contains':
+                method, argument = (contains, java_literal(value)) if contains \
+                    else (matches, java_literal(f'(?s).*{escaped}.*'))
+            else:
+                method, argument = (starts, java_literal(value)) if starts \
+                    else (matches, java_literal(f'(?s){escaped}.*'))
+        else:
+            # @type 等 UiAutomator2 层级中不存在的属性
+            raise _Untranslatable(attr)
+        if method in calls:
+            raise _Untranslatable(f'duplicate {method}')
+        calls[method] = argument
+    return 'new UiSelector()' + ''.join(f'.{method}({argument})' for method, argument in calls.items())
+
+
+@lru_cache(maxsize=1024)
+def xpath_to_uiselector(xpath):
+    """
+    将常见形式的 XPath 改写为 UiSelector 表达式
+    or 条件展开为以 ; 分隔的多个 UiSelector（UiAutomator2 对各选择器的结果取并集）
+    :param xpath: XPath 表达式
+    :return: UiSelector 表达式，无法等价改写时返回 None
+    """
+    try:
+        return ';'.join(_selector(clause) for clause in _Parser(xpath).parse())
+    except _Untranslatable:
+        return None
+
+
+def parse_xpath_conditions(xpath):
+    """
+    解析可改写的 XPath 子集，供其他定位后端（如 hypium）转换为各自的选择器
+    :return: 析取范式 [[(attr, 'eq' | 'contains' | 'starts', value), ...], ...]，
+             节点名以 ('class', 'eq', name) 表示；无法解析时返回 None
+    """
+    try:
+        return _Parser(xpath).parse()
+    except _Untranslatable:
+        return None
+
+
+def supports_uiautomator(driver):
+    """driver 是否为支持 -android uiautomator 定位的 UiAutomator2 会话"""
+    capabilities = getattr(driver, 'capabilities', None) or {}
+    automation = str(capabilities.get('automationName') or capabilities.get('appium:automationName') or '').lower()
+    if automation:
+        return automation == 'uiautomator2'
+    return str(capabilities.get('platformName') or '').lower() == 'android'
+
+
+def optimize_locator(locator, driver):
+    """
+    在 UiAutomator2 会话上把可改写的 XPath 定位器替换为 UiSelector，其他情况原样返回
+    :param locator: (by, value)
+    :param driver: WebDriver
+    :return: (by, value)
+    """
+    by, value = locator
+    if by != AppiumBy.XPATH or not supports_uiautomator(driver):
+        return locator
+    selector = xpath_to_uiselector(value)
+    return (AppiumBy.ANDROID_UIAUTOMATOR, selector) if selector else locator